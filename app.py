@@ -1,22 +1,42 @@
 import argparse
 import asyncio # Added import
 import os # Added import
-from src.commands.fetch import fetch_and_save_jobs
-from src.commands.grade import grade_and_save_jobs
-from src.commands.apply import create_applications_and_save
+from src.commands.fetch import fetch_and_save_jobs, load_search_queries, build_listing_filter
+from src.commands.grade import grade_and_save_jobs, grade_pending_jobs, DEFAULT_BORDERLINE_BAND, DEFAULT_GRADING_WINDOW
+from src.commands.apply import create_applications_and_save, create_applications_for_pending_jobs
+from src.commands.watch import watch_jobs, load_query_schedules, QuerySchedule
+from src.commands.search import search_and_print_jobs
+from src.commands.compact import compact_database
+from src.llm_cache import report_llm_cache_stats
+from src.filters import load_job_filters, DEFAULT_FILTERS_PATH
+from src.dedup import DEFAULT_SIMILARITY_THRESHOLD
+
+def get_similarity_threshold(args):
+    """Near-duplicate threshold of the grading commands; None when --no-dedup is given."""
+    return None if args.no_dedup else DEFAULT_SIMILARITY_THRESHOLD
+
+def get_search_queries(args, default_search_query):
+    """Collect search queries from --search-query and --queries-file, falling back to a default."""
+    search_queries = list(args.search_query or [])
+    if args.queries_file:
+        search_queries.extend(load_search_queries(args.queries_file))
+    return search_queries or [default_search_query]
 
 # Handler functions for each subcommand
 def handle_fetch_jobs(args):
     print(f"Subcommand: fetch_jobs")
     # print(f"Output CSV: {args.output_csv}") # Original print, can be kept or removed
-    # For now, use a default search query and num_jobs. These could be made CLI args later.
-    default_search_query = "developer"
-    default_num_jobs = 1 
+    search_queries = get_search_queries(args, default_search_query="developer")
     asyncio.run(fetch_and_save_jobs(
-        search_query=default_search_query,
-        num_jobs=default_num_jobs,
-        output_csv_filename=args.output_csv
-        # run_in_simulated_mode is True by default in fetch_and_save_jobs
+        search_query=search_queries,
+        num_jobs=args.num_jobs or None,
+        output_csv_filename=args.output_csv,
+        page_size=args.page_size,
+        max_pages=args.max_pages,
+        max_workers=args.max_workers,
+        incremental=args.incremental,
+        lean=args.lean,
+        listing_filter=build_listing_filter(args.min_hourly_rate, args.required_skill)
     ))
     print(f"fetch_jobs command finished. Output should be in {args.output_csv}")
 
@@ -26,7 +46,17 @@ def handle_grade_jobs(args):
     # print(f"Output CSV: {args.output_csv}") # Original print
     asyncio.run(grade_and_save_jobs(
         input_csv_filename=args.input_csv,
-        output_csv_filename=args.output_csv
+        output_csv_filename=args.output_csv,
+        batch_token_budget=args.batch_token_budget,
+        concurrency=args.concurrency,
+        timeout=args.timeout,
+        min_relevance=args.min_relevance,
+        job_filters=load_job_filters(args.filters_file),
+        model=args.model,
+        strong_model=args.strong_model,
+        borderline_band=tuple(args.borderline_band),
+        window_size=args.window_size,
+        similarity_threshold=get_similarity_threshold(args)
     ))
     print(f"grade_jobs command finished. Output should be in {args.output_csv}")
 
@@ -65,16 +95,47 @@ def handle_prepare_applications(args):
     ))
     print(f"prepare_applications command finished. Output should be in {args.output_file}")
 
+def handle_watch(args):
+    print("Subcommand: watch")
+    schedules = [QuerySchedule(query, args.interval, args.max_interval, args.backoff_factor) for query in args.search_query or []]
+    if args.queries_file:
+        schedules.extend(load_query_schedules(args.queries_file, args.interval, args.max_interval, args.backoff_factor))
+    if not schedules:
+        print("No search queries configured. Use --search-query or --queries-file.")
+        return
+    try:
+        asyncio.run(watch_jobs(
+            schedules,
+            output_csv_filename=args.output_csv,
+            page_size=args.page_size,
+            max_cycles=args.max_cycles,
+            min_relevance=args.min_relevance,
+            job_filters=load_job_filters(args.filters_file),
+            similarity_threshold=get_similarity_threshold(args),
+            initial_jobs=args.initial_jobs
+        ))
+    except KeyboardInterrupt:
+        print("Watch stopped.")
+
+def handle_search_jobs(args):
+    print("Subcommand: search_jobs")
+    search_and_print_jobs(" ".join(args.query), limit=args.limit, raw=args.raw)
+
+def handle_compact_db(args):
+    print("Subcommand: compact_db")
+    compact_database(keep_days=None if args.keep_days < 0 else args.keep_days)
+
 async def handle_main_pipeline_async(args): # args might not be used if no specific args for main_pipeline
     print("Starting main pipeline...")
 
-    # Define intermediate/output filenames
-    fetched_jobs_csv = "fetched_jobs.csv" # Default from fetch_jobs
-    graded_jobs_csv = "graded_jobs.csv"   # Default from grade_jobs
+    # Every job's stage (fetched / graded / application generated) is stored in
+    # the database, so each stage only picks up the jobs not processed yet and
+    # a rerun after a crash or Ctrl-C resumes where the previous run stopped.
+    fetched_jobs_csv = "fetched_jobs.csv" # Export of this run's fetched jobs
     applications_md = "applications.md" # Default from prepare_applications
 
     # --- Step 1: Fetch Jobs ---
-    print(f"Stage 1: Fetching jobs -> {fetched_jobs_csv}")
+    print(f"Stage 1: Fetching jobs into the database (also exported to {fetched_jobs_csv})")
     default_search_query = "AI agent developer" # Consistent with other commands
     default_num_jobs = 10
     try:
@@ -83,37 +144,27 @@ async def handle_main_pipeline_async(args): # args might not be used if no speci
             num_jobs=default_num_jobs,
             output_csv_filename=fetched_jobs_csv
         )
-        if not os.path.exists(fetched_jobs_csv):
-            print(f"Error: Fetched jobs CSV '{fetched_jobs_csv}' not created. Aborting pipeline.")
-            return
         print("Job fetching complete.")
     except Exception as e:
+        # Jobs left pending by previous runs can still be processed
         print(f"Error during job fetching stage: {e}")
-        return
 
     # --- Step 2: Grade Jobs ---
-    print(f"Stage 2: Grading jobs from '{fetched_jobs_csv}' -> {graded_jobs_csv}")
+    print("Stage 2: Grading jobs that have not been graded yet")
     try:
-        await grade_and_save_jobs(
-            input_csv_filename=fetched_jobs_csv,
-            output_csv_filename=graded_jobs_csv
-        )
-        if not os.path.exists(graded_jobs_csv):
-            print(f"Error: Graded jobs CSV '{graded_jobs_csv}' not created. Aborting pipeline.")
-            # Optionally, clean up fetched_jobs_csv if desired
-            return
+        await grade_pending_jobs(batch_token_budget=args.batch_token_budget, concurrency=args.concurrency, timeout=args.timeout,
+                                 min_relevance=args.min_relevance, job_filters=load_job_filters(args.filters_file),
+                                 model=args.model, strong_model=args.strong_model, borderline_band=tuple(args.borderline_band),
+                                 similarity_threshold=get_similarity_threshold(args))
         print("Job grading complete.")
     except Exception as e:
         print(f"Error during job grading stage: {e}")
         return
         
     # --- Step 3: Prepare Applications ---
-    print(f"Stage 3: Preparing applications from '{graded_jobs_csv}' -> {applications_md}")
+    print(f"Stage 3: Preparing applications for graded jobs without one -> {applications_md}")
     try:
-        await create_applications_and_save(
-            input_csv_filename=graded_jobs_csv,
-            output_md_filename=applications_md
-        )
+        await create_applications_for_pending_jobs(output_md_filename=applications_md)
         print("Application preparation complete.")
     except Exception as e:
         print(f"Error during application preparation stage: {e}")
@@ -133,12 +184,32 @@ def main():
     # fetch_jobs subcommand
     fetch_parser = subparsers.add_parser("fetch_jobs", help="Fetch jobs from Upwork and save to CSV.")
     fetch_parser.add_argument("--output-csv", default="fetched_jobs.csv", help="Output CSV file for fetched jobs.")
+    fetch_parser.add_argument("--num-jobs", type=int, default=1, help="Maximum number of jobs to fetch (0 for no limit).")
+    fetch_parser.add_argument("--page-size", type=int, default=50, help="Number of jobs requested per API page.")
+    fetch_parser.add_argument("--max-pages", type=int, default=None, help="Maximum number of API pages to request.")
+    fetch_parser.add_argument("--search-query", action="append", help="Search query to fetch jobs for. Can be repeated.")
+    fetch_parser.add_argument("--queries-file", default=None, help="Text file with one search query per line (e.g. files/search_queries.txt).")
+    fetch_parser.add_argument("--max-workers", type=int, default=8, help="Maximum number of concurrent Upwork API requests.")
+    fetch_parser.add_argument("--incremental", action="store_true", help="Only fetch jobs posted since the previous incremental run of each query.")
+    fetch_parser.add_argument("--lean", action="store_true", help="Fetch a lean listing first and only fetch details for jobs passing the listing filters.")
+    fetch_parser.add_argument("--min-hourly-rate", type=float, default=None, help="Listing filter: skip hourly jobs whose maximum rate is below this value.")
+    fetch_parser.add_argument("--required-skill", action="append", help="Listing filter: keep only jobs listing one of these skills. Can be repeated.")
     fetch_parser.set_defaults(func=handle_fetch_jobs)
 
     # grade_jobs subcommand
     grade_parser = subparsers.add_parser("grade_jobs", help="Grade jobs from a CSV file.")
     grade_parser.add_argument("--input-csv", required=True, help="Input CSV file with jobs to grade.")
     grade_parser.add_argument("--output-csv", default="graded_jobs.csv", help="Output CSV file for graded jobs.")
+    grade_parser.add_argument("--batch-token-budget", type=int, default=None, help="Score several jobs per LLM call, up to this many estimated prompt tokens (default: one job per call).")
+    grade_parser.add_argument("--concurrency", type=int, default=8, help="Maximum number of scoring calls in flight.")
+    grade_parser.add_argument("--window-size", type=int, default=DEFAULT_GRADING_WINDOW, help="Maximum number of jobs read from the input and not written to the output yet; a larger window lets slices fill more batches.")
+    grade_parser.add_argument("--timeout", type=float, default=120, help="Seconds allowed per scoring call before the job is marked as failed.")
+    grade_parser.add_argument("--model", default="openai/gpt-4o-mini", help="Model scoring every job, as provider/model.")
+    grade_parser.add_argument("--strong-model", default=None, help="Model re-scoring borderline jobs (e.g. openai/gpt-4o); default: no cascade.")
+    grade_parser.add_argument("--borderline-band", type=int, nargs=2, default=list(DEFAULT_BORDERLINE_BAND), metavar=("LOW", "HIGH"), help="Inclusive range of --model scores re-scored by --strong-model.")
+    grade_parser.add_argument("--filters-file", default=DEFAULT_FILTERS_PATH, help="JSON file of hard filters (min hourly rate, max applicants, client spend, ...) rejecting jobs before the LLM is called.")
+    grade_parser.add_argument("--min-relevance", type=float, default=None, help="Skip jobs whose local TF-IDF similarity to files/profile.md (0-1) is below this floor, without calling the LLM.")
+    grade_parser.add_argument("--no-dedup", action="store_true", help="Send every job to the LLM instead of reusing the score of a near-duplicate (e.g. repost) graded before.")
     grade_parser.set_defaults(func=handle_grade_jobs)
 
     # fetch_and_grade_jobs subcommand
@@ -153,9 +224,45 @@ def main():
     prepare_parser.add_argument("--output-file", default="applications.md", help="Output file for applications.")
     prepare_parser.set_defaults(func=handle_prepare_applications)
 
+    # watch subcommand
+    watch_parser = subparsers.add_parser("watch", help="Keep polling search queries and grade new jobs as they are posted.")
+    watch_parser.add_argument("--queries-file", default="files/search_queries.txt", help="Text file with one search query per line, optionally followed by '| <seconds>'.")
+    watch_parser.add_argument("--search-query", action="append", help="Additional search query to watch. Can be repeated.")
+    watch_parser.add_argument("--interval", type=float, default=300, help="Default polling interval in seconds.")
+    watch_parser.add_argument("--max-interval", type=float, default=3600, help="Longest polling interval for queries that keep returning nothing new.")
+    watch_parser.add_argument("--backoff-factor", type=float, default=2.0, help="Interval multiplier applied after a poll with no new jobs.")
+    watch_parser.add_argument("--page-size", type=int, default=50, help="Number of jobs requested per API page.")
+    watch_parser.add_argument("--output-csv", default="watched_jobs.csv", help="CSV file graded new jobs are appended to.")
+    watch_parser.add_argument("--initial-jobs", type=int, default=50, help="Newest jobs graded for a query without a stored watermark; older jobs are not fetched.")
+    watch_parser.add_argument("--max-cycles", type=int, default=None, help="Stop after this many polling cycles (default: run until interrupted).")
+    watch_parser.add_argument("--filters-file", default=DEFAULT_FILTERS_PATH, help="JSON file of hard filters (min hourly rate, max applicants, client spend, ...) rejecting jobs before the LLM is called.")
+    watch_parser.add_argument("--min-relevance", type=float, default=None, help="Skip jobs whose local TF-IDF similarity to files/profile.md (0-1) is below this floor, without calling the LLM.")
+    watch_parser.add_argument("--no-dedup", action="store_true", help="Send every job to the LLM instead of reusing the score of a near-duplicate (e.g. repost) graded before.")
+    watch_parser.set_defaults(func=handle_watch)
+
+    # search_jobs subcommand
+    search_parser = subparsers.add_parser("search_jobs", help="Full-text search over jobs stored in the database.")
+    search_parser.add_argument("query", nargs="+", help="Search terms, e.g. LangGraph RAG. All terms must match.")
+    search_parser.add_argument("--limit", type=int, default=20, help="Maximum number of results.")
+    search_parser.add_argument("--raw", action="store_true", help="Pass the query to SQLite FTS5 unchanged (allows OR, NOT, NEAR, prefix*).")
+    search_parser.set_defaults(func=handle_search_jobs)
+
+    # compact_db subcommand
+    compact_parser = subparsers.add_parser("compact_db", help="Archive old jobs into compressed cold storage and reclaim database space.")
+    compact_parser.add_argument("--keep-days", type=int, default=90, help="Days jobs stay in the hot jobs table (-1 to only vacuum).")
+    compact_parser.set_defaults(func=handle_compact_db)
+
     # main_pipeline subcommand
     pipeline_parser = subparsers.add_parser("main_pipeline", help="Run the full end-to-end job processing pipeline.")
-    # No arguments for main_pipeline initially
+    pipeline_parser.add_argument("--batch-token-budget", type=int, default=None, help="Score several jobs per LLM call, up to this many estimated prompt tokens (default: one job per call).")
+    pipeline_parser.add_argument("--concurrency", type=int, default=8, help="Maximum number of scoring calls in flight.")
+    pipeline_parser.add_argument("--timeout", type=float, default=120, help="Seconds allowed per scoring call before the job is marked as failed.")
+    pipeline_parser.add_argument("--model", default="openai/gpt-4o-mini", help="Model scoring every job, as provider/model.")
+    pipeline_parser.add_argument("--strong-model", default=None, help="Model re-scoring borderline jobs (e.g. openai/gpt-4o); default: no cascade.")
+    pipeline_parser.add_argument("--borderline-band", type=int, nargs=2, default=list(DEFAULT_BORDERLINE_BAND), metavar=("LOW", "HIGH"), help="Inclusive range of --model scores re-scored by --strong-model.")
+    pipeline_parser.add_argument("--filters-file", default=DEFAULT_FILTERS_PATH, help="JSON file of hard filters (min hourly rate, max applicants, client spend, ...) rejecting jobs before the LLM is called.")
+    pipeline_parser.add_argument("--min-relevance", type=float, default=None, help="Skip jobs whose local TF-IDF similarity to files/profile.md (0-1) is below this floor, without calling the LLM.")
+    pipeline_parser.add_argument("--no-dedup", action="store_true", help="Send every job to the LLM instead of reusing the score of a near-duplicate (e.g. repost) graded before.")
     pipeline_parser.set_defaults(func=handle_main_pipeline)
 
     args = parser.parse_args()
@@ -163,6 +270,7 @@ def main():
     # Call the function associated with the chosen subcommand
     if hasattr(args, 'func'):
         args.func(args)
+        report_llm_cache_stats()
     else:
         # This part should ideally not be reached if all subparsers have a func set
         # and `required=True` is set for subparsers.
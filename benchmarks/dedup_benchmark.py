@@ -0,0 +1,92 @@
+"""
+Micro-benchmark: near-duplicate lookups (NearDuplicateIndex.find) against many stored signatures.
+
+Builds a temporary jobs database holding the signatures of `--stored` graded
+jobs, then times `find` for `--lookups` new jobs, half of them reposts (a
+stored job with a few words changed) and half unrelated jobs.
+
+Usage:
+    python benchmarks/dedup_benchmark.py --stored 100000 --lookups 2000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import database
+from src.dedup import NearDuplicateIndex
+
+FINGERPRINT = "benchmark"
+
+
+def make_job(job_id, rng, vocabulary):
+    """A job whose title and description are drawn from `vocabulary`."""
+    return {
+        "id": str(job_id),
+        "title": " ".join(rng.choices(vocabulary, k=6)),
+        "description": " ".join(rng.choices(vocabulary, k=rng.randint(60, 250))),
+    }
+
+
+def make_repost(job, job_id, rng, vocabulary):
+    """`job` posted again under a new id, with about 2% of its description words replaced."""
+    words = job["description"].split()
+    for position in rng.sample(range(len(words)), max(1, len(words) // 50)):
+        words[position] = rng.choice(vocabulary)
+    return {"id": str(job_id), "title": job["title"], "description": " ".join(words)}
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    vocabulary = [f"word{i}" for i in range(args.vocabulary)]
+    with tempfile.TemporaryDirectory() as directory:
+        database.DB_PATH = os.path.join(directory, "jobs.db")
+        database.ensure_db_exists()
+        index = NearDuplicateIndex(args.threshold, FINGERPRINT)
+
+        start = time.perf_counter()
+        stored = []
+        for chunk_start in range(0, args.stored, 5_000):
+            jobs = [make_job(job_id, rng, vocabulary) for job_id in range(chunk_start, min(chunk_start + 5_000, args.stored))]
+            for job in jobs:
+                job["score"], job["reasoning"] = rng.randint(1, 10), "stored"
+            index.add(jobs)
+            stored.extend(rng.sample(jobs, min(len(jobs), args.lookups)))
+        build = time.perf_counter() - start
+
+        lookups = []
+        for i in range(args.lookups):
+            job_id = args.stored + i
+            lookups.append(make_repost(rng.choice(stored), job_id, rng, vocabulary) if i % 2 == 0 else make_job(job_id, rng, vocabulary))
+
+        timings = []
+        found = 0
+        for job in lookups:
+            start = time.perf_counter()
+            match = index.find(job)
+            timings.append(time.perf_counter() - start)
+            found += match is not None
+        database.close_connection()
+
+    timings.sort()
+    reposts = (args.lookups + 1) // 2
+    print(f"Stored signatures:   {args.stored:,} (built in {build:.1f}s)")
+    print(f"Lookups:             {args.lookups:,} ({reposts:,} reposts)")
+    print(f"Duplicates found:    {found:,}")
+    print(f"Mean per lookup:     {sum(timings) / len(timings) * 1000:8.3f} ms")
+    print(f"Median per lookup:   {timings[len(timings) // 2] * 1000:8.3f} ms")
+    print(f"95th percentile:     {timings[int(len(timings) * 0.95)] * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stored", type=int, default=100_000, help="Signatures stored before the lookups.")
+    parser.add_argument("--lookups", type=int, default=2_000, help="Jobs looked up (half of them reposts).")
+    parser.add_argument("--threshold", type=float, default=0.8, help="Similarity threshold of the index.")
+    parser.add_argument("--vocabulary", type=int, default=5_000, help="Distinct words the generated jobs are drawn from.")
+    parser.add_argument("--seed", type=int, default=42)
+    main(parser.parse_args())
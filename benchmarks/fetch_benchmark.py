@@ -0,0 +1,71 @@
+"""
+Load test of the fetch stage against the offline Upwork stand-in (no network or OAuth needed).
+
+Usage:
+    python benchmarks/fetch_benchmark.py --num-jobs 100000 --queries 4 --latency 0.05 --throttle-every 50
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.fake_upwork import FakeUpworkTransport
+from src.rate_limit import RetryPolicy, TokenBucket
+from src.scraper import UpworkJobScraper
+
+
+async def run_benchmark(args):
+    transport = FakeUpworkTransport(
+        num_jobs=args.num_jobs,
+        match_ratio=args.match_ratio,
+        latency=args.latency,
+        latency_jitter=args.latency / 2,
+        throttle_every=args.throttle_every,
+        token_ttl_calls=args.token_ttl_calls,
+    )
+    scraper = UpworkJobScraper(
+        max_workers=args.max_workers,
+        rate_limiter=TokenBucket(rate=args.rate, capacity=args.max_workers),
+        retry_policy=RetryPolicy(max_attempts=8, base_delay=0.05, max_delay=1.0),
+        transport=transport,
+    )
+    queries = [f"benchmark query {i}" for i in range(args.queries)]
+
+    start = time.perf_counter()
+    first_page_at = None
+    unique_jobs = 0
+    # The scraper reports progress on stdout; keep the benchmark output readable
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        async for job_page in scraper.fetch_jobs_for_queries(queries, page_size=args.page_size, lean=args.lean):
+            if first_page_at is None:
+                first_page_at = time.perf_counter() - start
+            unique_jobs += len(job_page)
+    elapsed = time.perf_counter() - start
+    scraper.close()
+
+    stats = scraper.get_fetch_stats()
+    print(f"Feed size:            {args.num_jobs} jobs, {args.queries} queries (match ratio {args.match_ratio})")
+    print(f"Unique jobs fetched:  {unique_jobs}")
+    print(f"Elapsed:              {elapsed:.2f}s ({unique_jobs / elapsed:,.0f} jobs/s), first page after {first_page_at or 0:.3f}s")
+    print(f"Stand-in stats:       {transport.stats}")
+    print(f"Retry stats:          {stats['retries']}")
+    print(f"Rate limiter:         {stats['rate_limiter']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Upwork fetch stage offline.")
+    parser.add_argument("--num-jobs", type=int, default=100_000, help="Number of jobs in the generated feed.")
+    parser.add_argument("--queries", type=int, default=4, help="Number of concurrent search queries.")
+    parser.add_argument("--match-ratio", type=float, default=0.5, help="Share of the feed matched by each query.")
+    parser.add_argument("--page-size", type=int, default=100, help="Jobs requested per page.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per request.")
+    parser.add_argument("--throttle-every", type=int, default=None, help="Throttle every Nth request.")
+    parser.add_argument("--token-ttl-calls", type=int, default=None, help="Expire and refresh the token every N requests.")
+    parser.add_argument("--max-workers", type=int, default=16, help="Worker threads for API calls.")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Rate limit in requests per second.")
+    parser.add_argument("--lean", action="store_true", help="Use the lean listing query.")
+    asyncio.run(run_benchmark(parser.parse_args()))
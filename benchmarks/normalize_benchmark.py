@@ -0,0 +1,117 @@
+"""
+Micro-benchmark: bulk job normalization vs. the previous per-node JobInformation path.
+
+Usage:
+    python benchmarks/normalize_benchmark.py [num_nodes]
+"""
+import contextlib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.normalize import normalize_job_edges, parse_money
+from src.structured_outputs import JobInformation
+
+
+def make_edges(num_nodes, seed=42):
+    """Generate search result edges shaped like the full marketplaceJobPostingsSearch node."""
+    rng = random.Random(seed)
+    skills = ["Python", "LangChain", "LangGraph", "OpenAI API", "FastAPI", "React", "PostgreSQL", "AWS"]
+    edges = []
+    for i in range(num_nodes):
+        hourly = rng.random() < 0.6
+        edges.append({"node": {
+            "id": str(1_000_000 + i),
+            "title": f"AI agent developer needed #{i}",
+            "publishedDateTime": f"2024-05-{1 + i % 28:02d}T12:00:00.000Z",
+            "description": "Build an AI agent. " * rng.randint(10, 60),
+            "durationLabel": "1 to 3 months",
+            "engagement": "Less than 30 hrs/week",
+            "job": {"contractTerms": {"contractType": "HOURLY" if hourly else "FIXED"}, "activityStat": {"jobActivity": {}}},
+            "hourlyBudgetMin": {"currency": "USD", "displayValue": f"${rng.randint(10, 40)}.00"} if hourly else None,
+            "hourlyBudgetMax": {"currency": "USD", "displayValue": f"${rng.randint(40, 120)}.00"} if hourly else None,
+            "weeklyBudget": None,
+            "experienceLevel": rng.choice(["ENTRY_LEVEL", "INTERMEDIATE", "EXPERT"]),
+            "category": "Web, Mobile & Software Dev",
+            "subcategory": "AI Apps & Integration",
+            "totalApplicants": rng.randint(0, 50),
+            "preferredFreelancerLocation": None,
+            "preferredFreelancerLocationMandatory": False,
+            "skills": [{"prettyName": name} for name in rng.sample(skills, 4)],
+            "client": {
+                "companyName": None,
+                "totalPostedJobs": rng.randint(1, 100),
+                "totalReviews": rng.randint(0, 50),
+                "totalFeedback": round(rng.uniform(3, 5), 2),
+                "totalSpent": {"currency": "USD", "displayValue": f"${rng.randint(0, 200_000):,}"},
+            },
+        }})
+    return edges
+
+
+def previous_path(edges):
+    """The per-node path UpworkJobScraper used before: log, validate, then dump."""
+    jobs = []
+    for api_job in edges:
+        node = api_job.get("node", {})
+        print(node)
+        if not node.get("id"):
+            continue
+        money = lambda field: parse_money((node.get(field) or {}).get("displayValue")) if node.get(field) else None
+        job_info = JobInformation(
+            id=node.get("id"),
+            title=node.get("title"),
+            publishedDateTime=node.get("publishedDateTime"),
+            description=node.get("description", ""),
+            durationLabel=node.get("durationLabel"),
+            engagement=node.get("engagement"),
+            contractType=node.get("job", {}).get("contractTerms", {}).get("contractType"),
+            hourlyBudgetMin=money("hourlyBudgetMin"),
+            hourlyBudgetMax=money("hourlyBudgetMax"),
+            weeklyBudget=money("weeklyBudget"),
+            experienceLevel=node.get("experienceLevel"),
+            category=node.get("category"),
+            subcategory=node.get("subcategory"),
+            totalApplicants=node.get("totalApplicants"),
+            preferredFreelancerLocation=node.get("preferredFreelancerLocation"),
+            preferredFreelancerLocationMandatory=node.get("preferredFreelancerLocationMandatory", False),
+            skills=[skill.get("prettyName") for skill in node.get("skills", []) if skill and skill.get("prettyName")],
+            clientCompanyName=node.get("client", {}).get("companyName"),
+            clientTotalPostedJobs=node.get("client", {}).get("totalPostedJobs"),
+            clientTotalReviews=node.get("client", {}).get("totalReviews"),
+            clientTotalFeedback=node.get("client", {}).get("totalFeedback"),
+            clientTotalSpent=parse_money(node.get("client", {}).get("totalSpent", {}).get("displayValue")) if node.get("client", {}).get("totalSpent") else None
+        )
+        jobs.append(job_info.model_dump())
+    return jobs
+
+
+def best_of(func, edges, repeats=5):
+    """Return the best wall-clock time of `repeats` runs, with stdout discarded."""
+    timings = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeats):
+            start = time.perf_counter()
+            func(edges)
+            timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    num_nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    edges = make_edges(num_nodes)
+
+    previous = best_of(previous_path, edges)
+    bulk = best_of(normalize_job_edges, edges)
+
+    # Both paths must produce the same jobs
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        assert [job.to_dict() for job in normalize_job_edges(edges)] == previous_path(edges)
+
+    print(f"Nodes:                    {num_nodes}")
+    print(f"Previous per-node path:   {previous * 1000:8.1f} ms ({num_nodes / previous:,.0f} jobs/s)")
+    print(f"Bulk normalize_job_edges: {bulk * 1000:8.1f} ms ({num_nodes / bulk:,.0f} jobs/s)")
+    print(f"Speedup:                  {previous / bulk:8.1f}x")
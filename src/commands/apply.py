@@ -1,6 +1,8 @@
 import asyncio
 import csv
+import json
 from datetime import datetime
+from src import database
 from src.utils import ainvoke_llm, read_text_file # read_text_file is synchronous
 from src.prompts import (
     PROFILE_ANALYZER_PROMPT,
@@ -158,3 +160,39 @@ async def create_applications_and_save(input_csv_filename: str, output_md_filena
         save_applications_to_file(prepared_applications, output_md_filename, timestamp)
     else:
         print("No applications were prepared (possibly due to errors or no eligible jobs).")
+
+
+async def create_applications_for_pending_jobs(output_md_filename: str, min_score: float = 7.0) -> int:
+    """
+    Generate applications for stored jobs graded at least `min_score` that have none yet.
+
+    Each application is stored in the database and appended to
+    `output_md_filename` as soon as it is generated, so a rerun only handles
+    the jobs that are still pending.
+
+    Returns:
+        int: Number of applications generated.
+    """
+    database.ensure_db_exists()
+    try:
+        profile_content = read_text_file("./files/profile.md")
+    except FileNotFoundError:
+        print("Warning: Profile file (files/profile.md) not found. Using default empty profile.")
+        profile_content = "No profile provided."
+
+    generated_count = 0
+    for job_dict in database.iter_jobs(stage=database.STAGE_GRADED, min_score=min_score, as_job=True):
+        title_for_logging = job_dict.get('title', 'Unknown Title')
+        print(f"Preparing application for eligible job: {title_for_logging}")
+        try:
+            application_data = await generate_application_for_job(job_dict, profile_content)
+        except Exception as e:
+            print(f"Error preparing application for job {title_for_logging}: {e}")
+            continue
+        database.save_job_application(job_dict['id'], json.dumps(application_data.model_dump()))
+        save_applications_to_file([application_data], output_md_filename, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        generated_count += 1
+
+    if not generated_count:
+        print(f"No pending graded jobs with a score of at least {min_score}.")
+    return generated_count
@@ -0,0 +1,27 @@
+from src import database
+
+
+def compact_database(keep_days=90):
+    """
+    Archive jobs older than `keep_days` days and reclaim the space they used.
+
+    Args:
+        keep_days (int): Number of days jobs stay in the hot jobs table; None only vacuums.
+
+    Returns:
+        dict: Jobs archived and database size before/after in bytes.
+    """
+    database.ensure_db_exists()
+    size_before = database.get_database_size()
+
+    archived = 0
+    if keep_days is not None:
+        archived = database.archive_old_jobs(keep_days)
+        print(f"Archived {archived} job(s) created more than {keep_days} day(s) ago.")
+    database.vacuum_database()
+
+    size_after = database.get_database_size()
+    reclaimed = size_before - size_after
+    print(f"Database size: {size_before / 1_048_576:.2f} MB -> {size_after / 1_048_576:.2f} MB ({reclaimed / 1_048_576:.2f} MB reclaimed)")
+    print(f"Jobs per stage: {database.count_jobs_by_stage()}")
+    return {"archived": archived, "size_before": size_before, "size_after": size_after, "reclaimed": reclaimed}
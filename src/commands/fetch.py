@@ -1,5 +1,7 @@
 import asyncio
 import csv
+from src import database
+from src.db_writer import AsyncDBWriter
 from src.scraper import UpworkJobScraper, UpworkConfigurationError, UpworkApiError
 
 # Copied from scrape_upwork_jobs.py
@@ -12,17 +14,7 @@ def save_data_to_csv(jobs_data_list, filename):
         print("No job data to save.")
         return
 
-    processed_jobs_for_csv = []
-    for job_dict in jobs_data_list:
-        flat_job = job_dict.copy() # Start with a copy of the original job dictionary
-        client_info = flat_job.pop('client_information', {}) # Safely pop client_information
-        
-        # Flatten client_information into the main dictionary
-        if client_info: # Ensure client_info is not None and is a dictionary
-            for k, v in client_info.items():
-                flat_job[f'client_{k}'] = v # Prepend 'client_' to client keys
-        
-        processed_jobs_for_csv.append(flat_job)
+    processed_jobs_for_csv = flatten_jobs_for_csv(jobs_data_list)
     
     if not processed_jobs_for_csv:
         print("No processable job data to save after attempting to flatten.")
@@ -45,21 +37,136 @@ def save_data_to_csv(jobs_data_list, filename):
     except Exception as e:
         print(f"An unexpected error occurred while saving data to CSV: {e}")
 
-async def fetch_and_save_jobs(search_query, num_jobs, output_csv_filename):
-    print(f"Attempting to fetch jobs for query: '{search_query}', count: {num_jobs}. Output will be saved to: {output_csv_filename}")
+def flatten_jobs_for_csv(jobs_data_list):
+    """Flatten nested client information into 'client_' prefixed columns."""
+    processed_jobs_for_csv = []
+    for job_dict in jobs_data_list:
+        flat_job = dict(job_dict.items())
+        client_info = flat_job.pop('client_information', {})
+        if client_info:
+            for k, v in client_info.items():
+                flat_job[f'client_{k}'] = v
+        processed_jobs_for_csv.append(flat_job)
+    return processed_jobs_for_csv
+
+def load_search_queries(filename):
+    """
+    Read search queries from a text file, one per line.
+
+    Blank lines and lines starting with '#' are ignored. An optional
+    "| <seconds>" suffix (the query's polling interval in watch mode) is stripped.
+    """
+    with open(filename, 'r', encoding='utf-8') as file:
+        return [line.split('|')[0].strip() for line in file if line.strip() and not line.strip().startswith('#')]
+
+def build_listing_filter(min_hourly_rate=None, required_skills=None):
+    """
+    Build a cheap predicate over lean listing fields (budget and skills).
+
+    Jobs without a posted hourly budget are kept, since fixed-price jobs only
+    expose their budget in the details.
+
+    Args:
+        min_hourly_rate (float): Reject jobs whose maximum hourly budget is below this rate.
+        required_skills (list): Keep only jobs listing at least one of these skills (case-insensitive).
+
+    Returns:
+        callable: Predicate taking a job dict, or None if no filter is configured.
+    """
+    if min_hourly_rate is None and not required_skills:
+        return None
+    wanted_skills = {skill.strip().lower() for skill in required_skills or [] if skill.strip()}
+
+    def listing_filter(job):
+        hourly_max = job.get('hourlyBudgetMax') or job.get('hourlyBudgetMin')
+        if min_hourly_rate is not None and hourly_max is not None and hourly_max < min_hourly_rate:
+            return False
+        if wanted_skills and not wanted_skills & {skill.lower() for skill in job.get('skills') or []}:
+            return False
+        return True
+
+    return listing_filter
+
+async def fetch_and_save_jobs(search_query, num_jobs, output_csv_filename, page_size=50, max_pages=None, max_workers=8, incremental=False, lean=False, listing_filter=None, transport=None):
+    """
+    Fetch jobs for one or more search queries and stream them into a CSV file.
+
+    `search_query` may be a single query string or a list of queries; several
+    queries are fetched concurrently and merged, deduplicated by job id.
+    `num_jobs` caps the number of jobs fetched per query.
+
+    Fetched jobs are also stored in the jobs table of the database, by a
+    background writer thread so the event loop keeps fetching meanwhile.
+
+    With `incremental=True`, each query resumes from the high-water mark stored
+    in the database by the previous run, so only jobs posted since then are fetched.
+
+    With `lean=True`, only the listing fields are fetched; jobs rejected by
+    `listing_filter` are dropped and the details of the rest are fetched in batches.
+
+    `transport` replaces the live Upwork client, e.g. with the offline stand-in
+    from `src/fake_upwork.py`.
+    """
+    search_queries = [search_query] if isinstance(search_query, str) else list(search_query)
+    print(f"Attempting to fetch jobs for {len(search_queries)} query(ies): {search_queries}, count per query: {num_jobs}. Output will be saved to: {output_csv_filename}")
     
-    job_listings = [] # Initialize to ensure it's defined in case of early exit
+    scraper = None
+    output_file = None
+    jobs_saved = 0
+    db_writer = AsyncDBWriter()
+    insert_results = []
     try:
-        scraper = UpworkJobScraper() 
+        database.ensure_db_exists()
+        db_writer.start()
+        watermarks = {}
+        if incremental:
+            watermarks = {query: database.get_query_watermark(query) for query in search_queries}
+
+        scraper = UpworkJobScraper(max_workers=max_workers, transport=transport)
         
-        job_listings = await scraper.fetch_jobs_from_api(
-            search_query=search_query,
-            num_jobs=num_jobs
-        )
-
-        if job_listings:
-            print(f"Successfully fetched {len(job_listings)} job listings.")
-            save_data_to_csv(job_listings, output_csv_filename)
+        # Pages are appended to the CSV as they arrive, so the file is only
+        # created once the first page of jobs has been received.
+        async for job_page in scraper.fetch_jobs_for_queries(
+            search_queries,
+            num_jobs=num_jobs,
+            page_size=page_size,
+            max_pages=max_pages,
+            watermarks=watermarks,
+            lean=lean
+        ):
+            if lean:
+                kept_jobs = [job for job in job_page if listing_filter is None or listing_filter(job)]
+                print(f"Listing filter kept {len(kept_jobs)} of {len(job_page)} jobs; fetching their details.")
+                if not kept_jobs:
+                    continue
+                job_page = await scraper.hydrate_job_details(kept_jobs)
+            elif listing_filter is not None:
+                job_page = [job for job in job_page if listing_filter(job)]
+                if not job_page:
+                    continue
+            rows = flatten_jobs_for_csv(job_page)
+            if output_file is None:
+                output_file = open(output_csv_filename, 'w', newline='', encoding='utf-8')
+                dict_writer = csv.DictWriter(output_file, fieldnames=rows[0].keys())
+                dict_writer.writeheader()
+            dict_writer.writerows(rows)
+            output_file.flush()
+            jobs_saved += len(rows)
+            insert_results.append(await db_writer.submit(database.insert_jobs, job_page))
+            print(f"Saved page of {len(rows)} jobs to {output_csv_filename} ({jobs_saved} so far)")
+
+        if incremental:
+            # Only queries that completed are advanced, so a failed query is fully retried next run
+            for query, watermark in scraper.query_watermarks.items():
+                await db_writer.submit(database.upsert_query_watermark, query,
+                                       watermark['newest_published'], watermark['seen_ids'], watermark.get('gaps'))
+
+        await db_writer.flush()
+        new_in_db = sum(result.result() for result in insert_results if result.exception() is None)
+        print(f"Stored {new_in_db} new job(s) in the database.")
+
+        if jobs_saved:
+            print(f"Successfully fetched and saved {jobs_saved} job listings to {output_csv_filename}")
             return output_csv_filename # Indicate success by returning filename
         else:
             # This case means API call was successful but no jobs matched the query.
@@ -72,7 +179,17 @@ async def fetch_and_save_jobs(search_query, num_jobs, output_csv_filename):
     except UpworkApiError as e:
         print(f"API Error: Failed to fetch jobs from Upwork. Details: {e}")
         return None # Indicate failure
+    except IOError as e:
+        print(f"I/O error writing to CSV {output_csv_filename}: {e}")
+        return None # Indicate failure
     except Exception as e:
         import traceback
         print(f"An unexpected error occurred during job fetching: {e}\n{traceback.format_exc()}")
         return None # Indicate failure
+    finally:
+        await db_writer.close()
+        if output_file is not None:
+            output_file.close()
+        if scraper is not None:
+            print(f"Upwork API stats: {scraper.get_fetch_stats()}")
+            scraper.close()
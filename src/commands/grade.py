@@ -1,24 +1,36 @@
 import csv
 import asyncio
-from src.utils import ainvoke_llm, read_text_file # read_text_file is synchronous
+import os
+import time
+from itertools import islice
+from src import database
+from src.db_writer import AsyncDBWriter
+from src.utils import ainvoke_llm, read_text_file, estimate_tokens # read_text_file is synchronous
 from src.prompts import SCORE_JOBS_PROMPT
 from src.structured_outputs import JobScores, JobScore # Assuming JobScore might be useful if JobScores is a list
+from src.dedup import NearDuplicateIndex, DEFAULT_SIMILARITY_THRESHOLD, scoring_fingerprint
+from src.relevance import RelevanceScorer
+from src.filters import evaluate_job_filters
 
-# Helper function to read jobs from CSV
-def read_jobs_from_csv(filename: str) -> list[dict]:
-    jobs = []
+# Helper function to stream jobs from CSV, one row at a time
+def iter_jobs_from_csv(filename: str):
+    with open(filename, mode='r', newline='', encoding='utf-8') as file:
+        yield from csv.DictReader(file)
+
+def read_csv_header(filename: str) -> list:
+    """Return the header row of a CSV file, or None if the file is missing or empty."""
     try:
         with open(filename, mode='r', newline='', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                jobs.append(row)
+            return next(csv.reader(file), None)
+    except FileNotFoundError:
+        return None
+
+def read_graded_job_ids(filename: str) -> set:
+    """Ids of the jobs already written to a graded jobs CSV (empty if the file does not exist)."""
+    try:
+        return {row['id'] for row in iter_jobs_from_csv(filename) if row.get('id')}
     except FileNotFoundError:
-        # Handled by the caller, but good to be aware
-        raise
-    except Exception as e:
-        print(f"Error reading CSV file {filename}: {e}")
-        return [] # Return empty list on other read errors
-    return jobs
+        return set()
 
 # Helper function to format a single job dictionary into a string for the LLM
 def format_job_for_scoring(job_dict: dict) -> str:
@@ -54,105 +66,828 @@ def format_job_for_scoring(job_dict: dict) -> str:
     
     return job_text.strip()
 
-# Helper function to write graded jobs (including scores) to CSV
-def write_graded_jobs_to_csv(graded_jobs_data: list[dict], filename: str):
-    if not graded_jobs_data:
-        print("No graded job data to write.")
-        return
+# Default number of scoring calls in flight, and seconds allowed per call
+DEFAULT_GRADING_CONCURRENCY = 8
+DEFAULT_GRADING_TIMEOUT = 120.0
+# Tokens reserved for the model's answer per job in a batch (one JobScore entry)
+SCORE_OUTPUT_TOKENS_PER_JOB = 25
+# Extra rounds for jobs the model left out of a batch response
+MAX_BATCH_RETRIES = 2
+# Cheap-model scores (inclusive) re-scored by the strong model in a cascade, around the application cutoff
+DEFAULT_BORDERLINE_BAND = (6, 8)
+# Jobs grade_and_save_jobs keeps in flight (read but not written yet) by default
+DEFAULT_GRADING_WINDOW = 100
+# With batching, grade_and_save_jobs starts a slice of its window once the slice fills this many batches
+GRADING_BATCHES_PER_SLICE = 4
 
-    # Dynamically get fieldnames from the first dictionary to include all original and new fields
-    # (e.g., 'score', 'reason' if added)
-    try:
-        fieldnames = list(graded_jobs_data[0].keys())
-    except IndexError:
-        print("Cannot determine CSV headers, no data in graded_jobs_data.")
-        return
-    
-    # Ensure 'score' and 'reason' are part of fieldnames if they might exist
-    # This handles cases where the first job might have failed scoring
-    if 'score' not in fieldnames:
-        fieldnames.append('score')
-    if 'reasoning' not in fieldnames: # Assuming the Pydantic model uses 'reasoning'
-        fieldnames.append('reasoning')
+def build_scoring_batches(jobs: list, token_budget: int, scoring_system_prompt: str) -> list[list]:
+    """
+    Greedily pack jobs into batches whose estimated prompt size fits `token_budget`.
 
+    Args:
+        jobs (list): (job_dict, job_text) pairs, in grading order.
+        token_budget (int): Estimated tokens allowed per call, system prompt and answer included.
+        scoring_system_prompt (str): The system prompt sent with every batch.
 
-    try:
-        with open(filename, mode='w', newline='', encoding='utf-8') as file:
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-            writer.writeheader()
-            for job_dict in graded_jobs_data:
-                # Fill missing keys for rows that might not have all fields (e.g., failed scoring)
-                for field_name in fieldnames:
-                    job_dict.setdefault(field_name, None)
-                writer.writerow(job_dict)
-        print(f"Successfully wrote {len(graded_jobs_data)} graded jobs to {filename}")
-    except IOError as e:
-        print(f"I/O error writing CSV to {filename}: {e}")
-    except Exception as e:
-        print(f"An unexpected error occurred while writing graded jobs to CSV: {e}")
-
-
-async def grade_and_save_jobs(input_csv_filename: str, output_csv_filename: str):
-    print(f"Grading jobs from '{input_csv_filename}'. Output to: '{output_csv_filename}'")
-    
-    try:
-        jobs_to_grade = read_jobs_from_csv(input_csv_filename)
-        if not jobs_to_grade:
-            print(f"No jobs found in '{input_csv_filename}' or the file is empty/corrupt.")
+    Returns:
+        list: Batches (lists of (job_dict, job_text) pairs); a job too large for
+        the budget on its own gets a batch of its own.
+    """
+    available = token_budget - estimate_tokens(scoring_system_prompt)
+    batches = []
+    batch, batch_tokens = [], 0
+    for job_dict, job_text in jobs:
+        job_tokens = estimate_tokens(job_text) + SCORE_OUTPUT_TOKENS_PER_JOB
+        if batch and batch_tokens + job_tokens > available:
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append((job_dict, job_text))
+        batch_tokens += job_tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+def parse_batch_scores(score_response, batch_size: int) -> dict:
+    """Map the batch-local job ids of a JobScores response to batch positions (first answer wins)."""
+    scores = {}
+    for job_score in (score_response.scores if score_response else []):
+        position = str(job_score.job_id).strip().lstrip('#')
+        if position.isdigit() and 1 <= int(position) <= batch_size:
+            scores.setdefault(int(position) - 1, job_score)
+    return scores
+
+async def score_job_batch(batch: list, scoring_system_prompt: str, model: str, use_cache: bool = True,
+                          cache_status: dict = None) -> dict:
+    """
+    Score a batch of jobs with a single LLM call.
+
+    Jobs are labelled with short batch-local ids ("1", "2", ...) rather than
+    their Upwork ids, which keeps the prompt small and makes the answers easy
+    to match back. A response is only cached if it scores every job of the batch.
+
+    Returns:
+        dict: Batch position -> JobScore, for the jobs the model scored.
+    """
+    job_sections = [f"## Job ID: {position}\n{job_text}" for position, (_, job_text) in enumerate(batch, start=1)]
+    score_response = await ainvoke_llm(
+        system_prompt=scoring_system_prompt,
+        user_message=(
+            f"Evaluate each of these {len(batch)} jobs. Return exactly one score per job, "
+            f"with job_id set to the job's Job ID:\n\n" + "\n\n".join(job_sections)
+        ),
+        model=model,
+        response_format=JobScores,
+        use_cache=use_cache,
+        cache_if=lambda response: len(parse_batch_scores(response, len(batch))) == len(batch),
+        cache_status=cache_status
+    )
+    return parse_batch_scores(score_response, len(batch))
+
+async def grade_jobs_in_batches(jobs: list, scoring_system_prompt: str, model: str, token_budget: int, on_scored,
+                                semaphore: asyncio.Semaphore, timeout: float = None, scoring_stats=None) -> None:
+    """
+    Score (job_dict, job_text) pairs in token-budgeted batches, retrying jobs the model dropped.
+
+    Batches are sent concurrently, at most as many at a time as `semaphore`
+    allows. When a batch of several jobs fails, its jobs are retried one per
+    call, so a single problematic job does not fail its batch-mates.
+    `on_scored` is awaited with each job dict once its 'score' and 'reasoning' are set.
+    Retry rounds bypass the LLM cache, and answers served from the cache are
+    not counted as calls in `scoring_stats`.
+    """
+    async def score_batch(batch, dropped, isolated, can_retry, use_cache):
+        print(f"Grading batch of {len(batch)} job(s)")
+        started_at = None
+        cache_status = {}
+        try:
+            async with semaphore:
+                started_at = time.monotonic()
+                scores = await asyncio.wait_for(score_job_batch(batch, scoring_system_prompt, model, use_cache, cache_status), timeout)
+            if scoring_stats and not cache_status.get('hit'):
+                scoring_stats.record_call(model, time.monotonic() - started_at, len(batch))
+        except Exception as e:
+            if scoring_stats and started_at is not None:
+                scoring_stats.record_call(model, time.monotonic() - started_at, len(batch), failed=True)
+            error = f"timed out after {timeout}s" if isinstance(e, asyncio.TimeoutError) else str(e)
+            print(f"Error scoring batch of {len(batch)} job(s): {error}")
+            if can_retry and len(batch) > 1:
+                isolated.extend(batch)
+                return
+            for job_dict, _ in batch:
+                job_dict['score'] = None
+                job_dict['reasoning'] = f"Exception during scoring: {error}"
+                await on_scored(job_dict)
+            return
+        for position, (job_dict, job_text) in enumerate(batch):
+            if position not in scores:
+                dropped.append((job_dict, job_text))
+                continue
+            job_dict['score'] = scores[position].score
+            job_dict['reasoning'] = getattr(scores[position], 'reasoning', "N/A")
+            await on_scored(job_dict)
+
+    pending = list(jobs)
+    isolated = []
+    for attempt in range(MAX_BATCH_RETRIES + 1):
+        if not pending and not isolated:
             return
+        if attempt:
+            print(f"Retrying {len(pending) + len(isolated)} job(s) the model did not score.")
+        batches = build_scoring_batches(pending, token_budget, scoring_system_prompt) + [[item] for item in isolated]
+        positions = {id(job_dict): index for index, (job_dict, _) in enumerate(pending + isolated)}
+        dropped, isolated = [], []
+        can_retry = attempt < MAX_BATCH_RETRIES
+        await asyncio.gather(*(score_batch(batch, dropped, isolated, can_retry, attempt == 0) for batch in batches))
+        # Keep the input order for the next round
+        pending = sorted(dropped, key=lambda item: positions[id(item[0])])
+        isolated.sort(key=lambda item: positions[id(item[0])])
+
+    for job_dict, _ in pending:
+        print(f"Could not retrieve a valid score for job: {job_dict.get('title', 'Unknown Job')}")
+        job_dict['score'] = None
+        job_dict['reasoning'] = "Scoring failed or no score provided by LLM."
+        await on_scored(job_dict)
+
+class ScoringStats:
+    """
+    Per-model call counts and latency of a grading run, plus how the strong
+    model of a cascade compares with the cheap model on the jobs it re-scored.
+    """
+
+    def __init__(self):
+        self.tiers = {}
+        self.escalations = 0
+        self.agreements = 0
+        self.close_agreements = 0
+        self.total_difference = 0
+
+    def record_call(self, model: str, seconds: float, jobs: int = 1, failed: bool = False):
+        tier = self.tiers.setdefault(model, {'calls': 0, 'jobs': 0, 'failed': 0, 'seconds': 0.0})
+        tier['calls'] += 1
+        tier['jobs'] += jobs
+        tier['failed'] += int(failed)
+        tier['seconds'] += seconds
+
+    def record_escalation(self, cheap_score: int, strong_score: int):
+        difference = abs(int(strong_score) - int(cheap_score))
+        self.escalations += 1
+        self.agreements += int(difference == 0)
+        self.close_agreements += int(difference <= 1)
+        self.total_difference += difference
+
+    def report(self):
+        for model, tier in self.tiers.items():
+            average = tier['seconds'] / tier['calls'] if tier['calls'] else 0.0
+            print(f"Scoring tier {model}: {tier['calls']} call(s) for {tier['jobs']} job(s), {tier['failed']} failed, {average:.2f}s average latency")
+        if self.escalations:
+            print(
+                f"Cascade: {self.escalations} borderline job(s) re-scored; the strong model agreed exactly on "
+                f"{self.agreements} ({self.agreements / self.escalations:.0%}), within 1 point on "
+                f"{self.close_agreements} ({self.close_agreements / self.escalations:.0%}), "
+                f"mean difference {self.total_difference / self.escalations:.2f}"
+            )
+
+
+class GradingProgress:
+    """
+    Counts graded jobs and periodically prints progress and throughput.
+
+    One instance can be shared by several `grade_jobs` calls (e.g. the
+    slices of a file), so progress and the final summary cover the whole run.
+    """
+
+    def __init__(self, total: int = 0, report_every: float = 5.0):
+        self.total = total
+        self.report_every = report_every
+        self.done = 0
+        self.failed = 0
+        self.received = 0
+        self.rejections = {}
+        self.irrelevant = 0
+        self.reused = 0
+        self.started_at = time.monotonic()
+        self._last_report = self.started_at
+
+    def add_jobs(self, count: int):
+        """Count `count` more jobs to be graded (or reused from a near-duplicate)."""
+        self.total += count
+
+    def update(self, job_dict: dict):
+        self.done += 1
+        if job_dict.get('score') is None:
+            self.failed += 1
+        now = time.monotonic()
+        if self.done == self.total or now - self._last_report >= self.report_every:
+            self._last_report = now
+            print(f"Grading progress: {self.done}/{self.total} jobs ({self.failed} failed), {self.rate():.2f} jobs/s")
+
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def report(self):
+        """Print what was graded, and what was filtered out or reused without calling the LLM."""
+        num_rejected = sum(self.rejections.values())
+        if num_rejected:
+            per_rule = ", ".join(f"{rule}: {count}" for rule, count in self.rejections.items() if count)
+            print(f"Rejected {num_rejected} of {self.received} job(s) with job filters without calling the LLM ({per_rule}).")
+        if self.irrelevant:
+            print(f"Skipped {self.irrelevant} of {self.received} job(s) below the relevance threshold without calling the LLM.")
+        if self.reused:
+            print(f"Reused scores for {self.reused} near-duplicate job(s) instead of calling the LLM.")
+        if self.received:
+            print(f"Graded {self.done} job(s) in {time.monotonic() - self.started_at:.1f}s ({self.rate():.2f} jobs/s, {self.failed} without a score)")
+
+def truncate_partial_last_row(filename: str) -> int:
+    """
+    Cut off the last row of a CSV file if it was only partly written (e.g. by a crash).
+
+    A row is complete when it has as many fields as the header and ends with a
+    newline; quoted fields spanning several lines are handled.
+
+    Returns:
+        int: Number of bytes removed (0 if the file is missing or intact).
+    """
+    try:
+        file = open(filename, mode='rb+')
     except FileNotFoundError:
-        print(f"Error: Input CSV file not found: {input_csv_filename}")
-        return
-    
+        return 0
+    with file:
+        # Bytes consumed by the reader so far, and whether the last line read was terminated
+        position = [0, True]
+
+        def lines():
+            for line in file:
+                position[0] += len(line)
+                position[1] = line.endswith(b'\n')
+                yield line.decode('utf-8', errors='replace')
+
+        reader = csv.reader(lines())
+        complete_end = 0
+        try:
+            header = next(reader, None)
+            if header is not None and position[1]:
+                complete_end = position[0]
+                for row in reader:
+                    if position[1] and len(row) == len(header):
+                        complete_end = position[0]
+        except csv.Error:
+            pass
+        size = file.seek(0, os.SEEK_END)
+        if complete_end < size:
+            file.truncate(complete_end)
+            file.flush()
+            os.fsync(file.fileno())
+        return size - complete_end
+
+class GradedJobsCsvAppender:
+    """
+    Appends graded jobs to a CSV file in input order, as soon as they are graded.
+
+    Jobs are numbered in input order; a job graded before an earlier one waits
+    in a buffer until every earlier job is written (or skipped). Rows are
+    flushed and fsynced every `flush_every` rows or `flush_interval` seconds,
+    so a crash only loses the last few results. An existing file is appended
+    to with its own header, after cutting off a row a crash left half-written.
+    """
+
+    def __init__(self, filename: str, fieldnames: list, flush_every: int = 20, flush_interval: float = 5.0):
+        if truncate_partial_last_row(filename):
+            print(f"Removed a partially written last row from '{filename}'.")
+        existing_fieldnames = read_csv_header(filename)
+        self.fieldnames = existing_fieldnames or fieldnames
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.file = open(filename, mode='a', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=self.fieldnames, extrasaction='ignore')
+        if not existing_fieldnames:
+            self.writer.writeheader()
+            self.flush()
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+        self._waiting = {}
+        self._next_index = 0
+
+    def add(self, index: int, job_dict: dict) -> int:
+        """
+        Record the graded job at input position `index`, writing every job now in order.
+
+        Returns:
+            int: Number of positions written or skipped by this call.
+        """
+        if index < self._next_index or index in self._waiting:
+            return 0
+        self._waiting[index] = job_dict
+        completed = 0
+        while self._next_index in self._waiting:
+            job_dict = self._waiting.pop(self._next_index)
+            self._next_index += 1
+            completed += 1
+            if job_dict is not None:
+                self.writer.writerow(job_dict)
+                self.written += 1
+                self._unflushed += 1
+        if self._unflushed >= self.flush_every or (self._unflushed and time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+        return completed
+
+    def skip(self, index: int) -> int:
+        """Leave input position `index` out of the output (it is graded again by the next run)."""
+        return self.add(index, None)
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def load_scoring_system_prompt(profile_path: str = "./files/profile.md") -> str:
+    """Build the scoring system prompt from the freelancer profile."""
     try:
-        profile_content = read_text_file("./files/profile.md")
+        profile_content = read_text_file(profile_path)
     except FileNotFoundError:
         print("Error: Profile file (files/profile.md) not found. Using default empty profile.")
         profile_content = "No profile provided." # Default or error handling
+    return SCORE_JOBS_PROMPT.format(profile=profile_content)
 
-    graded_jobs = []
-    # Prepare the system prompt once
-    # The original SCORE_JOBS_PROMPT is formatted with profile content.
-    # The user message then contains the job(s) to evaluate.
-    scoring_system_prompt = SCORE_JOBS_PROMPT.format(profile=profile_content)
 
-    for job_dict in jobs_to_grade:
-        job_text_for_scoring = format_job_for_scoring(job_dict)
-        
-        title_for_logging = job_dict.get('title', job_dict.get('job_id', 'Unknown Job')) # Use job_id if title missing
-        print(f"Grading job: {title_for_logging}")
-        
+def load_relevance_scorer(profile_path: str = "./files/profile.md", corpus=None):
+    """
+    Build the local relevance pre-filter from the freelancer profile (None if there is no profile).
+
+    With `corpus` (an iterable of jobs), its IDF weights are fitted on the
+    profile plus the corpus once, so scores do not depend on the grading order.
+    """
+    try:
+        with open(profile_path, "r", encoding="utf-8") as file:
+            scorer = RelevanceScorer(file.read())
+    except FileNotFoundError:
+        print("WARNING: Profile file (files/profile.md) not found. Relevance pre-filter disabled.")
+        return None
+    return scorer.fit(corpus) if corpus is not None else scorer
+
+
+async def score_single_job(job_dict: dict, job_text: str, scoring_system_prompt: str, model: str) -> bool:
+    """
+    Score one job with its own LLM call, setting 'score' and 'reasoning' on `job_dict`.
+
+    Returns:
+        bool: True if the answer was served from the LLM cache.
+    """
+    title_for_logging = job_dict.get('title', job_dict.get('job_id', 'Unknown Job'))
+    # The JobScores model expects a list of scores.
+    # The prompt SCORE_JOBS_PROMPT is designed for a list of jobs.
+    # We adapt by sending a "list" containing just one job.
+    cache_status = {}
+    score_response = await ainvoke_llm(
+        system_prompt=scoring_system_prompt,
+        user_message=f"Evaluate this Job:\n\n{job_text}", # Sending one job as a string
+        model=model,
+        response_format=JobScores,
+        cache_if=lambda response: bool(response.scores),
+        cache_status=cache_status
+    )
+
+    if score_response and score_response.scores and len(score_response.scores) > 0:
+        single_score_data = score_response.scores[0] # Take the first (and only) score object
+        job_dict['score'] = single_score_data.score
+        # Assuming JobScore has a 'reasoning' field, adjust if it's named differently (e.g., 'reason')
+        job_dict['reasoning'] = getattr(single_score_data, 'reasoning', "N/A") # Safely get reasoning
+    else:
+        print(f"Could not retrieve a valid score for job: {title_for_logging}")
+        job_dict['score'] = None
+        job_dict['reasoning'] = "Scoring failed or no score provided by LLM."
+    return cache_status['hit']
+
+
+async def grade_jobs(jobs: list, scoring_system_prompt: str = None, model: str = "openai/gpt-4o-mini",
+                     similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD, on_graded=None,
+                     batch_token_budget: int = None, concurrency: int = DEFAULT_GRADING_CONCURRENCY,
+                     timeout: float = DEFAULT_GRADING_TIMEOUT, min_relevance: float = None,
+                     relevance_scorer: RelevanceScorer = None, job_filters: dict = None, strong_model: str = None,
+                     borderline_band: tuple = DEFAULT_BORDERLINE_BAND, scoring_stats: ScoringStats = None,
+                     db_writer: AsyncDBWriter = None, semaphore: asyncio.Semaphore = None,
+                     progress: GradingProgress = None, duplicate_index: NearDuplicateIndex = None) -> list[dict]:
+    """
+    Score jobs with the LLM.
+
+    With `strong_model`, scoring is a cascade: `model` scores every job and
+    only jobs whose score falls in `borderline_band` are re-scored, one per
+    call, by `strong_model`, whose score is kept.
+    Up to `concurrency` LLM calls are in flight at once. Each call is limited
+    to `timeout` seconds, and a failing or timed-out job only affects itself.
+    Jobs that are near-duplicates (e.g. reposts) of an already graded job, or
+    of another job in `jobs`, inherit its score instead of being sent to the LLM;
+    if that other job cannot be graded, its near-duplicates are sent to the LLM.
+    Stored scores are only reused if they were produced with the same prompt,
+    profile, model and cascade settings, so a reused score is a final
+    (already re-scored if borderline) score.
+    Jobs rejected by `job_filters`, and with `min_relevance` jobs whose local
+    TF-IDF similarity to the profile is below the floor, are skipped: they get
+    no score and are never sent to the LLM.
+
+    Args:
+        jobs (list): Job dicts (or JobRecord objects) to grade.
+        scoring_system_prompt (str): Prompt from `load_scoring_system_prompt`; loaded if not given.
+        model (str): The model string specifying the provider and model name.
+        similarity_threshold (float): Estimated Jaccard similarity of title and
+            description above which a score is reused; None grades every job.
+        on_graded (callable): Coroutine function awaited with each graded job
+            dict as soon as it is graded, e.g. to persist it right away.
+        batch_token_budget (int): Score several jobs per LLM call, packing as many
+            as fit this estimated token budget; None sends one job per call.
+        concurrency (int): Maximum number of LLM calls in flight.
+        timeout (float): Seconds allowed per LLM call (None for no limit).
+        min_relevance (float): Profile similarity (0-1) below which jobs are
+            skipped without an LLM call; None sends every job to the LLM.
+        relevance_scorer (RelevanceScorer): Scorer fitted on a fixed corpus (see
+            `load_relevance_scorer`); if not given, one is built from the profile
+            and weighted by the profile plus `jobs`.
+        job_filters (dict): Hard-filter rules from `load_job_filters`; None keeps every job.
+        strong_model (str): Model re-scoring borderline jobs; None scores with `model` only.
+        borderline_band (tuple): Inclusive (low, high) range of `model` scores that are re-scored.
+        scoring_stats (ScoringStats): Collects per-model calls, latency and cascade
+            agreement; a new one is created and reported if not given.
+        db_writer (AsyncDBWriter): Writer the near-duplicate signatures of graded
+            jobs are queued on; a private one is used if not given.
+        semaphore (asyncio.Semaphore): Limit on LLM calls shared with concurrent
+            grade_jobs calls; replaces `concurrency` if given.
+        progress (GradingProgress): Progress shared with other grade_jobs calls of
+            the same run; a new one is created and its summary printed if not given.
+        duplicate_index (NearDuplicateIndex): Index shared with other grade_jobs calls
+            of the same run, so near-duplicates are grouped across calls; replaces
+            `similarity_threshold` if given.
+
+    Returns:
+        list: One dict per job with 'score' and 'reasoning' added, in input order.
+        With `min_relevance`, every dict also has its 'relevance'.
+    """
+    if scoring_system_prompt is None:
+        scoring_system_prompt = load_scoring_system_prompt()
+
+    rejected_by, rejections = evaluate_job_filters(jobs, job_filters)
+    num_rejected = sum(1 for rule in rejected_by if rule is not None)
+
+    relevances = None
+    if min_relevance is not None:
+        relevance_scorer = relevance_scorer or load_relevance_scorer()
+        if relevance_scorer is not None:
+            relevances = relevance_scorer.score(jobs)
+    num_irrelevant = 0
+    if relevances is not None:
+        num_irrelevant = sum(1 for rule, relevance in zip(rejected_by, relevances) if rule is None and relevance < min_relevance)
+
+    owns_stats = scoring_stats is None
+    scoring_stats = scoring_stats or ScoringStats()
+    if duplicate_index is None and similarity_threshold is not None:
+        fingerprint = scoring_fingerprint(scoring_system_prompt, model, strong_model, borderline_band)
+        duplicate_index = NearDuplicateIndex(similarity_threshold, fingerprint)
+    semaphore = semaphore or asyncio.Semaphore(max(1, concurrency))
+    owns_progress = progress is None
+    progress = progress or GradingProgress()
+    progress.add_jobs(len(jobs) - num_rejected - num_irrelevant)
+    progress.received += len(jobs)
+    for rule, count in rejections.items():
+        progress.rejections[rule] = progress.rejections.get(rule, 0) + count
+    progress.irrelevant += num_irrelevant
+
+    async def record_graded(job_dict):
+        stored = None
         try:
-            # The JobScores model expects a list of scores.
-            # The prompt SCORE_JOBS_PROMPT is designed for a list of jobs.
-            # We adapt by sending a "list" containing just one job.
-            score_response = await ainvoke_llm(
-                system_prompt=scoring_system_prompt,
-                user_message=f"Evaluate this Job:\n\n{job_text_for_scoring}", # Sending one job as a string
-                model="openai/gpt-4o-mini", # Or your preferred model
-                response_format=JobScores 
-            )
-            
-            if score_response and score_response.scores and len(score_response.scores) > 0:
-                # Assuming the JobScore model has 'score' and 'reasoning' fields
-                # The 'id' field in JobScore referred to the index if multiple jobs were sent;
-                # here it's less relevant as we process one by one, but it might be part of the model.
-                single_score_data = score_response.scores[0] # Take the first (and only) score object
-                job_dict['score'] = single_score_data.score
-                # Assuming JobScore has a 'reasoning' field, adjust if it's named differently (e.g., 'reason')
-                job_dict['reasoning'] = getattr(single_score_data, 'reasoning', "N/A") # Safely get reasoning
+            if on_graded:
+                await on_graded(job_dict)
+            if duplicate_index and job_dict['score'] is not None:
+                stored = await db_writer.submit(database.insert_job_signatures, duplicate_index.signature_entries([job_dict]))
+        except Exception as e:
+            print(f"Error recording grade of job {job_dict.get('title', 'Unknown Job')}: {e}")
+        progress.update(job_dict)
+        if duplicate_index:
+            duplicate_index.release(job_dict, stored)
+
+    async def grade_follower(job_dict, duplicate, leader_graded):
+        """Reuse the score of the job this one is a near-duplicate of once it is graded."""
+        leader = await leader_graded
+        if leader.get('score') is None:
+            print(f"Job {duplicate['job_id']} could not be graded; grading its near-duplicate: {job_dict.get('title', 'Unknown Job')}")
+            await grade_one(job_dict, format_job_for_scoring(job_dict))
+            return
+        progress.reused += 1
+        job_dict['score'] = leader['score']
+        job_dict['reasoning'] = f"Near-duplicate of job {duplicate['job_id']} (similarity {duplicate['similarity']:.2f}); score reused. {leader['reasoning'] or ''}".strip()
+        await record_graded(job_dict)
+
+    async def timed_score(job_dict, job_text, tier_model, message):
+        """Score one job with `tier_model` while holding the semaphore, recording the call. Returns True on a cache hit."""
+        async with semaphore:
+            print(message)
+            started_at = time.monotonic()
+            try:
+                cache_hit = await asyncio.wait_for(score_single_job(job_dict, job_text, scoring_system_prompt, tier_model), timeout)
+            except BaseException:
+                scoring_stats.record_call(tier_model, time.monotonic() - started_at, failed=True)
+                raise
+            # Answers served from the LLM cache are not provider calls
+            if not cache_hit:
+                scoring_stats.record_call(tier_model, time.monotonic() - started_at, failed=job_dict['score'] is None)
+            return cache_hit
+
+    async def finish(job_dict):
+        """Re-score a borderline job with the strong model, then record it."""
+        cheap_score = job_dict.get('score')
+        if strong_model and cheap_score is not None and borderline_band[0] <= cheap_score <= borderline_band[1]:
+            title_for_logging = job_dict.get('title', job_dict.get('job_id', 'Unknown Job'))
+            review = {'title': job_dict.get('title')}
+            cache_hit = False
+            try:
+                cache_hit = await timed_score(review, format_job_for_scoring(job_dict), strong_model,
+                                  f"Re-scoring borderline job with {strong_model} (score {cheap_score}): {title_for_logging}")
+            except Exception as e:
+                error = f"timed out after {timeout}s" if isinstance(e, asyncio.TimeoutError) else str(e)
+                print(f"Error re-scoring job {title_for_logging} with {strong_model}: {error}")
+                review['score'] = None
+            if review['score'] is not None:
+                if not cache_hit:
+                    scoring_stats.record_escalation(cheap_score, review['score'])
+                job_dict['score'] = review['score']
+                job_dict['reasoning'] = f"Re-scored by {strong_model} (was {cheap_score} with {model}). {review['reasoning']}"
             else:
-                print(f"Could not retrieve a valid score for job: {title_for_logging}")
-                job_dict['score'] = None 
-                job_dict['reasoning'] = "Scoring failed or no score provided by LLM."
+                job_dict['reasoning'] = f"{job_dict['reasoning']} (re-scoring by {strong_model} failed; kept the {model} score)"
+        await record_graded(job_dict)
 
+    async def grade_one(job_dict, job_text):
+        try:
+            await timed_score(job_dict, job_text, model, f"Grading job: {job_dict.get('title', job_dict.get('job_id', 'Unknown Job'))}")
+        except asyncio.TimeoutError:
+            print(f"Timed out scoring job {job_dict.get('title', 'Unknown Job')} after {timeout}s")
+            job_dict['score'] = None
+            job_dict['reasoning'] = f"Exception during scoring: timed out after {timeout}s"
         except Exception as e:
-            print(f"Error scoring job {title_for_logging}: {e}")
+            print(f"Error scoring job {job_dict.get('title', 'Unknown Job')}: {e}")
             # This will catch OpenAI API key errors if not set, among other things.
-            job_dict['score'] = None 
+            job_dict['score'] = None
             job_dict['reasoning'] = f"Exception during scoring: {str(e)}"
-        
+        await finish(job_dict)
+
+    graded_jobs = []
+    to_score = []
+    following = []
+    for position, job in enumerate(jobs):
+        job_dict = dict(job.items())
         graded_jobs.append(job_dict)
+        title_for_logging = job_dict.get('title', job_dict.get('job_id', 'Unknown Job')) # Use job_id if title missing
+
+        if relevances is not None:
+            job_dict['relevance'] = round(float(relevances[position]), 4)
+        if rejected_by[position] is not None:
+            rule = rejected_by[position]
+            job_dict['score'] = None
+            job_dict['reasoning'] = f"Rejected by job filter {rule} ({job_filters[rule]}); not sent to the LLM."
+            continue
+        if relevances is not None and job_dict['relevance'] < min_relevance:
+            job_dict['score'] = None
+            job_dict['reasoning'] = f"Skipped: relevance to the profile {job_dict['relevance']:.3f} is below {min_relevance}; not sent to the LLM."
+            continue
+
+        duplicate = duplicate_index.find(job_dict, register=True) if duplicate_index else None
+        if duplicate and 'pending_job' in duplicate:
+            following.append((job_dict, duplicate, duplicate_index.follow(duplicate['pending_job'])))
+            continue
+        if duplicate:
+            print(f"Reusing score of job {duplicate['job_id']} for near-duplicate: {title_for_logging} (similarity {duplicate['similarity']:.2f})")
+            job_dict['score'] = duplicate['score']
+            job_dict['reasoning'] = f"Near-duplicate of job {duplicate['job_id']} (similarity {duplicate['similarity']:.2f}); score reused. {duplicate['reasoning'] or ''}".strip()
+            if on_graded:
+                await on_graded(job_dict)
+            progress.reused += 1
+            progress.update(job_dict)
+            continue
+        to_score.append((job_dict, format_job_for_scoring(job_dict)))
+
+    owns_writer = db_writer is None and duplicate_index is not None
+    if owns_writer:
+        db_writer = AsyncDBWriter()
+        db_writer.start()
+    try:
+        if batch_token_budget:
+            scoring = grade_jobs_in_batches(to_score, scoring_system_prompt, model, batch_token_budget, finish, semaphore,
+                                            timeout, scoring_stats)
+        else:
+            scoring = asyncio.gather(*(grade_one(job_dict, job_text) for job_dict, job_text in to_score))
+        await asyncio.gather(scoring, *(grade_follower(*entry) for entry in following))
+    finally:
+        if duplicate_index:
+            # Jobs waiting for one that was not recorded (e.g. on cancellation) grade themselves
+            for job_dict, _ in to_score:
+                duplicate_index.release(job_dict)
+        if owns_writer:
+            await db_writer.close()
+
+    if owns_progress:
+        progress.report()
+    if owns_stats:
+        scoring_stats.report()
+    return graded_jobs
+
+
+async def grade_and_save_jobs(input_csv_filename: str, output_csv_filename: str, batch_token_budget: int = None,
+                              concurrency: int = DEFAULT_GRADING_CONCURRENCY, timeout: float = DEFAULT_GRADING_TIMEOUT,
+                              min_relevance: float = None, job_filters: dict = None, model: str = "openai/gpt-4o-mini",
+                              strong_model: str = None, borderline_band: tuple = DEFAULT_BORDERLINE_BAND,
+                              window_size: int = DEFAULT_GRADING_WINDOW,
+                              similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD):
+    """
+    Grade the jobs of a CSV file, streaming them to the output CSV.
+
+    Input rows are read lazily and at most `window_size` jobs are in flight
+    (read but not written yet). The window is graded in slices running
+    concurrently, and the next rows are read as soon as earlier jobs are
+    written, so a slow job only holds back its own place in the output order.
+    With `batch_token_budget` a slice holds enough jobs to fill
+    GRADING_BATCHES_PER_SLICE batches, otherwise `concurrency` jobs, and at
+    most half the window so the next slice is read while one is graded.
+    Progress, the near-duplicate index and the summary are shared by all slices.
+    Each graded job is appended to the output in input order as soon as it
+    (and every job before it) is graded. Jobs whose id is already in the
+    output are skipped, so an interrupted run resumes where it stopped, and
+    memory use does not grow with the size of the file.
+    """
+    print(f"Grading jobs from '{input_csv_filename}'. Output to: '{output_csv_filename}'")
+
+    input_fieldnames = read_csv_header(input_csv_filename)
+    if input_fieldnames is None:
+        print(f"Error: Input CSV file not found or empty: {input_csv_filename}")
+        return
+
+    # Prepare the system prompt once
+    # The original SCORE_JOBS_PROMPT is formatted with profile content.
+    # The user message then contains the job(s) to evaluate.
+    scoring_system_prompt = load_scoring_system_prompt()
+    relevance_scorer = None
+    if min_relevance is not None:
+        # IDF over every row of the input (graded before or not), so a resumed run scores jobs the same way
+        relevance_scorer = load_relevance_scorer(corpus=iter_jobs_from_csv(input_csv_filename))
+    scoring_stats = ScoringStats()
+    progress = GradingProgress()
+    duplicate_index = None
+    if similarity_threshold is not None:
+        fingerprint = scoring_fingerprint(scoring_system_prompt, model, strong_model, borderline_band)
+        duplicate_index = NearDuplicateIndex(similarity_threshold, fingerprint)
+
+    output_fieldnames = [field for field in input_fieldnames if field not in ('relevance', 'score', 'reasoning')]
+    output_fieldnames += (['relevance'] if min_relevance is not None else []) + ['score', 'reasoning']
+    # Opening the appender first cuts off a row a crash left half-written, so its job is graded again
+    appender = GradedJobsCsvAppender(output_csv_filename, output_fieldnames)
+    graded_ids = read_graded_job_ids(output_csv_filename)
+    if graded_ids:
+        print(f"Resuming: {len(graded_ids)} job(s) already graded in '{output_csv_filename}' will be skipped.")
+
+    window_size = max(1, window_size)
+    max_slice_size = max(1, window_size // 2)
+    slice_tokens = None
+    if batch_token_budget:
+        # Estimated job tokens (as counted by build_scoring_batches) filling GRADING_BATCHES_PER_SLICE batches
+        slice_tokens = max(1, batch_token_budget - estimate_tokens(scoring_system_prompt)) * GRADING_BATCHES_PER_SLICE
+    # One slot per job read and not written yet
+    window_slots = asyncio.Semaphore(window_size)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    tasks = set()
+    failed = 0
+    skipped = 0
+
+    def release(count):
+        for _ in range(count):
+            window_slots.release()
+
+    async def grade_slice(start, jobs_slice):
+        nonlocal failed
+        positions = {job['id']: start + offset for offset, job in enumerate(jobs_slice) if job.get('id')}
+
+        async def append_graded(job_dict):
+            if job_dict.get('id') in positions:
+                release(appender.add(positions[job_dict['id']], job_dict))
+
+        try:
+            graded_jobs = await grade_jobs(jobs_slice, scoring_system_prompt, model=model, on_graded=append_graded,
+                                           batch_token_budget=batch_token_budget, timeout=timeout,
+                                           min_relevance=min_relevance, relevance_scorer=relevance_scorer,
+                                           job_filters=job_filters, strong_model=strong_model,
+                                           borderline_band=borderline_band, scoring_stats=scoring_stats,
+                                           similarity_threshold=similarity_threshold, db_writer=db_writer,
+                                           semaphore=semaphore, progress=progress, duplicate_index=duplicate_index)
+        except Exception as e:
+            # Leave the slice out of the output so the next run grades it again
+            print(f"Error grading jobs {start + 1}-{start + len(jobs_slice)}: {e}")
+            failed += len(jobs_slice)
+            for offset in range(len(jobs_slice)):
+                release(appender.skip(start + offset))
+            return
+        # Jobs skipped by the filters are not passed to on_graded
+        for offset, job_dict in enumerate(graded_jobs):
+            release(appender.add(start + offset, job_dict))
+
+    def launch(start, jobs_slice):
+        task = asyncio.ensure_future(grade_slice(start, jobs_slice))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    async with AsyncDBWriter() as db_writer:
+        try:
+            next_index = 0
+            jobs_slice, jobs_slice_tokens = [], 0
+            for job in iter_jobs_from_csv(input_csv_filename):
+                if job.get('id') and job['id'] in graded_ids:
+                    skipped += 1
+                    continue
+                if jobs_slice and window_slots.locked() and not tasks:
+                    # The slice holds the whole window: start it, as no other slice can free a slot
+                    launch(next_index - len(jobs_slice), jobs_slice)
+                    jobs_slice, jobs_slice_tokens = [], 0
+                await window_slots.acquire()
+                jobs_slice.append(job)
+                next_index += 1
+                if slice_tokens:
+                    jobs_slice_tokens += estimate_tokens(format_job_for_scoring(job)) + SCORE_OUTPUT_TOKENS_PER_JOB
+                    slice_full = jobs_slice_tokens >= slice_tokens
+                else:
+                    slice_full = len(jobs_slice) >= concurrency
+                if slice_full or len(jobs_slice) >= max_slice_size:
+                    launch(next_index - len(jobs_slice), jobs_slice)
+                    jobs_slice, jobs_slice_tokens = [], 0
+            if jobs_slice:
+                launch(next_index - len(jobs_slice), jobs_slice)
+            while tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            appender.close()
+
+    progress.report()
+    scoring_stats.report()
+    if skipped:
+        print(f"Skipped {skipped} job(s) already present in '{output_csv_filename}'.")
+    if failed:
+        print(f"{failed} job(s) could not be graded and were left out of '{output_csv_filename}'; rerun to retry them.")
+    print(f"Job grading complete. {appender.written} graded job(s) appended to {output_csv_filename}")
+
+
+async def grade_pending_jobs(scoring_system_prompt: str = None, model: str = "openai/gpt-4o-mini", batch_size: int = 200,
+                             batch_token_budget: int = None, concurrency: int = DEFAULT_GRADING_CONCURRENCY,
+                             timeout: float = DEFAULT_GRADING_TIMEOUT, min_relevance: float = None,
+                             job_filters: dict = None, strong_model: str = None,
+                             borderline_band: tuple = DEFAULT_BORDERLINE_BAND,
+                             similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD) -> int:
+    """
+    Grade the stored jobs that have not been graded yet.
+
+    Every score is queued for the database writer thread as soon as it is
+    received and committed within `AsyncDBWriter.flush_interval`, so an
+    interrupted run loses at most the last moment of grading, and a rerun
+    resumes with the jobs still pending. Jobs skipped by the job filters or
+    the relevance pre-filter stay pending, so they are reconsidered if the
+    filters, the profile or `min_relevance` change.
+
+    Returns:
+        int: Number of jobs graded.
+    """
+    database.ensure_db_exists()
+    if scoring_system_prompt is None:
+        scoring_system_prompt = load_scoring_system_prompt()
+
+    async def save_grade(job):
+        await db_writer.submit(database.update_job_grades, [job])
 
-    write_graded_jobs_to_csv(graded_jobs, output_csv_filename)
-    print(f"Job grading complete. Results saved to {output_csv_filename}")
+    relevance_scorer = None
+    if min_relevance is not None:
+        relevance_scorer = load_relevance_scorer(corpus=database.iter_jobs(stage=database.STAGE_FETCHED, as_job=True))
+    scoring_stats = ScoringStats()
+    progress = GradingProgress()
+    duplicate_index = None
+    if similarity_threshold is not None:
+        fingerprint = scoring_fingerprint(scoring_system_prompt, model, strong_model, borderline_band)
+        duplicate_index = NearDuplicateIndex(similarity_threshold, fingerprint)
+    pending_jobs = database.iter_jobs(stage=database.STAGE_FETCHED, as_job=True)
+    graded_count = 0
+    async with AsyncDBWriter() as db_writer:
+        while True:
+            batch = list(islice(pending_jobs, batch_size))
+            if not batch:
+                break
+            graded_jobs = await grade_jobs(batch, scoring_system_prompt, model=model, on_graded=save_grade,
+                                           batch_token_budget=batch_token_budget, concurrency=concurrency, timeout=timeout,
+                                           min_relevance=min_relevance, relevance_scorer=relevance_scorer,
+                                           job_filters=job_filters, strong_model=strong_model,
+                                           borderline_band=borderline_band, scoring_stats=scoring_stats,
+                                           similarity_threshold=similarity_threshold, db_writer=db_writer,
+                                           progress=progress, duplicate_index=duplicate_index)
+            graded_count += sum(1 for job in graded_jobs if job.get('score') is not None)
+    progress.report()
+    scoring_stats.report()
+    print(f"Graded {graded_count} pending job(s). Jobs per stage: {database.count_jobs_by_stage()}")
+    return graded_count
@@ -0,0 +1,26 @@
+import sqlite3
+
+from src import database
+
+
+def search_and_print_jobs(query, limit=20, raw=False):
+    """Search stored jobs with the full-text index and print the ranked results."""
+    database.ensure_db_exists()
+    try:
+        results = database.search_jobs(query, limit=limit, raw=raw)
+    except sqlite3.OperationalError as e:
+        # Raw queries can contain FTS5 syntax errors
+        print(f"Invalid search query '{query}': {e}")
+        return []
+
+    if not results:
+        print(f"No stored jobs match '{query}'.")
+        return results
+
+    print(f"Top {len(results)} job(s) matching '{query}':")
+    for position, job in enumerate(results, start=1):
+        score = "-" if job['score'] is None else f"{job['score']:g}"
+        print(f"{position:>3}. [{job['job_id']}] {job['title']} (score: {score}, published: {job['published_at'] or '-'}, rank: {job['rank']:.3g})")
+        if job['snippet']:
+            print(f"     {' '.join(job['snippet'].split())}")
+    return results
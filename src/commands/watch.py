@@ -0,0 +1,192 @@
+import asyncio
+import csv
+import os
+import time
+from collections import OrderedDict
+from itertools import islice
+from src import database
+from src.db_writer import AsyncDBWriter
+from src.dedup import DEFAULT_SIMILARITY_THRESHOLD
+from src.commands.grade import grade_jobs, load_scoring_system_prompt, load_relevance_scorer
+from src.normalize import JOB_FIELDS
+from src.scraper import UpworkJobScraper, UpworkConfigurationError, UpworkApiError
+
+GRADED_JOB_FIELDS = list(JOB_FIELDS) + ['score', 'reasoning']
+
+# Number of recently graded job ids watch remembers across queries
+MAX_RECENT_JOB_IDS = 10_000
+# Number of newest stored jobs the relevance pre-filter's IDF weights are fitted on
+RELEVANCE_CORPUS_SIZE = 5_000
+
+
+class QuerySchedule:
+    """
+    Polling schedule of one search query.
+
+    The interval starts at `interval` and is multiplied by `backoff_factor`
+    (up to `max_interval`) after every poll that finds nothing new; it snaps
+    back to `interval` as soon as new jobs show up.
+    """
+
+    def __init__(self, search_query, interval, max_interval, backoff_factor=2.0):
+        self.search_query = search_query
+        self.base_interval = interval
+        self.max_interval = max(max_interval, interval)
+        self.backoff_factor = backoff_factor
+        self.current_interval = interval
+        self.next_run_at = 0.0
+        self.empty_polls = 0
+
+    def record_poll(self, new_jobs_count, now):
+        """Schedule the next poll based on how many new jobs the last one found."""
+        if new_jobs_count:
+            self.empty_polls = 0
+            self.current_interval = self.base_interval
+        else:
+            self.empty_polls += 1
+            self.current_interval = min(self.max_interval, self.current_interval * self.backoff_factor)
+        self.next_run_at = now + self.current_interval
+
+
+def load_query_schedules(filename, default_interval, max_interval, backoff_factor=2.0):
+    """
+    Read query schedules from a queries file.
+
+    Each line holds a search query with an optional "| <seconds>" polling interval,
+    e.g. "LangGraph | 120". Blank lines and lines starting with '#' are ignored.
+    """
+    schedules = []
+    with open(filename, 'r', encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            query, _, interval = line.partition('|')
+            interval = float(interval) if interval.strip() else default_interval
+            schedules.append(QuerySchedule(query.strip(), interval, max_interval, backoff_factor))
+    return schedules
+
+
+def append_graded_jobs_to_csv(graded_jobs, filename):
+    """Append graded jobs to a CSV file, writing the header if the file is new."""
+    write_header = not os.path.exists(filename) or os.path.getsize(filename) == 0
+    with open(filename, 'a', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=GRADED_JOB_FIELDS, extrasaction='ignore')
+        if write_header:
+            writer.writeheader()
+        writer.writerows(graded_jobs)
+
+
+async def poll_query(scraper, schedule, page_size, db_writer, initial_jobs=50):
+    """
+    Fetch the jobs posted since the stored watermark of one query.
+
+    A query without a watermark only fetches its `initial_jobs` newest jobs,
+    which sets its watermark; the older backlog is not fetched or graded.
+
+    The new jobs are queued for insertion (stage fetched) before the updated
+    watermark, so the watermark is never committed ahead of the jobs it covers.
+    """
+    watermark = database.get_query_watermark(schedule.search_query)
+    num_jobs = None if watermark else initial_jobs
+    new_jobs = []
+    async for job_page in scraper.fetch_jobs_from_api(schedule.search_query, num_jobs=num_jobs, page_size=min(page_size, num_jobs or page_size),
+                                                      watermark=watermark):
+        new_jobs.extend(job_page)
+    if new_jobs:
+        await db_writer.submit(database.insert_jobs, new_jobs)
+    updated = scraper.query_watermarks.get(schedule.search_query)
+    if updated:
+        await db_writer.submit(database.upsert_query_watermark, schedule.search_query,
+                               updated['newest_published'], updated['seen_ids'], updated.get('gaps'))
+    return new_jobs
+
+
+async def watch_jobs(schedules, output_csv_filename, page_size=50, max_cycles=None, transport=None, min_relevance=None,
+                     job_filters=None, similarity_threshold=DEFAULT_SIMILARITY_THRESHOLD, initial_jobs=50):
+    """
+    Keep polling search queries and grade only the jobs that are new.
+
+    One scraper (and its OAuth client) and one set of LLM clients are kept warm
+    for the lifetime of the process. Each query is polled on its own schedule,
+    resuming from its stored high-water mark, and new jobs are graded and
+    appended to `output_csv_filename` as soon as they are found. New jobs are
+    stored (stage fetched) before the watermark moves past them, so jobs left
+    ungraded by an interrupted run stay pending for `main_pipeline`.
+
+    Args:
+        schedules (list): QuerySchedule objects, one per search query.
+        output_csv_filename (str): CSV file graded jobs are appended to.
+        page_size (int): Number of jobs requested per page.
+        max_cycles (int): Stop after this many polling cycles (None runs until interrupted).
+        transport: Optional transport replacing the live Upwork client.
+        min_relevance (float): Skip new jobs whose profile similarity is below this
+            floor without calling the LLM (None grades every new job).
+        job_filters (dict): Hard-filter rules from `load_job_filters` applied to new jobs.
+        similarity_threshold (float): Near-duplicate threshold above which a stored
+            score is reused; None sends every new job to the LLM.
+        initial_jobs (int): Number of newest jobs graded for a query polled for the
+            first time (one without a stored watermark).
+    """
+    database.ensure_db_exists()
+    scoring_system_prompt = load_scoring_system_prompt()
+    relevance_scorer = None
+    if min_relevance is not None:
+        # IDF over the newest stored jobs, fixed for the whole watch
+        relevance_scorer = load_relevance_scorer(corpus=islice(database.iter_jobs(as_job=True), RELEVANCE_CORPUS_SIZE))
+    try:
+        scraper = UpworkJobScraper(transport=transport)
+    except UpworkConfigurationError as e:
+        print(f"Configuration Error: Could not initialize Upwork client. Details: {e}")
+        return
+
+    pending = database.count_jobs_by_stage().get(database.STAGE_FETCHED, 0)
+    if pending:
+        print(f"INFO: {pending} stored job(s) have not been graded yet; `python app.py main_pipeline` grades them.")
+    print(f"Watching {len(schedules)} query(ies); graded jobs are appended to {output_csv_filename}. Press Ctrl-C to stop.")
+    # Ids of recently graded jobs, so a job found by several queries is graded once; bounded
+    # because the watermarks already keep each query from returning the same job twice
+    recent_ids = OrderedDict()
+    cycles = 0
+    db_writer = AsyncDBWriter()
+    db_writer.start()
+    try:
+        while max_cycles is None or cycles < max_cycles:
+            now = time.monotonic()
+            due = [schedule for schedule in schedules if schedule.next_run_at <= now]
+            if not due:
+                await asyncio.sleep(min(schedule.next_run_at for schedule in schedules) - now)
+                continue
+
+            results = await asyncio.gather(
+                *(poll_query(scraper, schedule, page_size, db_writer, initial_jobs) for schedule in due),
+                return_exceptions=True
+            )
+            new_jobs = []
+            now = time.monotonic()
+            for schedule, result in zip(due, results):
+                if isinstance(result, Exception):
+                    error_kind = "API error" if isinstance(result, UpworkApiError) else "Unexpected error"
+                    print(f"{error_kind} while polling '{schedule.search_query}': {result}")
+                    schedule.record_poll(0, now)
+                    continue
+                fresh = [job for job in result if job['id'] not in recent_ids]
+                for job in fresh:
+                    recent_ids[job['id']] = None
+                while len(recent_ids) > MAX_RECENT_JOB_IDS:
+                    recent_ids.popitem(last=False)
+                new_jobs.extend(fresh)
+                schedule.record_poll(len(fresh), now)
+                print(f"'{schedule.search_query}': {len(fresh)} new job(s), next poll in {schedule.current_interval:.0f}s")
+
+            if new_jobs:
+                graded_jobs = await grade_jobs(new_jobs, scoring_system_prompt, min_relevance=min_relevance,
+                                               relevance_scorer=relevance_scorer, job_filters=job_filters,
+                                               similarity_threshold=similarity_threshold, db_writer=db_writer)
+                append_graded_jobs_to_csv(graded_jobs, output_csv_filename)
+                await db_writer.submit(database.update_job_grades, graded_jobs)
+                print(f"Graded {len(graded_jobs)} new job(s) and appended them to {output_csv_filename}")
+            cycles += 1
+    finally:
+        await db_writer.close()
+        scraper.close()
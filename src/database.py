@@ -1,23 +1,112 @@
-import sqlite3
+import ast
+import json
 import os
+import sqlite3
+import threading
+import zlib
 from pathlib import Path
 
+from src.normalize import parse_money
+
 DB_PATH = "./upwork_jobs.db"
 
-def ensure_db_exists():
-    """Ensure the database file and directory exist."""
+# Number of most recent job ids kept per search query watermark
+MAX_WATERMARK_IDS = 200
+
+# Pipeline stages of a stored job, in order
+STAGE_FETCHED = "fetched"
+STAGE_GRADED = "graded"
+STAGE_APPLICATION_GENERATED = "application_generated"
+
+# Pragmas applied to every connection: WAL lets readers run alongside the
+# writer, and NORMAL sync is safe in WAL mode while avoiding an fsync per commit.
+# auto_vacuum only takes effect on a new, empty database file (see vacuum_database).
+CONNECTION_PRAGMAS = (
+    "PRAGMA auto_vacuum = INCREMENTAL",
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -20000",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA busy_timeout = 30000",
+)
+
+# One long-lived connection per thread (sqlite3 connections are not shared across threads)
+_local = threading.local()
+_connections_lock = threading.Lock()
+_open_connections = []
+
+# Column names per (database path, table), read once with PRAGMA table_info
+_table_columns_cache = {}
+_initialized_paths = set()
+
+def get_connection():
+    """
+    Return this thread's connection to DB_PATH, opening it on first use.
+
+    The connection is kept open and reused by every database function called
+    from the same thread. Rows are returned as sqlite3.Row objects.
+    """
+    conn = getattr(_local, "connection", None)
+    if conn is not None and _local.path == DB_PATH:
+        return conn
+    if conn is not None:
+        close_connection()
+
     Path(DB_PATH).parent.mkdir(parents=True, exist_ok=True)
-    
-    if not os.path.exists(DB_PATH):
-        create_tables()
-    
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    _local.connection = conn
+    _local.path = DB_PATH
+    with _connections_lock:
+        _open_connections.append(conn)
+    return conn
+
+def close_connection():
+    """Close this thread's connection, if it is open."""
+    conn = getattr(_local, "connection", None)
+    if conn is None:
+        return
+    with _connections_lock:
+        if conn in _open_connections:
+            _open_connections.remove(conn)
+    conn.close()
+    _local.connection = None
+    _local.path = None
+
+def close_all_connections():
+    """Close the connections of every thread, e.g. before the process exits."""
+    with _connections_lock:
+        connections = list(_open_connections)
+        _open_connections.clear()
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.ProgrammingError:
+            # Connections can only be closed from their own thread
+            pass
+    _local.connection = None
+    _local.path = None
+
+def ensure_db_exists():
+    """Ensure the database file, directory and tables exist."""
+    if DB_PATH in _initialized_paths:
+        return
+    # Pending migrations are applied, so databases created by older
+    # versions are upgraded in place.
+    create_tables()
+    _initialized_paths.add(DB_PATH)
+
 def create_tables():
-    """Create the necessary tables if they don't exist."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Create jobs table to match the scraper data structure
-    cursor.execute('''
+    """Create the necessary tables if they don't exist, by applying any pending migrations."""
+    apply_migrations(get_connection())
+    _table_columns_cache.clear()
+
+def _migration_1_initial_schema(conn):
+    """Original scraping-era jobs table and the query watermarks table."""
+    conn.execute('''
     CREATE TABLE IF NOT EXISTS jobs (
         job_id TEXT PRIMARY KEY,
         title TEXT,
@@ -37,84 +126,856 @@ def create_tables():
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
     ''')
-    
-    conn.commit()
-    conn.close()
+
+    # High-water mark of what has already been fetched for each search query
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS query_watermarks (
+        search_query TEXT PRIMARY KEY,
+        newest_published TEXT,
+        seen_ids TEXT,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+def _migration_2_job_information_columns(conn):
+    """Rebuild the jobs table with typed columns matching JobInformation."""
+    conn.execute('''
+    CREATE TABLE jobs_v2 (
+        job_id TEXT PRIMARY KEY,
+        title TEXT,
+        published_at TEXT,
+        description TEXT,
+        duration_label TEXT,
+        engagement TEXT,
+        contract_type TEXT,
+        hourly_budget_min REAL,
+        hourly_budget_max REAL,
+        weekly_budget REAL,
+        experience_level TEXT,
+        category TEXT,
+        subcategory TEXT,
+        total_applicants INTEGER,
+        preferred_locations TEXT,
+        location_mandatory INTEGER,
+        skills TEXT,
+        client_company_name TEXT,
+        client_total_posted_jobs INTEGER,
+        client_total_reviews INTEGER,
+        client_total_feedback REAL,
+        client_total_spent REAL,
+        score REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    # Keep what the scraping-era columns can still provide
+    conn.create_function("parse_money", 1, parse_money, deterministic=True)
+    conn.execute('''
+    INSERT INTO jobs_v2 (job_id, title, description, duration_label, contract_type, experience_level, client_total_spent, score, created_at)
+    SELECT job_id, title, description, duration, UPPER(job_type), experience_level, parse_money(client_total_spent), score, created_at
+    FROM jobs
+    ''')
+    conn.execute("DROP TABLE jobs")
+    conn.execute("ALTER TABLE jobs_v2 RENAME TO jobs")
+
+def _migration_3_job_query_indexes(conn):
+    """Application column and the indexes backing iter_jobs filters."""
+    conn.execute("ALTER TABLE jobs ADD COLUMN application TEXT")
+    # Keyset pagination walks (created_at, job_id) / (published_at, job_id) in order
+    conn.execute("CREATE INDEX idx_jobs_created_at ON jobs (created_at, job_id)")
+    conn.execute("CREATE INDEX idx_jobs_published_at ON jobs (published_at, job_id)")
+    conn.execute("CREATE INDEX idx_jobs_score ON jobs (score)")
+    conn.execute("CREATE INDEX idx_jobs_contract_type ON jobs (contract_type, created_at, job_id)")
+    conn.execute("CREATE INDEX idx_jobs_hourly_budget ON jobs (hourly_budget_max)")
+    # Only jobs with an application are indexed, which keeps this one small
+    conn.execute("CREATE INDEX idx_jobs_with_application ON jobs (created_at, job_id) WHERE application IS NOT NULL")
+
+def _migration_4_jobs_full_text_search(conn):
+    """FTS5 index over job title, description and skills."""
+    # External-content table: the text lives only in jobs, the index is kept in sync by triggers
+    conn.execute('''
+    CREATE VIRTUAL TABLE jobs_fts USING fts5(
+        title, description, skills,
+        content='jobs', content_rowid='rowid', tokenize='porter unicode61'
+    )
+    ''')
+    conn.execute('''
+    CREATE TRIGGER jobs_fts_after_insert AFTER INSERT ON jobs BEGIN
+        INSERT INTO jobs_fts (rowid, title, description, skills) VALUES (new.rowid, new.title, new.description, new.skills);
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER jobs_fts_after_delete AFTER DELETE ON jobs BEGIN
+        INSERT INTO jobs_fts (jobs_fts, rowid, title, description, skills) VALUES ('delete', old.rowid, old.title, old.description, old.skills);
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER jobs_fts_after_update AFTER UPDATE OF title, description, skills ON jobs BEGIN
+        INSERT INTO jobs_fts (jobs_fts, rowid, title, description, skills) VALUES ('delete', old.rowid, old.title, old.description, old.skills);
+        INSERT INTO jobs_fts (rowid, title, description, skills) VALUES (new.rowid, new.title, new.description, new.skills);
+    END
+    ''')
+    rebuild_search_index(conn)
+
+def _migration_5_job_signatures(conn):
+    """MinHash signatures and LSH bands of graded jobs, for near-duplicate detection."""
+    conn.execute('''
+    CREATE TABLE job_signatures (
+        job_id TEXT PRIMARY KEY,
+        signature BLOB NOT NULL,
+        score REAL,
+        reasoning TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    # Clustered on band_key, so a lookup is one index seek per band
+    conn.execute('''
+    CREATE TABLE job_signature_bands (
+        band_key INTEGER NOT NULL,
+        job_id TEXT NOT NULL,
+        PRIMARY KEY (band_key, job_id)
+    ) WITHOUT ROWID
+    ''')
+    conn.execute("CREATE INDEX idx_job_signature_bands_job_id ON job_signature_bands (job_id)")
+
+def _migration_6_pipeline_stages(conn):
+    """Per-job pipeline stage, grading reasoning and application timestamps."""
+    conn.execute("ALTER TABLE jobs ADD COLUMN stage TEXT NOT NULL DEFAULT 'fetched'")
+    conn.execute("ALTER TABLE jobs ADD COLUMN reasoning TEXT")
+    conn.execute("ALTER TABLE jobs ADD COLUMN graded_at TIMESTAMP")
+    conn.execute("ALTER TABLE jobs ADD COLUMN application_generated_at TIMESTAMP")
+    conn.execute("UPDATE jobs SET stage = 'graded' WHERE score IS NOT NULL")
+    conn.execute("UPDATE jobs SET stage = 'application_generated' WHERE application IS NOT NULL")
+    conn.execute("CREATE INDEX idx_jobs_stage ON jobs (stage, created_at, job_id)")
+
+def _migration_7_jobs_archive(conn):
+    """Compressed cold storage for jobs past the retention window."""
+    conn.execute('''
+    CREATE TABLE jobs_archive (
+        job_id TEXT PRIMARY KEY,
+        archived_month TEXT NOT NULL,
+        created_at TIMESTAMP,
+        published_at TEXT,
+        score REAL,
+        stage TEXT,
+        payload BLOB NOT NULL,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    conn.execute("CREATE INDEX idx_jobs_archive_month ON jobs_archive (archived_month)")
+
+def _migration_8_skills_and_clients(conn):
+    """Normalized skills, job_skills (inverted index) and clients tables."""
+    conn.execute('''
+    CREATE TABLE skills (
+        skill_id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+        job_count INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    # Posting lists: all jobs of a skill are adjacent in the primary key
+    conn.execute('''
+    CREATE TABLE job_skills (
+        skill_id INTEGER NOT NULL,
+        job_id TEXT NOT NULL,
+        PRIMARY KEY (skill_id, job_id)
+    ) WITHOUT ROWID
+    ''')
+    conn.execute("CREATE INDEX idx_job_skills_job_id ON job_skills (job_id)")
+    # The job search API exposes no client id, so clients are identified by company name
+    conn.execute('''
+    CREATE TABLE clients (
+        client_id INTEGER PRIMARY KEY,
+        company_name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+        total_posted_jobs INTEGER,
+        total_reviews INTEGER,
+        total_feedback REAL,
+        total_spent REAL,
+        first_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    conn.execute("CREATE INDEX idx_clients_total_spent ON clients (total_spent)")
+    conn.execute("CREATE INDEX idx_jobs_client_company_name ON jobs (client_company_name COLLATE NOCASE, created_at)")
+    conn.execute("CREATE INDEX idx_jobs_client_total_spent ON jobs (client_total_spent)")
+
+    conn.execute('''
+    CREATE TRIGGER jobs_skills_after_insert AFTER INSERT ON jobs WHEN json_valid(new.skills) BEGIN
+        INSERT OR IGNORE INTO skills (name) SELECT value FROM json_each(new.skills);
+        INSERT OR IGNORE INTO job_skills (skill_id, job_id)
+            SELECT skills.skill_id, new.job_id FROM json_each(new.skills) JOIN skills ON skills.name = json_each.value;
+        UPDATE skills SET job_count = job_count + 1
+            WHERE skill_id IN (SELECT skill_id FROM job_skills WHERE job_id = new.job_id);
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER jobs_skills_after_delete AFTER DELETE ON jobs BEGIN
+        UPDATE skills SET job_count = job_count - 1
+            WHERE skill_id IN (SELECT skill_id FROM job_skills WHERE job_id = old.job_id);
+        DELETE FROM job_skills WHERE job_id = old.job_id;
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER jobs_clients_after_insert AFTER INSERT ON jobs WHEN new.client_company_name IS NOT NULL BEGIN
+        INSERT INTO clients (company_name, total_posted_jobs, total_reviews, total_feedback, total_spent)
+        VALUES (new.client_company_name, new.client_total_posted_jobs, new.client_total_reviews, new.client_total_feedback, new.client_total_spent)
+        ON CONFLICT (company_name) DO UPDATE SET
+            total_posted_jobs = COALESCE(excluded.total_posted_jobs, total_posted_jobs),
+            total_reviews = COALESCE(excluded.total_reviews, total_reviews),
+            total_feedback = COALESCE(excluded.total_feedback, total_feedback),
+            total_spent = COALESCE(excluded.total_spent, total_spent),
+            last_seen_at = CURRENT_TIMESTAMP;
+    END
+    ''')
+
+    # Backfill from the jobs already stored
+    conn.execute("INSERT OR IGNORE INTO skills (name) SELECT value FROM jobs, json_each(jobs.skills) WHERE json_valid(jobs.skills)")
+    conn.execute('''
+    INSERT OR IGNORE INTO job_skills (skill_id, job_id)
+    SELECT skills.skill_id, jobs.job_id FROM jobs, json_each(jobs.skills) JOIN skills ON skills.name = json_each.value
+    WHERE json_valid(jobs.skills)
+    ''')
+    conn.execute("UPDATE skills SET job_count = (SELECT COUNT(*) FROM job_skills WHERE job_skills.skill_id = skills.skill_id)")
+    # The most recent job of each client carries its latest stats
+    conn.execute('''
+    INSERT OR IGNORE INTO clients (company_name, total_posted_jobs, total_reviews, total_feedback, total_spent, first_seen_at, last_seen_at)
+    SELECT client_company_name, client_total_posted_jobs, client_total_reviews, client_total_feedback, client_total_spent,
+           MIN(created_at), MAX(created_at)
+    FROM jobs WHERE client_company_name IS NOT NULL
+    GROUP BY client_company_name COLLATE NOCASE
+    ''')
+
+def _migration_9_watermark_gaps(conn):
+    """Spans of a query's feed an incremental fetch stopped before reaching (JSON list of [after, before])."""
+    conn.execute("ALTER TABLE query_watermarks ADD COLUMN gaps TEXT")
+
+def _migration_10_signature_fingerprints(conn):
+    """Fingerprint of the scoring prompt, profile and models each stored signature's score came from."""
+    conn.execute("ALTER TABLE job_signatures ADD COLUMN fingerprint TEXT")
+
+def _migration_11_contract_type_published_at_index(conn):
+    """Index backing iter_jobs(contract_type=..., order_by='published_at') without a sort."""
+    conn.execute("CREATE INDEX idx_jobs_contract_type_published_at ON jobs (contract_type, published_at, job_id)")
+
+# Ordered (version, migration) pairs; append new migrations, never edit applied ones
+MIGRATIONS = [
+    (1, _migration_1_initial_schema),
+    (2, _migration_2_job_information_columns),
+    (3, _migration_3_job_query_indexes),
+    (4, _migration_4_jobs_full_text_search),
+    (5, _migration_5_job_signatures),
+    (6, _migration_6_pipeline_stages),
+    (7, _migration_7_jobs_archive),
+    (8, _migration_8_skills_and_clients),
+    (9, _migration_9_watermark_gaps),
+    (10, _migration_10_signature_fingerprints),
+    (11, _migration_11_contract_type_published_at_index),
+]
+
+def get_schema_version(conn=None):
+    """Return the highest migration version applied to the database (0 if none)."""
+    conn = conn or get_connection()
+    conn.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER PRIMARY KEY, applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+    return conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+
+def apply_migrations(conn):
+    """Apply pending migrations in order, each in its own transaction."""
+    current_version = get_schema_version(conn)
+    for version, migration in MIGRATIONS:
+        if version <= current_version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while we waited for the lock
+            if conn.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,)).fetchone():
+                conn.rollback()
+                continue
+            migration(conn)
+            conn.execute("INSERT INTO schema_version (version) VALUES (?)", (version,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"INFO: Applied database migration {version} ({migration.__doc__.strip()})")
+
+# JobInformation field -> jobs table column
+JOB_COLUMNS = {
+    'id': 'job_id',
+    'title': 'title',
+    'publishedDateTime': 'published_at',
+    'description': 'description',
+    'durationLabel': 'duration_label',
+    'engagement': 'engagement',
+    'contractType': 'contract_type',
+    'hourlyBudgetMin': 'hourly_budget_min',
+    'hourlyBudgetMax': 'hourly_budget_max',
+    'weeklyBudget': 'weekly_budget',
+    'experienceLevel': 'experience_level',
+    'category': 'category',
+    'subcategory': 'subcategory',
+    'totalApplicants': 'total_applicants',
+    'preferredFreelancerLocation': 'preferred_locations',
+    'preferredFreelancerLocationMandatory': 'location_mandatory',
+    'skills': 'skills',
+    'clientCompanyName': 'client_company_name',
+    'clientTotalPostedJobs': 'client_total_posted_jobs',
+    'clientTotalReviews': 'client_total_reviews',
+    'clientTotalFeedback': 'client_total_feedback',
+    'clientTotalSpent': 'client_total_spent',
+}
+REAL_COLUMNS = {'hourly_budget_min', 'hourly_budget_max', 'weekly_budget', 'client_total_feedback', 'client_total_spent', 'score'}
+INTEGER_COLUMNS = {'total_applicants', 'client_total_posted_jobs', 'client_total_reviews'}
+BOOLEAN_COLUMNS = {'location_mandatory'}
+LIST_COLUMNS = {'preferred_locations', 'skills'}
+
+def _to_list(value):
+    """Lists may arrive as lists, JSON, or Python reprs after a CSV round trip."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    text = str(value).strip()
+    if text.startswith('['):
+        try:
+            return json.loads(text)
+        except ValueError:
+            try:
+                return list(ast.literal_eval(text))
+            except (ValueError, SyntaxError):
+                pass
+    return [item.strip() for item in text.split(',') if item.strip()]
+
+def _to_column_value(column, value):
+    """Convert a job field value to what is stored in `column`."""
+    if value == '':
+        value = None
+    if value is None:
+        return None
+    if column in REAL_COLUMNS:
+        return parse_money(value)
+    if column in INTEGER_COLUMNS:
+        number = parse_money(value)
+        return int(number) if number is not None else None
+    if column in BOOLEAN_COLUMNS:
+        return int(value.strip().lower() in ('true', '1', 'yes')) if isinstance(value, str) else int(bool(value))
+    if column in LIST_COLUMNS:
+        return json.dumps(_to_list(value))
+    return value
+
+def job_to_row(job):
+    """
+    Map a job to a jobs table row.
+
+    Accepts a JobInformation model, a JobRecord or a dict keyed by JobInformation
+    fields (e.g. a CSV row). Keys that already are column names (such as
+    'job_id' or 'score') are used as-is.
+
+    Returns:
+        dict: Column name -> typed value, for the keys present in `job`.
+    """
+    if hasattr(job, 'model_dump'):
+        job = job.model_dump()
+    table_columns = get_table_columns()
+    row = {}
+    for key, value in job.items():
+        column = JOB_COLUMNS.get(key, key)
+        if column in table_columns and column not in row:
+            row[column] = _to_column_value(column, value)
+    return row
+
+def row_to_job(row):
+    """
+    Map a jobs table row back to a dict keyed by JobInformation fields.
+
+    Columns without a JobInformation field (e.g. score, created_at) keep their column name.
+    """
+    row = dict(row)
+    job = {}
+    for field, column in JOB_COLUMNS.items():
+        if column in row:
+            value = row.pop(column)
+            if column in LIST_COLUMNS and value is not None:
+                value = json.loads(value)
+            elif column in BOOLEAN_COLUMNS and value is not None:
+                value = bool(value)
+            job[field] = value
+    job.update(row)
+    return job
 
 def job_exists(job_id):
     """Check if a job with the given ID already exists in the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT 1 FROM jobs WHERE job_id = ?", (job_id,))
-    exists = cursor.fetchone() is not None
-    
-    conn.close()
-    return exists
-
-def get_table_columns():
-    """Get the list of columns in the jobs table."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("PRAGMA table_info(jobs)")
-    columns = [row[1] for row in cursor.fetchall()]
-    
-    conn.close()
-    return columns
+    cursor = get_connection().execute("SELECT 1 FROM jobs WHERE job_id = ?", (job_id,))
+    return cursor.fetchone() is not None
+
+def get_table_columns(table="jobs"):
+    """Get the list of columns in a table (cached after the first lookup)."""
+    key = (DB_PATH, table)
+    if key not in _table_columns_cache:
+        cursor = get_connection().execute(f"PRAGMA table_info({table})")
+        _table_columns_cache[key] = [row[1] for row in cursor.fetchall()]
+    return _table_columns_cache[key]
 
 def save_job(job_data):
-    """Save a job to the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Extract job_id from link
-    job_id = job_data.get('job_id')
-    
-    # Check if job already exists
-    if job_exists(job_id):
-        conn.close()
-        return False
-    
-    # Get existing table columns
-    table_columns = get_table_columns()
-    
-    # Filter job_data to only include columns that exist in the table
-    filtered_job_data = {k: v for k, v in job_data.items() if k in table_columns}
-    
-    # Prepare columns and values for insertion
-    columns = ', '.join(filtered_job_data.keys())
-    placeholders = ', '.join(['?' for _ in filtered_job_data])
-    values = tuple(filtered_job_data.values())
-    
-    # Insert the job
-    cursor.execute(f"INSERT INTO jobs ({columns}) VALUES ({placeholders})", values)
-    
-    conn.commit()
-    conn.close()
-    return True
+    """Save a job to the database. Returns False if it already existed."""
+    return save_jobs([job_data]) == 1
 
 def save_jobs(jobs_data):
-    """Save multiple jobs to the database and return the number of new jobs saved."""
-    new_jobs_count = 0
-    
+    """
+    Save multiple jobs to the database and return the number of new jobs saved.
+
+    Jobs are mapped to rows with `job_to_row`. All jobs are inserted in a single
+    transaction; jobs whose job_id already exists are left untouched. Keys that
+    are not columns of the jobs table are ignored.
+    """
+    conn = get_connection()
+    with conn:
+        return insert_jobs(conn, jobs_data)
+
+# The insert_*/update_*/upsert_* functions take a `conn` and do not commit, so
+# several of them can be grouped into one transaction (see src/db_writer.py).
+
+def insert_jobs(conn, jobs_data):
+    """Insert jobs like `save_jobs` on `conn`, without committing. Returns the number of new jobs."""
+    table_columns = get_table_columns()
+    jobs_data = [job_to_row(job) for job in jobs_data]
+    jobs_data = [job for job in jobs_data if job.get('job_id')]
+    if not jobs_data:
+        return 0
+
+    # Only insert the columns present in the data, so column defaults still apply
+    present_keys = set()
     for job_data in jobs_data:
-        if save_job(job_data):
-            new_jobs_count += 1
-    
-    return new_jobs_count
+        present_keys.update(job_data.keys())
+    columns = [column for column in table_columns if column in present_keys]
+
+    placeholders = ', '.join('?' for _ in columns)
+    sql = f"INSERT INTO jobs ({', '.join(columns)}) VALUES ({placeholders}) ON CONFLICT(job_id) DO NOTHING"
+    values = [tuple(job_data.get(column) for column in columns) for job_data in jobs_data]
+
+    # rowcount only counts rows inserted into jobs, not the full-text index updates of its triggers
+    return conn.executemany(sql, values).rowcount
 
 def get_all_jobs():
-    """Get all jobs from the database."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT * FROM jobs ORDER BY created_at DESC")
-    rows = cursor.fetchall()
-    
-    # Convert rows to dictionaries
-    jobs = [dict(row) for row in rows]
-    
-    conn.close()
-    return jobs
+    """Get all jobs from the database, newest first. Prefer `iter_jobs` for large tables."""
+    return list(iter_jobs())
+
+JOB_ORDER_COLUMNS = ('created_at', 'published_at')
+
+def _build_job_filters(min_score=None, max_score=None, created_after=None, created_before=None,
+                       published_after=None, published_before=None, contract_type=None,
+                       min_budget=None, max_budget=None, has_application=None, stage=None):
+    """Translate iter_jobs filters into WHERE clauses and parameters."""
+    clauses = []
+    params = []
+    for clause, value in (
+        ("score >= ?", min_score),
+        ("score <= ?", max_score),
+        ("created_at >= ?", created_after),
+        ("created_at < ?", created_before),
+        ("published_at >= ?", published_after),
+        ("published_at < ?", published_before),
+        ("contract_type = ?", contract_type.upper() if contract_type else None),
+        # The job's hourly range has to overlap [min_budget, max_budget]
+        ("hourly_budget_max >= ?", min_budget),
+        ("hourly_budget_min <= ?", max_budget),
+        ("stage = ?", stage),
+    ):
+        if value is not None:
+            clauses.append(clause)
+            params.append(value)
+    if has_application is not None:
+        clauses.append("application IS NOT NULL" if has_application else "application IS NULL")
+    return clauses, params
+
+def _job_query(order_by, filters, after=None, limit=None):
+    """Build the SQL for one keyset page of iter_jobs."""
+    if order_by not in JOB_ORDER_COLUMNS:
+        raise ValueError(f"order_by must be one of {JOB_ORDER_COLUMNS}, got {order_by!r}")
+    clauses, params = _build_job_filters(**filters)
+    # Rows without a sort key cannot take part in keyset pagination
+    clauses.append(f"{order_by} IS NOT NULL")
+    if after is not None:
+        clauses.append(f"({order_by}, job_id) < (?, ?)")
+        params.extend(after)
+    sql = f"SELECT * FROM jobs WHERE {' AND '.join(clauses)} ORDER BY {order_by} DESC, job_id DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return sql, params
+
+def iter_jobs(order_by='created_at', page_size=500, as_job=False, **filters):
+    """
+    Stream jobs matching the given filters, newest first.
+
+    Pages are read with keyset pagination on (order_by, job_id), so each page is
+    an index range scan and no read transaction is held between pages.
+
+    Args:
+        order_by (str): 'created_at' (default) or 'published_at'; jobs with no
+            value in that column are skipped.
+        page_size (int): Number of rows read per query.
+        as_job (bool): Yield dicts keyed by JobInformation fields (see `row_to_job`)
+            instead of column names.
+        **filters: min_score, max_score, created_after, created_before,
+            published_after, published_before (timestamps as stored, upper bounds
+            exclusive), contract_type ('HOURLY' or 'FIXED'), min_budget, max_budget
+            (hourly rate range the job must overlap), has_application (bool) and
+            stage (one of the STAGE_* constants).
+
+    Yields:
+        dict: One job per row.
+    """
+    conn = get_connection()
+    after = None
+    while True:
+        sql, params = _job_query(order_by, filters, after, page_size)
+        rows = conn.execute(sql, params).fetchall()
+        for row in rows:
+            yield row_to_job(row) if as_job else dict(row)
+        if len(rows) < page_size:
+            return
+        after = (rows[-1][order_by], rows[-1]['job_id'])
+
+def explain_job_query(order_by='created_at', **filters):
+    """Return the EXPLAIN QUERY PLAN lines of an iter_jobs page, to check index use."""
+    sql, params = _job_query(order_by, filters, after=("", ""), limit=1)
+    cursor = get_connection().execute(f"EXPLAIN QUERY PLAN {sql}", params)
+    return [row['detail'] for row in cursor.fetchall()]
+
+def save_job_grades(graded_jobs):
+    """
+    Store the score and reasoning of graded jobs and move them to the graded stage.
+
+    Jobs without a score (failed grading) are left in their current stage, so
+    they are picked up again by the next run.
+    """
+    conn = get_connection()
+    with conn:
+        update_job_grades(conn, graded_jobs)
+
+def update_job_grades(conn, graded_jobs):
+    """Store job grades like `save_job_grades` on `conn`, without committing."""
+    values = [
+        (job['score'], job.get('reasoning'), STAGE_GRADED, STAGE_FETCHED, job.get('id') or job.get('job_id'))
+        for job in graded_jobs if job.get('score') is not None
+    ]
+    conn.executemany(
+        "UPDATE jobs SET score = ?, reasoning = ?, graded_at = CURRENT_TIMESTAMP, stage = ? WHERE stage = ? AND job_id = ?",
+        values
+    )
+
+def save_job_application(job_id, application):
+    """Store a generated application (JSON text) and move the job to its final stage."""
+    conn = get_connection()
+    with conn:
+        update_job_application(conn, job_id, application)
+
+def update_job_application(conn, job_id, application):
+    """Store an application like `save_job_application` on `conn`, without committing."""
+    conn.execute(
+        "UPDATE jobs SET application = ?, application_generated_at = CURRENT_TIMESTAMP, stage = ? WHERE job_id = ?",
+        (application, STAGE_APPLICATION_GENERATED, job_id)
+    )
+
+def count_jobs_by_stage():
+    """Return {stage: number of jobs} for the stored jobs."""
+    cursor = get_connection().execute("SELECT stage, COUNT(*) FROM jobs GROUP BY stage")
+    return {row[0]: row[1] for row in cursor.fetchall()}
+
+def get_query_watermark(search_query):
+    """
+    Get the high-water mark stored for a search query.
+
+    Returns:
+        dict: {'newest_published': str or None, 'seen_ids': list of recent job ids, newest first,
+        'gaps': list of [after, before] publish-time spans not fetched yet}, or None if the
+        query has never been fetched.
+    """
+    cursor = get_connection().execute(
+        "SELECT newest_published, seen_ids, gaps FROM query_watermarks WHERE search_query = ?", (search_query,)
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return {'newest_published': row[0], 'seen_ids': json.loads(row[1] or "[]"), 'gaps': json.loads(row[2] or "[]")}
+
+def save_query_watermark(search_query, newest_published, seen_ids, gaps=None):
+    """Store the high-water mark for a search query, keeping only the most recent job ids."""
+    conn = get_connection()
+    with conn:
+        upsert_query_watermark(conn, search_query, newest_published, seen_ids, gaps)
+
+def upsert_query_watermark(conn, search_query, newest_published, seen_ids, gaps=None):
+    """Store a watermark like `save_query_watermark` on `conn`, without committing."""
+    conn.execute(
+        """
+        INSERT INTO query_watermarks (search_query, newest_published, seen_ids, gaps, updated_at)
+        VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(search_query) DO UPDATE SET
+            newest_published = excluded.newest_published,
+            seen_ids = excluded.seen_ids,
+            gaps = excluded.gaps,
+            updated_at = excluded.updated_at
+        """,
+        (search_query, newest_published, json.dumps(list(seen_ids)[:MAX_WATERMARK_IDS]), json.dumps(list(gaps or [])))
+    )
+
+# Relative weight of title, description and skills matches in search ranking
+SEARCH_COLUMN_WEIGHTS = (10.0, 1.0, 5.0)
+
+def rebuild_search_index(conn=None):
+    """Rebuild the full-text index from the jobs table (e.g. after a VACUUM renumbered rowids)."""
+    conn = conn or get_connection()
+    conn.execute("INSERT INTO jobs_fts (jobs_fts) VALUES ('rebuild')")
+
+def to_fts_query(text):
+    """
+    Turn free text such as "LangGraph + RAG" into an FTS5 query matching all its terms.
+
+    Every term is quoted, so characters that are FTS5 syntax (e.g. in "C++" or
+    "node.js") are matched literally instead of raising a syntax error.
+    """
+    terms = [term for term in text.split() if term.upper() not in ('AND', '+', '&')]
+    return ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+def search_jobs(query, limit=20, raw=False):
+    """
+    Full-text search over job titles, descriptions and skills.
+
+    Args:
+        query (str): Search terms; all must match. With `raw=True` it is passed
+            to FTS5 unchanged, so the full query syntax (OR, NOT, NEAR, prefix*) is available.
+        limit (int): Maximum number of results.
+
+    Returns:
+        list: Dicts with job_id, title, score, published_at, rank (bm25, lower
+        is better) and snippet, best matches first.
+    """
+    match = query if raw else to_fts_query(query)
+    if not match:
+        return []
+    weights = ', '.join(str(weight) for weight in SEARCH_COLUMN_WEIGHTS)
+    cursor = get_connection().execute(
+        f"""
+        SELECT jobs.job_id, jobs.title, jobs.score, jobs.published_at,
+               bm25(jobs_fts, {weights}) AS rank,
+               snippet(jobs_fts, 1, '[', ']', '...', 16) AS snippet
+        FROM jobs_fts
+        JOIN jobs ON jobs.rowid = jobs_fts.rowid
+        WHERE jobs_fts MATCH ?
+        ORDER BY rank
+        LIMIT ?
+        """,
+        (match, limit)
+    )
+    return [dict(row) for row in cursor.fetchall()]
+
+def find_signature_candidates(band_keys, fingerprint, exclude_job_id=None):
+    """
+    Get the stored signatures sharing at least one LSH band key.
+
+    Args:
+        band_keys (list): LSH band keys of the job looked up.
+        fingerprint (str): Only signatures whose score was produced with this
+            scoring fingerprint are returned.
+        exclude_job_id (str): Job id left out of the candidates (the job itself).
+
+    Returns:
+        list: sqlite3.Row objects with job_id, signature, score and reasoning.
+    """
+    if not band_keys:
+        return []
+    placeholders = ', '.join('?' for _ in band_keys)
+    cursor = get_connection().execute(
+        f"""
+        SELECT job_id, signature, score, reasoning FROM job_signatures
+        WHERE job_id IN (SELECT job_id FROM job_signature_bands WHERE band_key IN ({placeholders}))
+          AND fingerprint = ? AND job_id != ?
+        """,
+        list(band_keys) + [fingerprint, str(exclude_job_id or '')]
+    )
+    return cursor.fetchall()
+
+def save_job_signatures(entries):
+    """
+    Store (job_id, signature, band_keys, score, reasoning, fingerprint) tuples, replacing older entries of the same job.
+    """
+    entries = list(entries)
+    if not entries:
+        return
+    conn = get_connection()
+    with conn:
+        insert_job_signatures(conn, entries)
+
+def insert_job_signatures(conn, entries):
+    """Store signatures like `save_job_signatures` on `conn`, without committing."""
+    conn.executemany("DELETE FROM job_signature_bands WHERE job_id = ?", [(entry[0],) for entry in entries])
+    conn.executemany(
+        "INSERT OR REPLACE INTO job_signatures (job_id, signature, score, reasoning, fingerprint) VALUES (?, ?, ?, ?, ?)",
+        [(job_id, signature, score, reasoning, fingerprint) for job_id, signature, _, score, reasoning, fingerprint in entries]
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO job_signature_bands (band_key, job_id) VALUES (?, ?)",
+        [(band_key, job_id) for job_id, _, band_keys, _, _, _ in entries for band_key in band_keys]
+    )
+
+def archive_old_jobs(keep_days, batch_size=1000):
+    """
+    Move jobs created more than `keep_days` days ago from jobs to jobs_archive.
+
+    Each archived job is stored as zlib-compressed JSON of its full row, keyed by
+    job_id and partitioned by the month it was created (archived_month). Archived
+    jobs leave the full-text index but keep their near-duplicate signatures.
+
+    Returns:
+        int: Number of jobs archived.
+    """
+    conn = get_connection()
+    cutoff = conn.execute("SELECT datetime('now', ?)", (f"-{int(keep_days)} days",)).fetchone()[0]
+    archived = 0
+    while True:
+        rows = conn.execute(
+            "SELECT * FROM jobs WHERE created_at < ? ORDER BY created_at, job_id LIMIT ?", (cutoff, batch_size)
+        ).fetchall()
+        if not rows:
+            return archived
+        with conn:
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO jobs_archive (job_id, archived_month, created_at, published_at, score, stage, payload)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (row['job_id'], (row['created_at'] or '')[:7], row['created_at'], row['published_at'], row['score'],
+                     row['stage'], zlib.compress(json.dumps(dict(row)).encode('utf-8'), 6))
+                    for row in rows
+                ]
+            )
+            conn.executemany("DELETE FROM jobs WHERE job_id = ?", [(row['job_id'],) for row in rows])
+        archived += len(rows)
+
+def get_archived_job(job_id):
+    """Return the full row of an archived job as a dict, or None if it is not archived."""
+    row = get_connection().execute("SELECT payload FROM jobs_archive WHERE job_id = ?", (job_id,)).fetchone()
+    if row is None:
+        return None
+    return json.loads(zlib.decompress(row[0]).decode('utf-8'))
+
+def get_database_size():
+    """Return the size in bytes of the database file and its write-ahead log."""
+    return sum(os.path.getsize(path) for path in (DB_PATH, DB_PATH + "-wal") if os.path.exists(path))
+
+def vacuum_database():
+    """
+    Return free pages to the file system and truncate the write-ahead log.
+
+    Databases created before incremental auto-vacuum was enabled are converted
+    once with a full VACUUM (which rewrites the whole file); afterwards only
+    `PRAGMA incremental_vacuum` runs, which just releases the free pages.
+    """
+    conn = get_connection()
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        print("INFO: Enabling incremental auto-vacuum; the first compaction rewrites the whole database.")
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        # VACUUM may renumber the rowids the full-text index refers to
+        with conn:
+            rebuild_search_index(conn)
+    else:
+        # A plain execute() steps the pragma once, which frees a single page;
+        # executescript() runs it to completion.
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        while free_pages:
+            conn.executescript("PRAGMA incremental_vacuum;")
+            remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if remaining >= free_pages:
+                break
+            free_pages = remaining
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+def find_jobs_with_skills(skills, match_all=True, min_client_spent=None, limit=100):
+    """
+    Find stored jobs requiring the given skills (case-insensitive), newest first.
+
+    With `match_all`, the posting list of the rarest skill is walked and the
+    other skills are checked with primary key lookups, so the cost depends on
+    the rarest skill rather than on the table size.
+
+    Args:
+        skills (list): Skill names, e.g. ["LangChain", "RAG"].
+        match_all (bool): Require every skill (True) or any of them (False).
+        min_client_spent (float): Only jobs whose client had spent at least this much.
+        limit (int): Maximum number of jobs returned.
+
+    Returns:
+        list: Job rows as dicts.
+    """
+    conn = get_connection()
+    skills = list(dict.fromkeys(skills))
+    if not skills:
+        return []
+    placeholders = ', '.join('?' for _ in skills)
+    found = conn.execute(
+        f"SELECT skill_id, job_count FROM skills WHERE name IN ({placeholders}) ORDER BY job_count", skills
+    ).fetchall()
+    if not found or (match_all and len(found) < len({skill.lower() for skill in skills})):
+        return []
+
+    params = []
+    if match_all:
+        rarest, others = found[0]['skill_id'], [row['skill_id'] for row in found[1:]]
+        conditions = ["postings.skill_id = ?"] + [
+            "EXISTS (SELECT 1 FROM job_skills WHERE skill_id = ? AND job_id = postings.job_id)" for _ in others
+        ]
+        params.extend([rarest] + others)
+        source = "job_skills AS postings"
+    else:
+        skill_ids = [row['skill_id'] for row in found]
+        source = f"(SELECT DISTINCT job_id FROM job_skills WHERE skill_id IN ({', '.join('?' for _ in skill_ids)})) AS postings"
+        params.extend(skill_ids)
+        conditions = []
+    if min_client_spent is not None:
+        conditions.append("jobs.client_total_spent >= ?")
+        params.append(min_client_spent)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    params.append(limit)
+    cursor = conn.execute(
+        f"""
+        SELECT jobs.* FROM {source}
+        JOIN jobs ON jobs.job_id = postings.job_id
+        {where}
+        ORDER BY jobs.created_at DESC
+        LIMIT ?
+        """,
+        params
+    )
+    return [dict(row) for row in cursor.fetchall()]
+
+def get_client_history(company_name, min_score=7.0):
+    """
+    Summarize a client's jobs stored in the database.
+
+    Returns:
+        dict: The client's latest stats plus jobs_seen, jobs_graded,
+        jobs_above_min_score, applications and hit_rate (applications / jobs
+        seen), or None if the client is unknown.
+    """
+    conn = get_connection()
+    client = conn.execute("SELECT * FROM clients WHERE company_name = ?", (company_name,)).fetchone()
+    if client is None:
+        return None
+    history = dict(client)
+    row = conn.execute(
+        """
+        SELECT COUNT(*) AS jobs_seen,
+               COUNT(score) AS jobs_graded,
+               SUM(score >= ?) AS jobs_above_min_score,
+               COUNT(application) AS applications,
+               AVG(score) AS average_score
+        FROM jobs WHERE client_company_name = ? COLLATE NOCASE
+        """,
+        (min_score, company_name)
+    ).fetchone()
+    history.update(dict(row))
+    history['jobs_above_min_score'] = history['jobs_above_min_score'] or 0
+    history['hit_rate'] = history['applications'] / history['jobs_seen'] if history['jobs_seen'] else 0.0
+    return history
@@ -0,0 +1,154 @@
+import asyncio
+import queue
+import threading
+import time
+
+from src import database
+
+# Sentinel asking the writer thread to commit what it has and stop
+_STOP = object()
+
+
+class AsyncDBWriter:
+    """
+    Runs database writes on a dedicated thread so coroutines never block on SQLite.
+
+    Writes are the connection-level functions of `src/database.py`
+    (`insert_jobs`, `update_job_grades`, ...). The writer thread drains them
+    from a queue and group-commits them: a transaction is committed once
+    `batch_size` writes are pending or `flush_interval` seconds after its first
+    write, whichever comes first. The queue holds at most `max_pending` writes;
+    `submit` waits for room, which slows producers down when the database
+    cannot keep up.
+
+    Use it as an async context manager, or call `start` and `close`:
+
+        async with AsyncDBWriter() as writer:
+            await writer.submit(database.insert_jobs, jobs)
+            await writer.flush()
+    """
+
+    def __init__(self, batch_size=500, flush_interval=0.5, max_pending=10_000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._queue = queue.Queue()
+        self._slots = None
+        self._loop = None
+        self._thread = None
+        self.stats = {"writes": 0, "commits": 0, "failed_writes": 0, "max_batch": 0}
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def start(self):
+        """Start the writer thread; must be called from the event loop that submits writes."""
+        if self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(self.max_pending)
+        # The writer thread opens its own connection to the database
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    async def submit(self, operation, *args):
+        """
+        Queue `operation(conn, *args)` and return once it is queued.
+
+        Returns:
+            asyncio.Future: Resolves to the operation's return value after its
+            transaction is committed (or to its exception). It can be ignored.
+        """
+        if self._thread is None:
+            self.start()
+        await self._slots.acquire()
+        future = self._loop.create_future()
+        self._queue.put((operation, args, future))
+        return future
+
+    async def flush(self):
+        """Wait until every write submitted so far is committed."""
+        if self._thread is None:
+            return
+        future = self._loop.create_future()
+        self._queue.put((None, (), future))
+        await future
+
+    async def close(self):
+        """Commit the pending writes and stop the writer thread."""
+        if self._thread is None:
+            return
+        await self.flush()
+        self._queue.put(_STOP)
+        await asyncio.get_running_loop().run_in_executor(None, self._thread.join)
+        self._thread = None
+
+    def _run(self):
+        database.ensure_db_exists()
+        conn = database.get_connection()
+        try:
+            while True:
+                batch = [self._queue.get()]
+                deadline = time.monotonic() + self.flush_interval
+                # Keep collecting until the batch is full, the time is up, or a flush/stop arrives
+                while len(batch) < self.batch_size and batch[-1] is not _STOP and batch[-1][0] is not None:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=timeout))
+                    except queue.Empty:
+                        break
+                stop = batch[-1] is _STOP
+                self._commit([item for item in batch if item is not _STOP], conn)
+                if stop:
+                    return
+        finally:
+            database.close_connection()
+
+    def _commit(self, batch, conn):
+        """Run a batch of writes in one transaction and resolve their futures."""
+        writes = [item for item in batch if item[0] is not None]
+        results = []
+        try:
+            with conn:
+                for operation, args, _ in writes:
+                    results.append(operation(conn, *args))
+            self.stats["commits"] += 1 if writes else 0
+        except Exception as e:
+            # Retry one by one, so a single bad write does not drop the rest of the batch
+            print(f"WARNING: Group commit of {len(writes)} database write(s) failed ({e}); retrying them individually.")
+            results = []
+            for operation, args, _ in writes:
+                try:
+                    with conn:
+                        results.append(operation(conn, *args))
+                    self.stats["commits"] += 1
+                except Exception as write_error:
+                    print(f"ERROR: Database write {operation.__name__} failed: {write_error}")
+                    self.stats["failed_writes"] += 1
+                    results.append(write_error)
+
+        self.stats["writes"] += len(writes)
+        self.stats["max_batch"] = max(self.stats["max_batch"], len(writes))
+        for (operation, _, future), result in zip(writes, results):
+            self._loop.call_soon_threadsafe(self._resolve, future, result, True)
+        for operation, _, future in batch:
+            if operation is None:
+                self._loop.call_soon_threadsafe(self._resolve, future, None, False)
+
+    def _resolve(self, future, result, releases_slot):
+        if releases_slot:
+            self._slots.release()
+        if future.done():
+            return
+        if isinstance(result, Exception):
+            future.set_exception(result)
+            # Nobody may await this future; mark the exception as retrieved
+            future.exception()
+        else:
+            future.set_result(result)
@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import re
+import zlib
+
+import numpy as np
+
+from src import database
+
+# 64 MinHash permutations split into 16 LSH bands of 4 rows: jobs with a
+# Jaccard similarity of 0.8 share a band with probability > 0.99.
+NUM_PERMUTATIONS = 64
+NUM_BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // NUM_BANDS
+
+# Estimated Jaccard similarity above which a job counts as a repost
+DEFAULT_SIMILARITY_THRESHOLD = 0.8
+
+# Texts shorter than this (in words) are too generic to compare reliably
+MIN_WORDS = 20
+
+# Multiply-shift hash functions ((a * x + b) mod 2**64) >> 32 with odd a; the
+# fixed seed keeps signatures comparable with the ones already stored.
+_rng = np.random.RandomState(20240601)
+_A = _rng.randint(0, 2 ** 63 - 1, size=(NUM_PERMUTATIONS, 1), dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_B = _rng.randint(0, 2 ** 63 - 1, size=(NUM_PERMUTATIONS, 1), dtype=np.uint64)
+_SHIFT = np.uint64(32)
+# Odd multipliers combining three word hashes into a shingle hash
+_SHINGLE_MULTIPLIERS = (np.uint64(0x9E3779B97F4A7C15), np.uint64(0xC2B2AE3D27D4EB4F))
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_text(text):
+    """Lowercase `text` and reduce it to its words, dropping punctuation and markup."""
+    return _WORD_PATTERN.findall((text or "").lower())
+
+
+def job_text(job):
+    """The text a job is compared on: its title and description."""
+    return f"{job.get('title') or ''} {job.get('description') or ''}"
+
+
+def minhash_signature(text):
+    """
+    Compute the MinHash signature of the word 3-shingles of `text`.
+
+    Returns:
+        numpy.ndarray: NUM_PERMUTATIONS uint32 values, or None if the text has
+        fewer than MIN_WORDS words.
+    """
+    words = normalize_text(text)
+    if len(words) < MIN_WORDS:
+        return None
+    # Hash every word once and combine neighbours into shingle hashes (uint64 arithmetic wraps)
+    word_hashes = np.fromiter((zlib.crc32(word.encode("utf-8")) for word in words), dtype=np.uint64, count=len(words))
+    shingles = np.unique(
+        word_hashes[:-2] * _SHINGLE_MULTIPLIERS[0] + word_hashes[1:-1] * _SHINGLE_MULTIPLIERS[1] + word_hashes[2:]
+    )
+    with np.errstate(over="ignore"):
+        permuted = (_A * shingles + _B) >> _SHIFT
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def scoring_fingerprint(scoring_system_prompt, model, strong_model=None, borderline_band=None):
+    """
+    Identify how scores are produced: the scoring prompt (which embeds the
+    profile), the model and, for a cascade, the strong model and its band.
+
+    Stored scores are only reused by runs with the same fingerprint, so editing
+    the profile or switching models does not resurface stale scores.
+    """
+    parts = [scoring_system_prompt or "", model or ""]
+    if strong_model:
+        parts += [strong_model, repr(tuple(borderline_band or ()))]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def band_keys(signature):
+    """Hash each LSH band of a signature (together with the band index) to a signed 64-bit key."""
+    keys = []
+    for band, start in enumerate(range(0, NUM_PERMUTATIONS, ROWS_PER_BAND)):
+        digest = hashlib.blake2b(bytes([band]) + signature[start:start + ROWS_PER_BAND].tobytes(), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "little", signed=True))
+    return keys
+
+
+class NearDuplicateIndex:
+    """
+    Finds graded jobs that a new job is a near-duplicate (e.g. a repost) of.
+
+    Signatures and LSH band keys are stored in the job_signatures and
+    job_signature_bands tables of the jobs database, so the index persists
+    between runs. A lookup is one indexed query for the 16 band keys plus a
+    vectorized comparison with the few candidates sharing a band. Only scores
+    stored under the same `fingerprint` (see `scoring_fingerprint`) are
+    reused, and a job never matches its own stored signature (e.g. when it is
+    re-graded).
+    """
+
+    def __init__(self, threshold=DEFAULT_SIMILARITY_THRESHOLD, fingerprint=""):
+        self.threshold = threshold
+        self.fingerprint = fingerprint
+        self.stats = {"lookups": 0, "duplicates": 0, "skipped": 0}
+        # Jobs registered by find(register=True) that are not graded yet: band key -> [(job, signature)]
+        self._pending_bands = {}
+        # id(registered job) -> its band keys, and the futures of the jobs waiting for its score
+        self._pending_keys = {}
+        self._followers = {}
+        # Registered jobs already graded, kept until their signature is stored
+        self._released = set()
+        database.ensure_db_exists()
+
+    def find(self, job, register=False):
+        """
+        Find the most similar graded job above the threshold.
+
+        With `register=True`, jobs previously registered this way (and still
+        being graded) are searched too, and a job without any match is
+        registered, so reposts among jobs graded concurrently are grouped.
+
+        Returns:
+            dict: {'job_id', 'similarity', 'score', 'reasoning'} of a graded match,
+            {'job_id', 'similarity', 'pending_job'} of a registered job, or None.
+        """
+        signature = minhash_signature(job_text(job))
+        if signature is None:
+            self.stats["skipped"] += 1
+            return None
+        self.stats["lookups"] += 1
+        keys = band_keys(signature)
+        job_id = job.get("id") or job.get("job_id")
+
+        match = None
+        candidates = database.find_signature_candidates(keys, self.fingerprint, job_id)
+        if candidates:
+            matrix = np.frombuffer(b"".join(row["signature"] for row in candidates), dtype=np.uint32).reshape(len(candidates), NUM_PERMUTATIONS)
+            similarities = np.count_nonzero(matrix == signature, axis=1) / NUM_PERMUTATIONS
+            best = int(similarities.argmax())
+            row = candidates[best]
+            if similarities[best] >= self.threshold and row["score"] is not None:
+                match = {"job_id": row["job_id"], "similarity": float(similarities[best]), "score": row["score"], "reasoning": row["reasoning"]}
+
+        if match is None and register:
+            for key in keys:
+                for pending_job, pending_signature in self._pending_bands.get(key, ()):
+                    similarity = float(np.count_nonzero(pending_signature == signature)) / NUM_PERMUTATIONS
+                    if similarity >= self.threshold and (match is None or similarity > match["similarity"]):
+                        match = {"job_id": pending_job.get("id") or pending_job.get("job_id"), "similarity": similarity}
+                        if id(pending_job) in self._released:
+                            match.update(score=pending_job["score"], reasoning=pending_job.get("reasoning"))
+                        else:
+                            match["pending_job"] = pending_job
+            if match is None:
+                self._pending_keys[id(job)] = keys
+                for key in keys:
+                    self._pending_bands.setdefault(key, []).append((job, signature))
+
+        if match is not None:
+            self.stats["duplicates"] += 1
+        return match
+
+    def follow(self, pending_job):
+        """
+        Wait for a job registered by `find(register=True)` to be graded.
+
+        Returns:
+            asyncio.Future: Resolved with the graded job dict by `release`. The
+            score is None if grading it failed, and the waiting job should then
+            be graded on its own.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._followers.setdefault(id(pending_job), []).append(future)
+        return future
+
+    def release(self, job, stored=None):
+        """
+        Resolve the futures waiting for a graded (or failed) job.
+
+        A job with a score is matched like a stored graded job until `stored`
+        (the future of its signature write) is done, so reposts read meanwhile
+        reuse its score too; other jobs are unregistered right away. Releasing
+        a job again, or one that was never registered, does nothing.
+        """
+        for future in self._followers.pop(id(job), ()):
+            if not future.done():
+                future.set_result(job)
+        if id(job) not in self._pending_keys or id(job) in self._released:
+            return
+        if stored is not None and job.get("score") is not None:
+            self._released.add(id(job))
+            stored.add_done_callback(lambda _: self._unregister(job))
+        else:
+            self._unregister(job)
+
+    def _unregister(self, job):
+        self._released.discard(id(job))
+        for key in self._pending_keys.pop(id(job), ()):
+            entries = [entry for entry in self._pending_bands.get(key, ()) if entry[0] is not job]
+            if entries:
+                self._pending_bands[key] = entries
+            else:
+                self._pending_bands.pop(key, None)
+
+    def signature_entries(self, jobs):
+        """Build the `insert_job_signatures` entries of graded jobs (dicts with 'score' and 'reasoning')."""
+        entries = []
+        for job in jobs:
+            job_id = job.get("id") or job.get("job_id")
+            signature = minhash_signature(job_text(job))
+            if not job_id or signature is None or job.get("score") is None:
+                continue
+            entries.append((str(job_id), signature.tobytes(), band_keys(signature), job["score"], job.get("reasoning"), self.fingerprint))
+        return entries
+
+    def add(self, jobs):
+        """Remember graded jobs so later reposts can reuse their score (commits right away)."""
+        database.save_job_signatures(self.signature_entries(jobs))
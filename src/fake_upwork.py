@@ -0,0 +1,254 @@
+import base64
+import random
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+
+# Ids of generated jobs start here so they look like real Upwork ids
+JOB_ID_OFFSET = 1_000_000_000
+# Publish time of the oldest generated job; each newer job is one minute later
+FEED_START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+_TITLES = ["AI agent developer", "LangChain expert", "RAG chatbot", "Python automation", "LLM integration", "Data pipeline engineer"]
+_SKILLS = ["Python", "LangChain", "LangGraph", "OpenAI API", "FastAPI", "React", "PostgreSQL", "AWS", "Docker", "Pinecone"]
+_EXPERIENCE_LEVELS = ["ENTRY_LEVEL", "INTERMEDIATE", "EXPERT"]
+
+
+class FakeUpworkTransport:
+    """
+    Offline stand-in for the Upwork GraphQL API, for load testing the fetch stage.
+
+    Plugs into `UpworkJobScraper(transport=...)` and serves
+    `marketplaceJobPostingsSearch` pages, aliased `marketplaceJobPosting`
+    detail lookups and `user { nid }` from a deterministic generated feed.
+    Nothing is stored per job, so feeds of 100k+ jobs cost no memory.
+
+    - Cursors are opaque and stable: they encode the last job returned, so jobs
+      added with `add_jobs` while a sweep is running do not shift later pages.
+    - `latency` (+ up to `latency_jitter`) seconds are slept per request, in the
+      calling worker thread, like a blocking HTTP call.
+    - Every `throttle_every`-th request, and a `throttle_probability` fraction of
+      requests, get a TOO_MANY_REQUESTS error response.
+    - Every `token_ttl_calls` requests the access token expires and is refreshed
+      transparently (as `OAuth2Session` does), taking `refresh_latency` seconds.
+    - A revoked token (`revoke_token()` or `token_revoked=True`) makes every
+      request fail with UNAUTHENTICATED until `refresh()` is called.
+
+    Each search query matches a deterministic `match_ratio` share of the feed,
+    so different queries overlap and exercise deduplication.
+    """
+
+    def __init__(self, num_jobs=10_000, match_ratio=0.5, latency=0.0, latency_jitter=0.0,
+                 throttle_every=None, throttle_probability=0.0, token_ttl_calls=None,
+                 refresh_latency=0.0, max_page_size=100, token_revoked=False, seed=0):
+        self.num_jobs = num_jobs
+        self.match_ratio = match_ratio
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.throttle_every = throttle_every
+        self.throttle_probability = throttle_probability
+        self.token_ttl_calls = token_ttl_calls
+        self.refresh_latency = refresh_latency
+        self.max_page_size = max_page_size
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._calls_since_refresh = 0
+        self._token_generation = 0
+        self.token = self._new_token()
+        self.token_revoked = token_revoked
+        self.stats = {"requests": 0, "search_pages": 0, "jobs_served": 0, "detail_lookups": 0, "throttled": 0, "token_refreshes": 0, "auth_failures": 0}
+
+    def add_jobs(self, count):
+        """Publish `count` new jobs at the head of the feed."""
+        with self._lock:
+            self.num_jobs += count
+
+    def revoke_token(self):
+        """Invalidate the current access token, as a server-side revocation would."""
+        with self._lock:
+            self.token_revoked = True
+
+    def refresh(self):
+        """Exchange the refresh token for a new access token."""
+        with self._lock:
+            self._refresh_token_locked()
+        time.sleep(self.refresh_latency)
+
+    def execute(self, query):
+        """Answer a GraphQL request the way the Upwork API would."""
+        throttled, delay = self._start_request()
+        if delay:
+            time.sleep(delay)
+        if self.token_revoked:
+            with self._lock:
+                self.stats["auth_failures"] += 1
+            return {"errors": [{"message": "Unauthorized: invalid access token", "extensions": {"code": "UNAUTHENTICATED"}}]}
+        if throttled:
+            return {"errors": [{"message": "Too Many Requests", "extensions": {"code": "TOO_MANY_REQUESTS"}}]}
+
+        text = query.get("query", "")
+        variables = query.get("variables") or {}
+        if "marketplaceJobPostingsSearch(" in text:
+            return self._search(variables, lean="description" not in text)
+        if "marketplaceJobPosting(" in text:
+            return self._details(variables)
+        if "user" in text:
+            return {"data": {"user": {"nid": "offline-user"}}}
+        return {"errors": [{"message": "Unsupported query for the offline Upwork stand-in"}]}
+
+    def _new_token(self):
+        return {
+            "access_token": f"offline-access-{self._token_generation}",
+            "refresh_token": f"offline-refresh-{self._token_generation}",
+            "token_type": "Bearer",
+            "expires_at": time.time() + 3600,
+        }
+
+    def _refresh_token_locked(self):
+        self._token_generation += 1
+        self.token = self._new_token()
+        self.token_revoked = False
+        self.stats["token_refreshes"] += 1
+
+    def _start_request(self):
+        """Update counters and decide whether this request is throttled and how long it takes."""
+        with self._lock:
+            self.stats["requests"] += 1
+            delay = self.latency + (self._rng.uniform(0, self.latency_jitter) if self.latency_jitter else 0.0)
+
+            self._calls_since_refresh += 1
+            if self.token_ttl_calls and self._calls_since_refresh > self.token_ttl_calls:
+                self._refresh_token_locked()
+                self._calls_since_refresh = 1
+                delay += self.refresh_latency
+
+            throttled = bool(self.throttle_every and self.stats["requests"] % self.throttle_every == 0)
+            throttled = throttled or (self.throttle_probability > 0 and self._rng.random() < self.throttle_probability)
+            if throttled:
+                self.stats["throttled"] += 1
+            return throttled, delay
+
+    def _matches(self, query_key, index):
+        return ((index * 2654435761 + query_key) & 0xFFFFFFFF) < self.match_ratio * 0x100000000
+
+    def _search(self, variables, lean):
+        search_filter = variables.get("marketPlaceJobFilter") or {}
+        pagination = search_filter.get("pagination_eq") or {}
+        first = min(int(pagination.get("first") or 10), self.max_page_size)
+        after = pagination.get("after") or "0"
+        query_key = zlib.crc32((search_filter.get("titleExpression_eq") or "").encode("utf-8"))
+
+        try:
+            index = self.num_jobs - 1 if after == "0" else _decode_cursor(after) - 1
+        except ValueError:
+            return {"errors": [{"message": f"Invalid cursor: {after}"}]}
+
+        edges = []
+        while index >= 0 and len(edges) < first:
+            if self._matches(query_key, index):
+                edges.append({"node": self._make_node(index, lean), "cursor": _encode_cursor(index)})
+            index -= 1
+
+        with self._lock:
+            self.stats["search_pages"] += 1
+            self.stats["jobs_served"] += len(edges)
+        return {"data": {"marketplaceJobPostingsSearch": {
+            "totalCount": int(self.num_jobs * self.match_ratio),
+            "pageInfo": {"hasNextPage": index >= 0, "endCursor": edges[-1]["cursor"] if edges else None},
+            "edges": edges,
+        }}}
+
+    def _details(self, variables):
+        data = {}
+        for name, job_id in variables.items():
+            alias = "job" + name[len("id"):]
+            index = int(job_id) - JOB_ID_OFFSET
+            data[alias] = self._make_detail_node(index) if 0 <= index < self.num_jobs else None
+        with self._lock:
+            self.stats["detail_lookups"] += len(variables)
+        return {"data": data}
+
+    def _job_rng(self, index):
+        return random.Random(self.seed * 1_000_003 + index)
+
+    def _make_node(self, index, lean=False):
+        """Generate the search result node of job `index` (the same on every call)."""
+        rng = self._job_rng(index)
+        hourly = rng.random() < 0.6
+        node = {
+            "id": str(JOB_ID_OFFSET + index),
+            "title": f"{rng.choice(_TITLES)} #{index}",
+            "publishedDateTime": (FEED_START + timedelta(minutes=index)).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "engagement": rng.choice(["Less than 30 hrs/week", "30+ hrs/week"]),
+            "hourlyBudgetMin": {"currency": "USD", "displayValue": f"${rng.randint(10, 40)}.00"} if hourly else None,
+            "hourlyBudgetMax": {"currency": "USD", "displayValue": f"${rng.randint(40, 120)}.00"} if hourly else None,
+            "weeklyBudget": None,
+            "skills": [{"prettyName": name} for name in rng.sample(_SKILLS, 4)],
+        }
+        if lean:
+            return node
+        node.update({
+            "description": self._make_description(rng),
+            "durationLabel": rng.choice(["Less than 1 month", "1 to 3 months", "3 to 6 months"]),
+            "job": {
+                "contractTerms": {"contractType": "HOURLY" if hourly else "FIXED"},
+                "activityStat": {"jobActivity": {"lastClientActivity": None, "invitesSent": rng.randint(0, 10), "totalInvitedToInterview": rng.randint(0, 5), "totalUnansweredInvites": 0}},
+            },
+            "experienceLevel": rng.choice(_EXPERIENCE_LEVELS),
+            "category": "Web, Mobile & Software Dev",
+            "subcategory": "AI Apps & Integration",
+            "totalApplicants": rng.randint(0, 50),
+            "preferredFreelancerLocation": None,
+            "preferredFreelancerLocationMandatory": False,
+            "client": {
+                "companyName": None,
+                "totalPostedJobs": rng.randint(1, 100),
+                "totalReviews": rng.randint(0, 50),
+                "totalFeedback": round(rng.uniform(3, 5), 2),
+                "totalSpent": {"currency": "USD", "displayValue": f"${rng.randint(0, 200_000):,}"},
+            },
+        })
+        return node
+
+    def _make_detail_node(self, index):
+        """Generate the `marketplaceJobPosting` node of job `index`, consistent with its search node."""
+        node = self._make_node(index)
+        hourly = node["job"]["contractTerms"]["contractType"] == "HOURLY"
+        duration = {"engagementDuration": {"label": node["durationLabel"]}}
+        return {
+            "id": node["id"],
+            "content": {"description": node["description"]},
+            "contractTerms": {
+                "contractType": node["job"]["contractTerms"]["contractType"],
+                "experienceLevel": node["experienceLevel"],
+                "hourlyContractTerms": duration if hourly else None,
+                "fixedPriceContractTerms": None if hourly else duration,
+            },
+            "classification": {"category": {"preferredLabel": node["category"]}, "subCategory": {"preferredLabel": node["subcategory"]}},
+            "contractorSelection": {"location": {
+                "countries": node["preferredFreelancerLocation"] or [],
+                "localCheckRequired": node["preferredFreelancerLocationMandatory"],
+            }},
+            "totalApplicants": node["totalApplicants"],
+            "client": node["client"],
+        }
+
+    def _make_description(self, rng):
+        skills = ", ".join(rng.sample(_SKILLS, 3))
+        return f"We are looking for an engineer experienced with {skills}. " * rng.randint(3, 15)
+
+
+def _encode_cursor(index):
+    return base64.urlsafe_b64encode(f"job:{index}".encode("ascii")).decode("ascii")
+
+
+def _decode_cursor(cursor):
+    try:
+        prefix, index = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("ascii").split(":")
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}") from None
+    if prefix != "job":
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return int(index)
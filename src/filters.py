@@ -0,0 +1,102 @@
+import json
+import os
+
+import pandas as pd
+
+DEFAULT_FILTERS_PATH = "./files/job_filters.json"
+
+
+def _numeric(frame, column):
+    return pd.to_numeric(frame[column], errors="coerce")
+
+
+def _flag(frame, column):
+    return frame[column].astype(str).str.strip().str.lower().isin(("true", "1", "yes"))
+
+
+def _not_in(frame, column, allowed):
+    values = frame[column].astype(str).str.strip().str.upper()
+    return frame[column].notna() & (values != "") & ~values.isin([str(value).upper() for value in allowed])
+
+
+def _below_hourly_rate(frame, rate):
+    # The maximum posted rate is what the client is willing to pay; fall back to the minimum
+    posted_rate = _numeric(frame, "hourlyBudgetMax").fillna(_numeric(frame, "hourlyBudgetMin"))
+    return posted_rate < rate
+
+
+def _below_client_feedback(frame, feedback):
+    # New clients have no feedback yet, which says nothing about them
+    return (_numeric(frame, "clientTotalFeedback") < feedback) & (_numeric(frame, "clientTotalReviews") > 0)
+
+
+# Rule name -> (job fields it reads, function returning a boolean mask of the rejected rows).
+# A job whose field is missing is never rejected by that rule.
+RULES = {
+    "min_hourly_rate": (("hourlyBudgetMin", "hourlyBudgetMax"), _below_hourly_rate),
+    "max_applicants": (("totalApplicants",), lambda frame, value: _numeric(frame, "totalApplicants") > value),
+    "exclude_location_mandatory": (
+        ("preferredFreelancerLocationMandatory",),
+        lambda frame, value: _flag(frame, "preferredFreelancerLocationMandatory") & bool(value),
+    ),
+    "min_client_spent": (("clientTotalSpent",), lambda frame, value: _numeric(frame, "clientTotalSpent") < value),
+    "min_client_feedback": (("clientTotalFeedback", "clientTotalReviews"), _below_client_feedback),
+    "min_client_posted_jobs": (("clientTotalPostedJobs",), lambda frame, value: _numeric(frame, "clientTotalPostedJobs") < value),
+    "experience_levels": (("experienceLevel",), lambda frame, value: _not_in(frame, "experienceLevel", value)),
+    "contract_types": (("contractType",), lambda frame, value: _not_in(frame, "contractType", value)),
+}
+
+
+def load_job_filters(filename=DEFAULT_FILTERS_PATH):
+    """
+    Read hard-filter rules from a JSON file.
+
+    The file maps rule names (see `RULES`) to their value, e.g.
+    {"min_hourly_rate": 30, "max_applicants": 50}. Rules set to null are disabled.
+
+    Args:
+        filename (str): Path of the JSON file.
+
+    Returns:
+        dict: The enabled rules, or None if the file does not exist or enables none.
+
+    Raises:
+        ValueError: If the file is not a JSON object or names an unknown rule.
+    """
+    if not filename or not os.path.exists(filename):
+        return None
+    with open(filename, "r", encoding="utf-8") as file:
+        config = json.load(file)
+    if not isinstance(config, dict):
+        raise ValueError(f"Job filters file {filename} must contain a JSON object")
+    unknown = sorted(set(config) - set(RULES))
+    if unknown:
+        raise ValueError(f"Unknown job filter rule(s) in {filename}: {', '.join(unknown)}. Known rules: {', '.join(RULES)}")
+    return {name: value for name, value in config.items() if value is not None} or None
+
+
+def evaluate_job_filters(jobs, rules):
+    """
+    Evaluate hard-filter rules over a batch of jobs with vectorized column operations.
+
+    Args:
+        jobs (list): Job dicts (or JobRecord objects) with `JobInformation` field names.
+        rules (dict): Rule name -> value, as returned by `load_job_filters`.
+
+    Returns:
+        tuple: (name of the first rule rejecting each job, or None if it passes;
+        dict of rule name -> number of jobs it rejects).
+    """
+    rejected_by = [None] * len(jobs)
+    counts = {}
+    if not jobs or not rules:
+        return rejected_by, counts
+    columns = {column for name in rules for column in RULES[name][0]}
+    frame = pd.DataFrame({column: [job.get(column) for job in jobs] for column in columns})
+    for name, value in rules.items():
+        rejected = RULES[name][1](frame, value).to_numpy(dtype=bool)
+        counts[name] = int(rejected.sum())
+        for position in rejected.nonzero()[0]:
+            if rejected_by[position] is None:
+                rejected_by[position] = name
+    return rejected_by, counts
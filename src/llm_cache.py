@@ -0,0 +1,286 @@
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+
+from pydantic import BaseModel
+
+DEFAULT_LLM_CACHE_PATH = ".llm_cache.db"
+DEFAULT_TTL_SECONDS = 30 * 24 * 60 * 60
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+# Eviction trims the cache to this share of max_bytes, so it does not run on every write
+EVICTION_TARGET_RATIO = 0.9
+
+# Last-use times of cache hits are written in batches of this size instead of per hit
+TOUCH_FLUSH_SIZE = 256
+
+KIND_TEXT = "text"
+KIND_MODEL = "model"
+
+# Returned by LLMCache.get when nothing usable is cached (None is a valid cached value)
+MISS = object()
+
+CACHE_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+)
+
+
+def _sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def schema_fingerprint(response_format):
+    """
+    Identify the shape of the expected response.
+
+    Pydantic models are identified by their qualified name and a hash of their
+    JSON schema, so changing a model's fields invalidates its cached responses.
+
+    Args:
+        response_format: The pydantic model class passed to `ainvoke_llm`, or None.
+
+    Returns:
+        str: "text" for plain string responses, otherwise the schema fingerprint.
+    """
+    if response_format is None:
+        return KIND_TEXT
+    if isinstance(response_format, type) and issubclass(response_format, BaseModel):
+        return _model_fingerprint(response_format)
+    return f"{KIND_MODEL}:{_sha256(json.dumps(response_format, sort_keys=True, default=str))[:16]}"
+
+
+@lru_cache(maxsize=256)
+def _model_fingerprint(response_format):
+    schema = json.dumps(response_format.model_json_schema(), sort_keys=True)
+    return f"{response_format.__module__}.{response_format.__qualname__}:{_sha256(schema)[:16]}"
+
+
+def cache_key(model, system_prompt, user_message, response_format=None):
+    """Return the content address of an LLM request."""
+    parts = (model, _sha256(system_prompt or ""), _sha256(user_message or ""), schema_fingerprint(response_format))
+    return _sha256("\0".join(parts))
+
+
+class LLMCache:
+    """
+    On-disk, content-addressed cache of LLM responses.
+
+    Entries are keyed by the model, hashes of the system prompt and user message,
+    and the response schema. Plain string responses are stored as is; pydantic
+    structured outputs are stored as JSON and validated back into the model on a
+    hit, so callers get a fresh instance every time.
+
+    - Entries older than `ttl` seconds are ignored and removed when looked up.
+    - When the stored responses exceed `max_bytes`, the least recently used
+      entries are evicted. Last-use times of hits are buffered in memory and
+      written in batches, so a hit is a single indexed read.
+    """
+
+    def __init__(self, path=None, ttl=None, max_bytes=None):
+        self.path = path or os.getenv("LLM_CACHE_PATH", DEFAULT_LLM_CACHE_PATH)
+        if ttl is None:
+            ttl = float(os.getenv("LLM_CACHE_TTL", DEFAULT_TTL_SECONDS))
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("LLM_CACHE_MAX_MB", DEFAULT_MAX_BYTES / (1024 * 1024))) * 1024 * 1024)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "writes": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._touched = {}
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        for pragma in CACHE_PRAGMAS:
+            self._conn.execute(pragma)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response_schema TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used_at ON llm_cache(last_used_at)")
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM llm_cache").fetchone()[0]
+
+    def get(self, model, system_prompt, user_message, response_format=None):
+        """
+        Look up the cached response of an LLM request.
+
+        Returns:
+            The cached string or pydantic model instance, or `MISS`.
+        """
+        key = cache_key(model, system_prompt, user_message, response_format)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return MISS
+            response, created_at = row
+            if self.ttl and now - created_at > self.ttl:
+                self._delete_locked(key)
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return MISS
+            self._touched[key] = now
+            if len(self._touched) >= TOUCH_FLUSH_SIZE:
+                self._flush_touched_locked()
+
+        try:
+            value = self._deserialize(response, response_format)
+        except ValueError as e:
+            print(f"WARNING: Ignoring unreadable LLM cache entry {key[:12]}: {e}")
+            with self._lock:
+                self._delete_locked(key)
+                self.stats["misses"] += 1
+            return MISS
+        with self._lock:
+            self.stats["hits"] += 1
+        return value
+
+    def put(self, model, system_prompt, user_message, response_format, response):
+        """Store the response of an LLM request. None responses are not cached."""
+        if response is None:
+            return
+        key = cache_key(model, system_prompt, user_message, response_format)
+        payload = response.model_dump_json() if isinstance(response, BaseModel) else str(response)
+        size = len(payload.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute("SELECT size_bytes FROM llm_cache WHERE cache_key = ?", (key,)).fetchone()
+            with self._conn:
+                self._conn.execute(
+                    """
+                    INSERT OR REPLACE INTO llm_cache (cache_key, model, response_schema, response, size_bytes, created_at, last_used_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (key, model, schema_fingerprint(response_format), payload, size, now, now),
+                )
+            self._total_bytes += size - (previous[0] if previous else 0)
+            self._touched.pop(key, None)
+            self.stats["writes"] += 1
+            if self.max_bytes and self._total_bytes > self.max_bytes:
+                self._evict_locked()
+
+    def clear(self):
+        """Remove every cached response."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM llm_cache")
+            self._touched.clear()
+            self._total_bytes = 0
+
+    def summary(self):
+        """Return the hit/miss counters together with the cache size."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+                "entries": entries,
+                "size_bytes": self._total_bytes,
+            }
+
+    def close(self):
+        """Write buffered last-use times and close the database."""
+        with self._lock:
+            if self._conn is None:
+                return
+            self._flush_touched_locked()
+            self._conn.close()
+            self._conn = None
+
+    def _deserialize(self, response, response_format):
+        if response_format is None:
+            return response
+        if isinstance(response_format, type) and issubclass(response_format, BaseModel):
+            return response_format.model_validate_json(response)
+        return json.loads(response)
+
+    def _delete_locked(self, key):
+        row = self._conn.execute("SELECT size_bytes FROM llm_cache WHERE cache_key = ?", (key,)).fetchone()
+        with self._conn:
+            self._conn.execute("DELETE FROM llm_cache WHERE cache_key = ?", (key,))
+        if row:
+            self._total_bytes -= row[0]
+        self._touched.pop(key, None)
+
+    def _flush_touched_locked(self):
+        if not self._touched:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE llm_cache SET last_used_at = MAX(last_used_at, ?) WHERE cache_key = ?",
+                [(used_at, key) for key, used_at in self._touched.items()],
+            )
+        self._touched.clear()
+
+    def _evict_locked(self):
+        """Delete least recently used entries until the cache is below its target size."""
+        self._flush_touched_locked()
+        target = int(self.max_bytes * EVICTION_TARGET_RATIO)
+        with self._conn:
+            cursor = self._conn.execute("SELECT cache_key, size_bytes FROM llm_cache ORDER BY last_used_at")
+            victims = []
+            for key, size in cursor:
+                if self._total_bytes <= target:
+                    break
+                victims.append((key,))
+                self._total_bytes -= size
+            cursor.close()
+            self._conn.executemany("DELETE FROM llm_cache WHERE cache_key = ?", victims)
+            evicted = len(victims)
+        self.stats["evictions"] += evicted
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """
+    Return the process-wide LLM cache, creating it on first use.
+
+    Returns:
+        LLMCache: The cache, or None if disabled with `LLM_CACHE_ENABLED=false`.
+    """
+    global _cache
+    if os.getenv("LLM_CACHE_ENABLED", "true").strip().lower() in ("0", "false", "no", "off"):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = LLMCache()
+            except sqlite3.Error as e:
+                print(f"WARNING: LLM response cache unavailable, calling the provider for every request: {e}")
+                os.environ["LLM_CACHE_ENABLED"] = "false"
+                return None
+            atexit.register(_cache.close)
+        return _cache
+
+
+def report_llm_cache_stats():
+    """Print the hit/miss stats of the LLM cache if it was used in this process."""
+    if _cache is None or _cache._conn is None:
+        return
+    stats = _cache.summary()
+    if not stats["hits"] and not stats["misses"]:
+        return
+    print(
+        f"INFO: LLM cache: {stats['hits']} hit(s), {stats['misses']} miss(es) "
+        f"({stats['hit_rate']:.0%} hit rate, {stats['expired']} expired, {stats['evictions']} evicted), "
+        f"{stats['entries']} entries, {stats['size_bytes'] / (1024 * 1024):.1f} MB"
+    )
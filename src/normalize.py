@@ -0,0 +1,160 @@
+import re
+from functools import lru_cache
+
+from src.structured_outputs import JobInformation
+
+# Field order of a normalized job, shared with the JobInformation model
+JOB_FIELDS = tuple(JobInformation.model_fields)
+
+_MONEY_PATTERN = re.compile(r"(-?\d+(?:\.\d+)?)\s*([kKmM]?)")
+_MONEY_MULTIPLIERS = {"": 1, "k": 1_000, "m": 1_000_000}
+
+
+@lru_cache(maxsize=4096)
+def _parse_money_string(display_value):
+    match = _MONEY_PATTERN.search(display_value.replace(",", ""))
+    if not match:
+        return None
+    return float(match.group(1)) * _MONEY_MULTIPLIERS[match.group(2).lower()]
+
+
+def parse_money(value):
+    """
+    Parse an Upwork Money `displayValue` into a float.
+
+    Handles plain numbers and strings such as "$25.00", "1,234.5" or "$10K+".
+
+    Args:
+        value: The display value (str, number or None).
+
+    Returns:
+        float: The amount, or None if it cannot be parsed.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return _parse_money_string(str(value))
+
+
+class JobRecord:
+    """
+    Compact, slotted representation of a normalized job.
+
+    Exposes the same keys as `JobInformation` and a small dict-like interface
+    (`job["id"]`, `job.get(...)`, `items()`), so it can be used wherever a job
+    dict is expected without paying for a per-job dict or pydantic model.
+    """
+
+    __slots__ = JOB_FIELDS
+
+    def __init__(self, id, title, publishedDateTime, description, durationLabel, engagement,
+                 contractType, hourlyBudgetMin, hourlyBudgetMax, weeklyBudget, experienceLevel,
+                 category, subcategory, totalApplicants, preferredFreelancerLocation,
+                 preferredFreelancerLocationMandatory, skills, clientCompanyName,
+                 clientTotalPostedJobs, clientTotalReviews, clientTotalFeedback, clientTotalSpent):
+        self.id = id
+        self.title = title
+        self.publishedDateTime = publishedDateTime
+        self.description = description
+        self.durationLabel = durationLabel
+        self.engagement = engagement
+        self.contractType = contractType
+        self.hourlyBudgetMin = hourlyBudgetMin
+        self.hourlyBudgetMax = hourlyBudgetMax
+        self.weeklyBudget = weeklyBudget
+        self.experienceLevel = experienceLevel
+        self.category = category
+        self.subcategory = subcategory
+        self.totalApplicants = totalApplicants
+        self.preferredFreelancerLocation = preferredFreelancerLocation
+        self.preferredFreelancerLocationMandatory = preferredFreelancerLocationMandatory
+        self.skills = skills
+        self.clientCompanyName = clientCompanyName
+        self.clientTotalPostedJobs = clientTotalPostedJobs
+        self.clientTotalReviews = clientTotalReviews
+        self.clientTotalFeedback = clientTotalFeedback
+        self.clientTotalSpent = clientTotalSpent
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def __repr__(self):
+        return f"JobRecord(id={self.id!r}, title={self.title!r})"
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def keys(self):
+        return JOB_FIELDS
+
+    def items(self):
+        return [(field, getattr(self, field)) for field in JOB_FIELDS]
+
+    def to_dict(self):
+        """Return the job as a plain dict, in `JobInformation` field order."""
+        return {field: getattr(self, field) for field in JOB_FIELDS}
+
+
+def normalize_job_edges(edges):
+    """
+    Normalize a page of `marketplaceJobPostingsSearch` edges in a single pass.
+
+    Nodes without an id are skipped. Money display values are parsed to floats.
+    Works for both the full and the lean listing node selections; fields that
+    were not requested are left as None.
+
+    Args:
+        edges (list): The `edges` list of a search response.
+
+    Returns:
+        list: A list of `JobRecord` objects.
+    """
+    records = []
+    append = records.append
+    skipped = 0
+    for edge in edges:
+        node = edge.get("node")
+        if not node or not node.get("id"):
+            skipped += 1
+            continue
+        get = node.get
+        job = get("job") or {}
+        client = get("client") or {}
+        hourly_min = get("hourlyBudgetMin")
+        hourly_max = get("hourlyBudgetMax")
+        weekly = get("weeklyBudget")
+        total_spent = client.get("totalSpent")
+        append(JobRecord(
+            get("id"),
+            get("title"),
+            get("publishedDateTime"),
+            get("description") or "",
+            get("durationLabel"),
+            get("engagement"),
+            (job.get("contractTerms") or {}).get("contractType"),
+            parse_money(hourly_min.get("displayValue")) if hourly_min else None,
+            parse_money(hourly_max.get("displayValue")) if hourly_max else None,
+            parse_money(weekly.get("displayValue")) if weekly else None,
+            get("experienceLevel"),
+            get("category"),
+            get("subcategory"),
+            get("totalApplicants"),
+            get("preferredFreelancerLocation"),
+            get("preferredFreelancerLocationMandatory", False),
+            [skill["prettyName"] for skill in get("skills") or () if skill and skill.get("prettyName")],
+            client.get("companyName"),
+            client.get("totalPostedJobs"),
+            client.get("totalReviews"),
+            client.get("totalFeedback"),
+            parse_money(total_spent.get("displayValue")) if total_spent else None,
+        ))
+    if skipped:
+        print(f"Skipped {skipped} job(s) with no ID.")
+    return records
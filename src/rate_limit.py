@@ -0,0 +1,101 @@
+import asyncio
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared by every Upwork API call.
+
+    Callers reserve a token and sleep until it becomes available, so bursts of
+    up to `capacity` requests go out immediately and the sustained rate never
+    exceeds `rate` requests per second. A throttling response from the API can
+    pause the bucket for every caller via `penalize`.
+
+    The state is guarded by a thread lock rather than an asyncio lock, so one
+    bucket can be shared across event loops and worker threads.
+    """
+
+    def __init__(self, rate=5.0, capacity=10):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self.total_acquired = 0
+        self.total_waits = 0
+        self.total_wait_seconds = 0.0
+        self.total_penalties = 0
+
+    def _reserve(self, tokens):
+        """Take `tokens` from the bucket and return how long the caller must wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= tokens
+            wait = max(-self._tokens / self.rate, self._blocked_until - now, 0.0)
+            self.total_acquired += tokens
+            if wait > 0:
+                self.total_waits += 1
+                self.total_wait_seconds += wait
+            return wait
+
+    async def acquire(self, tokens=1):
+        """Wait asynchronously until `tokens` requests may be sent."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self, tokens=1):
+        """Blocking variant of `acquire` for synchronous call sites."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    def penalize(self, seconds):
+        """Hold back every caller for `seconds`, e.g. after a throttling response."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self.total_penalties += 1
+
+    def snapshot(self):
+        """Return the current limiter state and counters."""
+        with self._lock:
+            now = time.monotonic()
+            available = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            return {
+                "rate_per_second": self.rate,
+                "capacity": self.capacity,
+                "available_tokens": round(available, 2),
+                "blocked_for_seconds": round(max(self._blocked_until - now, 0.0), 2),
+                "total_acquired": self.total_acquired,
+                "total_waits": self.total_waits,
+                "total_wait_seconds": round(self.total_wait_seconds, 2),
+                "total_penalties": self.total_penalties,
+            }
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter.
+
+    The delay before retry `attempt` (starting at 1) is drawn uniformly from
+    [0, min(max_delay, base_delay * 2 ** (attempt - 1))].
+    """
+
+    def __init__(self, max_attempts=5, base_delay=1.0, max_delay=30.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff_delay(self, attempt):
+        """Return the jittered delay in seconds before retry number `attempt`."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+# Shared by every UpworkJobScraper that is not given its own limiter, so
+# concurrent scrapers and queries draw from the same request budget.
+DEFAULT_RATE_LIMITER = TokenBucket()
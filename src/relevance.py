@@ -0,0 +1,131 @@
+import zlib
+from itertools import islice
+
+import numpy as np
+
+from src.dedup import normalize_text
+
+# Word unigrams and bigrams are hashed into this many TF-IDF features
+NUM_FEATURES = 2 ** 18
+
+# Common words that carry no signal about what a job is about
+STOP_WORDS = frozenset("""
+a about above after all also am an and any are as at be been being but by can could did do does doing for from
+had has have having he her here hers him his how i if in into is it its just me more most my no not of on once
+only or other our ours out over own same she should so some such than that the their theirs them then there
+these they this those through to too under until up very was we were what when where which while who whom why
+will with would you your yours
+""".split())
+
+_BIGRAM_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+_FEATURE_MULTIPLIER = np.uint64(0xC2B2AE3D27D4EB4F)
+_FEATURE_SHIFT = np.uint64(64 - 18)
+
+
+def relevance_text(job):
+    """The text a job is matched against the profile on: its title, skills and description."""
+    skills = job.get('skills') or ""
+    if isinstance(skills, (list, tuple)):
+        skills = " ".join(str(skill) for skill in skills)
+    return f"{job.get('title') or ''} {skills} {job.get('description') or ''}"
+
+
+def hashed_features(texts):
+    """
+    Hash the word unigrams and bigrams of each text into feature ids.
+
+    Returns:
+        tuple: (document index, feature id, occurrence count) numpy arrays, one
+        entry per distinct feature of each document.
+    """
+    words = []
+    doc_ids = []
+    for doc_id, text in enumerate(texts):
+        doc_words = [word for word in normalize_text(text) if word not in STOP_WORDS]
+        words.extend(doc_words)
+        doc_ids.extend([doc_id] * len(doc_words))
+    doc_ids = np.array(doc_ids, dtype=np.int64)
+    word_hashes = np.fromiter((zlib.crc32(word.encode("utf-8")) for word in words), dtype=np.uint64, count=len(words))
+    # Bigrams never span two documents
+    same_doc = doc_ids[:-1] == doc_ids[1:]
+    with np.errstate(over="ignore"):
+        bigrams = word_hashes[:-1][same_doc] * _BIGRAM_MULTIPLIER + word_hashes[1:][same_doc]
+        grams = np.concatenate((word_hashes, bigrams))
+        features = ((grams * _FEATURE_MULTIPLIER) >> _FEATURE_SHIFT).astype(np.int64)
+    keys, counts = np.unique(np.concatenate((doc_ids, doc_ids[:-1][same_doc])) * NUM_FEATURES + features, return_counts=True)
+    return keys // NUM_FEATURES, keys % NUM_FEATURES, counts
+
+
+class RelevanceScorer:
+    """
+    Scores jobs by TF-IDF cosine similarity to the freelancer profile.
+
+    Texts are embedded as sublinear term frequencies of hashed word unigrams and
+    bigrams. IDF weights come from the profile plus a fixed corpus given to
+    `fit` (e.g. every job of the input being graded), and stay frozen after
+    that, so a job's score does not depend on which jobs were scored before it.
+    An unfitted scorer weights each `score` call by the profile plus the jobs
+    of that call only, so its results depend on how jobs are batched. A whole
+    batch is scored with a handful of vectorized numpy operations, without any
+    network call.
+    """
+
+    def __init__(self, profile_text):
+        _, self._profile_features, self._profile_counts = hashed_features([profile_text])
+        self._idf = None
+
+    def _inverse_document_frequencies(self, jobs, chunk_size=5_000):
+        """IDF weights over the profile plus `jobs` (any iterable, read `chunk_size` jobs at a time)."""
+        document_frequencies = np.zeros(NUM_FEATURES, dtype=np.int64)
+        document_frequencies[self._profile_features] += 1
+        num_documents = 1
+        jobs = iter(jobs)
+        while True:
+            chunk = list(islice(jobs, chunk_size))
+            if not chunk:
+                break
+            _, features, _ = hashed_features([relevance_text(job) for job in chunk])
+            document_frequencies += np.bincount(features, minlength=NUM_FEATURES)
+            num_documents += len(chunk)
+        return np.log((1 + num_documents) / (1 + document_frequencies)) + 1.0
+
+    def fit(self, jobs):
+        """
+        Fit the IDF weights on the profile plus `jobs` and freeze them for every later `score` call.
+
+        Args:
+            jobs (iterable): Job dicts (or JobRecord objects); streamed, so a CSV
+                reader or a database cursor can be passed.
+
+        Returns:
+            RelevanceScorer: self.
+        """
+        self._idf = self._inverse_document_frequencies(jobs)
+        return self
+
+    def score(self, jobs):
+        """
+        Compute the similarity of each job to the profile.
+
+        Args:
+            jobs (list): Job dicts (or JobRecord objects).
+
+        Returns:
+            numpy.ndarray: One cosine similarity in [0, 1] per job.
+        """
+        if not jobs:
+            return np.zeros(0)
+        doc_ids, features, counts = hashed_features([relevance_text(job) for job in jobs])
+        idf = self._idf if self._idf is not None else self._inverse_document_frequencies(jobs)
+
+        profile = np.zeros(NUM_FEATURES)
+        profile_weights = (1.0 + np.log(self._profile_counts)) * idf[self._profile_features]
+        profile_norm = np.linalg.norm(profile_weights)
+        if profile_norm == 0:
+            return np.zeros(len(jobs))
+        profile[self._profile_features] = profile_weights / profile_norm
+
+        weights = (1.0 + np.log(counts)) * idf[features]
+        norms = np.sqrt(np.bincount(doc_ids, weights=weights ** 2, minlength=len(jobs)))
+        dots = np.bincount(doc_ids, weights=weights * profile[features], minlength=len(jobs))
+        return np.divide(dots, norms, out=np.zeros(len(jobs)), where=norms > 0)
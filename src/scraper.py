@@ -1,10 +1,18 @@
+import asyncio
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
+import requests
 import upwork
 from upwork.routers import graphql
 
-from src.structured_outputs import JobInformation
+from oauthlib.oauth2 import OAuth2Error
+
+from src.rate_limit import DEFAULT_RATE_LIMITER, RetryPolicy
+from src.token_store import TokenStore
+from src.normalize import normalize_job_edges, parse_money
 
 class UpworkConfigurationError(Exception):
     """Custom exception for Upwork API configuration errors."""
@@ -16,17 +24,231 @@ class UpworkApiError(Exception):
     pass
 
 
+class UpworkThrottledError(UpworkApiError):
+    """The Upwork API rejected a call because of rate limiting."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UpworkTransientError(UpworkApiError):
+    """A temporary Upwork API or network failure that is worth retrying."""
+    pass
+
+
+class UpworkAuthError(UpworkApiError):
+    """The Upwork API rejected the access token."""
+    pass
+
+
+THROTTLING_MARKERS = ("rate limit", "too many requests", "throttl", "quota")
+TRANSIENT_MARKERS = ("timeout", "timed out", "temporarily unavailable", "service unavailable", "bad gateway", "internal server error", "try again")
+THROTTLING_ERROR_CODES = {"RATE_LIMITED", "TOO_MANY_REQUESTS", "THROTTLED"}
+TRANSIENT_ERROR_CODES = {"INTERNAL_SERVER_ERROR", "SERVICE_UNAVAILABLE", "GATEWAY_TIMEOUT", "TIMEOUT"}
+AUTH_MARKERS = ("unauthorized", "unauthenticated", "invalid_token", "invalid token", "token expired", "token has expired", "expired token")
+AUTH_ERROR_CODES = {"UNAUTHENTICATED", "UNAUTHORIZED", "INVALID_TOKEN"}
+
+
+# Every field used to build a JobInformation from a search result node.
+FULL_JOB_NODE_FIELDS = """
+        id
+        title
+        publishedDateTime
+        description
+        durationLabel
+        engagement
+        job {
+            contractTerms {
+                contractType
+            }
+            activityStat {
+                jobActivity {
+                    lastClientActivity
+                    invitesSent
+                    totalInvitedToInterview
+                    totalUnansweredInvites
+                }
+            }
+        }
+        hourlyBudgetMin {
+            currency
+            displayValue
+        }
+        hourlyBudgetMax {
+            currency
+            displayValue
+        }
+        weeklyBudget {
+            currency
+            displayValue
+        }
+        experienceLevel
+        category
+        subcategory
+        totalApplicants
+        preferredFreelancerLocation
+        preferredFreelancerLocationMandatory
+        skills {
+            prettyName
+        }
+        client {
+            companyName
+            totalPostedJobs
+            totalReviews
+            totalFeedback
+            totalSpent {
+                currency
+                displayValue
+            }
+        }
+"""
+
+# Lean listing fields: enough to apply cheap filters before paying for details.
+LISTING_JOB_NODE_FIELDS = """
+        id
+        title
+        publishedDateTime
+        engagement
+        hourlyBudgetMin {
+            currency
+            displayValue
+        }
+        hourlyBudgetMax {
+            currency
+            displayValue
+        }
+        weeklyBudget {
+            currency
+            displayValue
+        }
+        skills {
+            prettyName
+        }
+"""
+
+# Fields fetched per job by `hydrate_job_details` for jobs found with the lean listing:
+# everything FULL_JOB_NODE_FIELDS has that LISTING_JOB_NODE_FIELDS leaves out.
+JOB_DETAIL_FIELDS = """
+        id
+        content {
+            description
+        }
+        contractTerms {
+            contractType
+            experienceLevel
+            hourlyContractTerms {
+                engagementDuration {
+                    label
+                }
+            }
+            fixedPriceContractTerms {
+                engagementDuration {
+                    label
+                }
+            }
+        }
+        classification {
+            category {
+                preferredLabel
+            }
+            subCategory {
+                preferredLabel
+            }
+        }
+        contractorSelection {
+            location {
+                countries
+                localCheckRequired
+            }
+        }
+        totalApplicants
+        client {
+            companyName
+            totalPostedJobs
+            totalReviews
+            totalFeedback
+            totalSpent {
+                currency
+                displayValue
+            }
+        }
+"""
+
+
+class UpworkGraphQLTransport:
+    """
+    Sends GraphQL requests through an authenticated `upwork.Client`.
+
+    A transport only needs an `execute(query)` method returning the decoded
+    response and a `token` attribute with the current OAuth token dict, so the
+    scraper can be pointed at a stand-in (see `src/fake_upwork.py`).
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    @property
+    def token(self):
+        return self.client.config.token if self.client and self.client.config else None
+
+    def execute(self, query):
+        """Execute a GraphQL request (blocking)."""
+        return graphql.Api(self.client).execute(query)
+
+    def refresh(self):
+        """
+        Force a token refresh on the next request.
+
+        The OAuth session refreshes expired tokens by itself, so the client is
+        rebuilt with the current token marked as expired.
+        """
+        config = self.client.config
+        config.token = dict(config.token, expires_at=time.time() - 1)
+        self.client = upwork.Client(config)
+
+
 class UpworkJobScraper:
     """
     Fetches Upwork job data using the Upwork API.
+
+    The underlying Upwork client is synchronous, so every GraphQL call is run
+    in a bounded thread pool to keep the event loop free while requests are in flight.
+
+    Pass a `transport` to bypass the OAuth setup and send requests elsewhere,
+    e.g. to the offline stand-in used for load tests.
+
+    Tokens are persisted in a `TokenStore`. A stored token that was validated
+    recently is used without the startup validation call; if the API then
+    rejects it, the token is refreshed and the request retried.
     """
 
-    def __init__(self):
+    def __init__(self, max_workers=8, rate_limiter=None, retry_policy=None, transport=None, token_store=None):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upwork-api")
+        self.rate_limiter = rate_limiter or DEFAULT_RATE_LIMITER
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.retry_stats = {"requests": 0, "retries": 0, "throttled": 0, "transient_errors": 0, "exhausted": 0}
+        self.query_watermarks = {}
+        # Injected transports only persist tokens when given an explicit store
+        self.token_store = token_store if transport is not None else (token_store or TokenStore())
+        self._auth_lock = threading.Lock()
+        self._auth_generation = 0
         self._initialize_credentials()
-        self._setup_client()
+        if transport is not None:
+            self.transport = transport
+            self.access_token = (transport.token or {}).get('access_token')
+            self.refresh_token = (transport.token or {}).get('refresh_token')
+        else:
+            self._setup_client()
+            self.transport = UpworkGraphQLTransport(self.client)
+
+    def close(self):
+        """Shut down the worker pool used for API calls."""
+        self._executor.shutdown(wait=False)
 
     def _initialize_credentials(self):
-        """Initialize credentials from environment variables."""
+        """Initialize credentials from the token store or environment variables."""
         self.client_id = os.getenv("UPWORK_CLIENT_ID")
         self.client_secret = os.getenv("UPWORK_CLIENT_SECRET")
         self.redirect_uri = os.getenv("UPWORK_REDIRECT_URI")
@@ -36,6 +258,13 @@ class UpworkJobScraper:
         self.client = None
         self.config = None
 
+        # Tokens in the store are written on every refresh, so they are newer than .env
+        self.stored_token = self.token_store.load() if self.token_store else None
+        if self.stored_token:
+            self.access_token = self.stored_token['access_token']
+            self.refresh_token = self.stored_token['refresh_token']
+            self.expires_at_str = str(self.stored_token['expires_at'])
+
     def _setup_client(self):
         """Set up the Upwork client with existing tokens or initiate OAuth flow."""
         config_data = self._get_base_config()
@@ -78,6 +307,9 @@ class UpworkJobScraper:
             self.config = upwork.Config(config_data)
             self.client = upwork.Client(self.config)
             
+            if self.stored_token and self.token_store.is_recently_validated(self.stored_token):
+                print("INFO: Using recently validated tokens from the token store; skipping the validation call.")
+                return True
             return self._validate_client_connection()
             
         except (ValueError, Exception) as e:
@@ -88,10 +320,12 @@ class UpworkJobScraper:
     def _validate_client_connection(self):
         """Validate the client connection by making a test API call."""
         try:
+            self.rate_limiter.acquire_sync()
             response = graphql.Api(self.client).execute({'query': "query { user { nid } }"})
             if 'message' in response:
                 raise UpworkApiError(f"API returned error message: {response['message']}")
             print(f"Successfully initialized Upwork client with existing tokens for user: {response.get('data', {}).get('user', {}).get('nid')}")
+            self._save_token(self.config.token)
             return True
         except Exception as e:
             print(f"WARNING: Failed to validate existing tokens: {e}")
@@ -163,7 +397,7 @@ class UpworkJobScraper:
         return callback_url
 
     def _update_client_with_tokens(self, temp_client):
-        """Update client with new tokens and print instructions."""
+        """Update client with new tokens and save them to the token store."""
         self.config = temp_client.config
         self.client = temp_client
         self.access_token = self.config.token['access_token']
@@ -171,37 +405,403 @@ class UpworkJobScraper:
 
         print("\n--- OAuth Successful! ---")
         print("Successfully obtained Upwork API tokens.")
-        print("IMPORTANT: Please save these tokens in your .env file for future sessions to avoid repeating this process:")
-        print(f"UPWORK_ACCESS_TOKEN=\"{self.access_token}\"")
-        print(f"UPWORK_REFRESH_TOKEN=\"{self.refresh_token}\"")
-        print(f"UPWORK_EXPIRES_AT=\"{self.config.token['expires_at']}\"")
+        if self._save_token(self.config.token):
+            print(f"Tokens were saved to {self.token_store.path} and will be reused in future sessions.")
+        else:
+            print("IMPORTANT: Please save these tokens in your .env file for future sessions to avoid repeating this process:")
+            print(f"UPWORK_ACCESS_TOKEN=\"{self.access_token}\"")
+            print(f"UPWORK_REFRESH_TOKEN=\"{self.refresh_token}\"")
+            print(f"UPWORK_EXPIRES_AT=\"{self.config.token['expires_at']}\"")
         print("-----------------------------\n")
 
-    async def fetch_jobs_from_api(self, search_query="AI agent Developer", num_jobs=10):
-        """Fetch jobs from Upwork API."""
-        print(f"INFO: Attempting to fetch jobs using live Upwork API for query: '{search_query}', count: {num_jobs}")
-        
+    def _save_token(self, token):
+        """Persist a token that was just used successfully. Returns whether it was saved."""
+        if not self.token_store or not token:
+            return False
         try:
-            api_response = await self._execute_job_search_query(search_query, num_jobs)
-            self._handle_token_refresh()
-            self._check_api_errors(api_response)
-            
-            jobs = self._extract_jobs_from_response(api_response)
-            if not jobs:
-                return []
-
-            return self._process_jobs(jobs)
+            self.token_store.save(token, validated_at=time.time())
+            return True
+        except OSError as e:
+            print(f"WARNING: Could not save tokens to {self.token_store.path}: {e}")
+            return False
 
-        except Exception as e:
-            self._handle_api_error(e)
+    async def fetch_jobs_from_api(self, search_query="AI agent Developer", num_jobs=None, page_size=50, max_pages=None, watermark=None, lean=False):
+        """
+        Stream jobs from the Upwork API, following the search result cursor.
+
+        Yields one list of normalized jobs per page so callers can start working
+        on the first page while later pages are still being fetched.
+
+        Results are sorted by recency, so when a `watermark` from a previous run is
+        given, pagination stops at the first job that is already known. Once the
+        query completes, its advanced watermark is available in
+        `self.query_watermarks[search_query]` for the caller to persist.
+        When `num_jobs` or `max_pages` stops paging before the previous watermark
+        is reached, the unfetched span is kept in the watermark's 'gaps' and
+        fetched by the next run, after the jobs newer than the watermark.
+
+        Args:
+            search_query (str): Title expression to search for.
+            num_jobs (int): Optional cap on the total number of jobs yielded.
+            page_size (int): Number of jobs requested per page.
+            max_pages (int): Optional cap on the number of pages requested.
+            watermark (dict): Optional {'newest_published', 'seen_ids', 'gaps'} from a previous fetch.
+            lean (bool): Request only the listing fields (see `hydrate_job_details`).
+        """
+        print(f"INFO: Attempting to fetch jobs using live Upwork API for query: '{search_query}', page size: {page_size}, max jobs: {num_jobs or 'all'}")
+
+        newest_published = (watermark or {}).get("newest_published")
+        known_ids = set((watermark or {}).get("seen_ids") or [])
+        gaps = [tuple(gap) for gap in (watermark or {}).get("gaps") or []]
+        fetched_ids = []
+        fetched_newest = newest_published
+        # Publish time of the last job examined, i.e. how far down the feed paging got
+        last_examined = None
+
+        cursor = "0"
+        pages_fetched = 0
+        jobs_yielded = 0
+        complete = False
+        while True:
+            if max_pages is not None and pages_fetched >= max_pages:
+                break
+            first = page_size
+            if num_jobs is not None:
+                first = min(page_size, num_jobs - jobs_yielded)
+                if first <= 0:
+                    break
+
+            try:
+                api_response = await self._execute_job_search_query(search_query, first, cursor, lean)
+                self._handle_token_refresh()
+                self._check_api_errors(api_response)
+                edges, page_info = self._extract_jobs_from_response(api_response)
+                jobs = self._process_jobs(edges)
+            except Exception as e:
+                self._handle_api_error(e)
+
+            pages_fetched += 1
+            jobs, reached_known_jobs, page_last_examined = self._split_at_watermark(jobs, newest_published, known_ids, gaps)
+            last_examined = page_last_examined or last_examined
+            if jobs:
+                jobs_yielded += len(jobs)
+                fetched_ids.extend(job["id"] for job in jobs)
+                fetched_newest = max(filter(None, [fetched_newest] + [job.get("publishedDateTime") for job in jobs]), default=None)
+                yield jobs
+
+            if reached_known_jobs:
+                print(f"INFO: Reached previously fetched jobs for query '{search_query}' after {pages_fetched} page(s).")
+                complete = True
+                break
+            cursor = page_info.get("endCursor")
+            if not edges or not page_info.get("hasNextPage") or not cursor:
+                complete = True
+                break
+
+        fetched_id_set = set(fetched_ids)
+        previous_ids = [job_id for job_id in (watermark or {}).get("seen_ids") or [] if job_id not in fetched_id_set]
+        if complete or not newest_published:
+            # Everything since the previous watermark was fetched (or this is the first fetch of the query)
+            remaining_gaps = []
+        elif last_examined is None:
+            remaining_gaps = gaps
+        else:
+            # Paging stopped early (num_jobs / max_pages): whatever was not reached yet stays to be fetched
+            remaining_gaps = []
+            for after, before in [(newest_published, None)] + gaps:
+                before = min(before, last_examined) if before else last_examined
+                if before >= after:
+                    remaining_gaps.append((after, before))
+            if remaining_gaps:
+                print(f"INFO: Stopped before reaching previously fetched jobs for query '{search_query}'; the rest will be fetched by the next incremental run.")
+        self.query_watermarks[search_query] = {
+            "newest_published": fetched_newest,
+            "seen_ids": fetched_ids + previous_ids,
+            "gaps": [list(gap) for gap in remaining_gaps],
+        }
 
-    async def _execute_job_search_query(self, search_query, num_jobs):
-        """Execute the GraphQL query to search for jobs."""
-        query = self._build_job_search_query(search_query, num_jobs)
-        return graphql.Api(self.client).execute(query)
+    def _split_at_watermark(self, jobs, newest_published, known_ids, gaps=()):
+        """
+        Keep the jobs newer than the watermark or inside an unfetched gap.
+
+        Returns:
+            tuple: (new jobs, whether paging got past everything still to fetch,
+            publish time of the last job examined).
+        """
+        if not newest_published and not known_ids:
+            return jobs, False, jobs[-1].get("publishedDateTime") if jobs else None
+        # Nothing older than this is still to be fetched
+        lowest_wanted = min([newest_published] + [after for after, _ in gaps]) if newest_published else None
+        new_jobs = []
+        last_examined = None
+        for job in jobs:
+            published = job.get("publishedDateTime")
+            if job["id"] in known_ids:
+                if not gaps:
+                    return new_jobs, True, last_examined
+                continue
+            if lowest_wanted and published and published < lowest_wanted:
+                return new_jobs, True, last_examined
+            last_examined = published or last_examined
+            if not published or not newest_published or published >= newest_published or any(after <= published <= before for after, before in gaps):
+                new_jobs.append(job)
+        return new_jobs, False, last_examined
+
+    async def fetch_jobs_for_queries(self, search_queries, num_jobs=None, page_size=50, max_pages=None, watermarks=None, lean=False):
+        """
+        Fetch several search queries concurrently and merge their results.
+
+        Every query is paginated independently; pages are yielded as soon as any
+        query produces them, with jobs already seen from another query removed.
+        At most 2 * max_workers pages wait to be consumed; queries pause when
+        the consumer falls behind, so memory stays bounded.
+        A query that fails is reported and skipped without stopping the others.
+
+        Args:
+            search_queries (list): Title expressions to search for.
+            num_jobs (int): Optional cap on the number of jobs fetched per query.
+            page_size (int): Number of jobs requested per page.
+            max_pages (int): Optional cap on the number of pages per query.
+            watermarks (dict): Optional mapping of search query to its stored watermark.
+            lean (bool): Request only the listing fields (see `hydrate_job_details`).
+        """
+        watermarks = watermarks or {}
+        pages = asyncio.Queue(maxsize=2 * self.max_workers)
+        done_marker = object()
+
+        async def run_query(search_query):
+            try:
+                async for job_page in self.fetch_jobs_from_api(search_query, num_jobs, page_size, max_pages, watermarks.get(search_query), lean):
+                    await pages.put(job_page)
+            except UpworkApiError as e:
+                print(f"ERROR: Query '{search_query}' failed and was skipped: {e}")
+            finally:
+                await pages.put(done_marker)
+
+        queries = list(dict.fromkeys(search_queries))
+        tasks = [asyncio.create_task(run_query(query)) for query in queries]
+        seen_ids = set()
+        try:
+            remaining = len(tasks)
+            while remaining:
+                job_page = await pages.get()
+                if job_page is done_marker:
+                    remaining -= 1
+                    continue
+                new_jobs = []
+                for job in job_page:
+                    if job["id"] not in seen_ids:
+                        seen_ids.add(job["id"])
+                        new_jobs.append(job)
+                if new_jobs:
+                    yield new_jobs
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        print(f"INFO: Fetched {len(seen_ids)} unique jobs across {len(queries)} queries.")
+
+    def get_fetch_stats(self):
+        """Return the rate limiter state and retry counters for this scraper."""
+        return {"rate_limiter": self.rate_limiter.snapshot(), "retries": dict(self.retry_stats)}
+
+    async def _execute_graphql(self, query):
+        """
+        Run a GraphQL request in the worker pool without blocking the event loop.
+
+        Every attempt first takes a token from the shared rate limiter. Throttling
+        and transient failures are retried with jittered exponential backoff;
+        a throttling response also pauses the limiter for every other caller.
+        """
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        auth_recoveries = 0
+        while True:
+            await self.rate_limiter.acquire()
+            self.retry_stats["requests"] += 1
+            auth_generation = self._auth_generation
+            try:
+                try:
+                    response = await loop.run_in_executor(self._executor, self.transport.execute, query)
+                except Exception as e:
+                    raise self._classify_exception(e) from e
+                self._raise_for_retryable_response(response)
+                return response
+            except UpworkAuthError as e:
+                if auth_recoveries >= 2:
+                    raise
+                auth_recoveries += 1
+                print(f"WARNING: Upwork API rejected the access token ({e}). Attempting to recover.")
+                await loop.run_in_executor(self._executor, self._recover_from_auth_error, auth_generation, auth_recoveries)
+            except (UpworkThrottledError, UpworkTransientError) as e:
+                attempt += 1
+                if attempt >= self.retry_policy.max_attempts:
+                    self.retry_stats["exhausted"] += 1
+                    raise
+                delay = self.retry_policy.backoff_delay(attempt)
+                if isinstance(e, UpworkThrottledError):
+                    self.retry_stats["throttled"] += 1
+                    delay = max(delay, e.retry_after or 0)
+                    self.rate_limiter.penalize(delay)
+                else:
+                    self.retry_stats["transient_errors"] += 1
+                self.retry_stats["retries"] += 1
+                print(f"WARNING: {type(e).__name__}: {e}. Retrying in {delay:.1f}s (attempt {attempt + 1}/{self.retry_policy.max_attempts}).")
+                await asyncio.sleep(delay)
+
+    def _recover_from_auth_error(self, auth_generation, recovery_attempt):
+        """
+        Get a working token after the API rejected the current one (blocking).
+
+        The first attempt refreshes the token through the transport; if that does
+        not help, the client is set up again from scratch, which may fall back to
+        the interactive OAuth flow. Concurrent requests that failed with the same
+        token share a single recovery.
+        """
+        with self._auth_lock:
+            if auth_generation != self._auth_generation:
+                return
+            self._auth_generation += 1
+            refresh = getattr(self.transport, "refresh", None)
+            if recovery_attempt == 1 and refresh is not None:
+                refresh()
+                return
+            if isinstance(self.transport, UpworkGraphQLTransport):
+                self._initialize_credentials()
+                # The stored token was just rejected, so it is not trusted without validation
+                self.stored_token = None
+                self._setup_client()
+                self.transport = UpworkGraphQLTransport(self.client)
+
+    def _classify_exception(self, error):
+        """Map an exception raised by the Upwork client to a retryable error where possible."""
+        if isinstance(error, UpworkApiError):
+            return error
+        if isinstance(error, OAuth2Error):
+            return UpworkAuthError(f"OAuth error: {error}")
+        if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+            status = error.response.status_code
+            if status == 401:
+                return UpworkAuthError(str(error))
+            if status == 429:
+                retry_after = error.response.headers.get("Retry-After")
+                return UpworkThrottledError(str(error), float(retry_after) if retry_after and retry_after.isdigit() else None)
+            if status >= 500:
+                return UpworkTransientError(str(error))
+        if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.ChunkedEncodingError)):
+            return UpworkTransientError(str(error))
+        if isinstance(error, ValueError):
+            # The gateway answers some 429/5xx responses with a non-JSON body.
+            return UpworkTransientError(f"Non-JSON response from Upwork API: {error}")
+        return error
+
+    def _raise_for_retryable_response(self, api_response):
+        """Raise a throttling or transient error if the response body reports one."""
+        if not isinstance(api_response, dict) or api_response.get("data"):
+            return
+        messages = []
+        codes = set()
+        if "message" in api_response:
+            messages.append(str(api_response["message"]))
+        for error in api_response.get("errors") or []:
+            messages.append(str(error.get("message", "")))
+            codes.add(str((error.get("extensions") or {}).get("code", "")).upper())
+        text = " ".join(messages).lower()
+        if codes & AUTH_ERROR_CODES or any(marker in text for marker in AUTH_MARKERS):
+            raise UpworkAuthError(f"Upwork API rejected the access token: {' '.join(messages)}")
+        if codes & THROTTLING_ERROR_CODES or any(marker in text for marker in THROTTLING_MARKERS):
+            raise UpworkThrottledError(f"Upwork API throttled the request: {' '.join(messages)}")
+        if codes & TRANSIENT_ERROR_CODES or any(marker in text for marker in TRANSIENT_MARKERS):
+            raise UpworkTransientError(f"Upwork API reported a temporary failure: {' '.join(messages)}")
+
+    async def _execute_job_search_query(self, search_query, page_size, cursor="0", lean=False):
+        """Execute the GraphQL query to search for one page of jobs."""
+        query = self._build_job_search_query(search_query, page_size, cursor, lean)
+        return await self._execute_graphql(query)
+
+    async def hydrate_job_details(self, jobs, batch_size=20):
+        """
+        Fill in the details of jobs fetched with the lean listing query.
+
+        Jobs are looked up by id in batches of `batch_size` (one aliased
+        `marketplaceJobPosting` lookup per job in a single request), with the
+        batches running concurrently. Every field the lean listing leaves out
+        (description, duration, contract type, experience level,
+        category, applicants, location preference and client stats) is merged
+        into the job dicts in place. Jobs of a batch whose lookup fails keep
+        their listing fields.
+
+        Args:
+            jobs (list): Normalized jobs from a lean listing.
+            batch_size (int): Number of jobs looked up per request.
+
+        Returns:
+            list: The same jobs, hydrated where their details could be fetched.
+        """
+        batches = [jobs[i:i + batch_size] for i in range(0, len(jobs), batch_size)]
+
+        async def hydrate_batch(batch):
+            query = self._build_job_details_query([job["id"] for job in batch])
+            api_response = await self._execute_graphql(query)
+            self._handle_token_refresh()
+            self._check_api_errors(api_response)
+            details = api_response.get("data") or {}
+            for index, job in enumerate(batch):
+                detail_node = details.get(f"job{index}")
+                if detail_node:
+                    self._apply_job_details(job, detail_node)
+                else:
+                    print(f"WARNING: No details returned for job {job['id']}.")
+
+        results = await asyncio.gather(*(hydrate_batch(batch) for batch in batches), return_exceptions=True)
+        for batch, result in zip(batches, results):
+            if isinstance(result, Exception):
+                print(f"WARNING: Could not fetch details of {len(batch)} job(s), keeping their listing fields: {result}")
+        return jobs
 
-    def _build_job_search_query(self, search_query, num_jobs):
-        """Build the GraphQL query for job search."""
+    def _build_job_details_query(self, job_ids):
+        """Build one GraphQL request looking up several jobs by id through aliases."""
+        variables = {f"id{index}": job_id for index, job_id in enumerate(job_ids)}
+        declarations = ", ".join(f"$id{index}: ID!" for index in range(len(job_ids)))
+        lookups = "\n".join(
+            f"job{index}: marketplaceJobPosting(id: $id{index}) {{{JOB_DETAIL_FIELDS}}}"
+            for index in range(len(job_ids))
+        )
+        return {'query': f"query jobDetails({declarations}) {{\n{lookups}\n}}", 'variables': variables}
+
+    def _apply_job_details(self, job, detail_node):
+        """Merge a `marketplaceJobPosting` node into a normalized job dict; missing values keep the job's own."""
+        contract_terms = detail_node.get("contractTerms") or {}
+        duration_terms = contract_terms.get("hourlyContractTerms") or contract_terms.get("fixedPriceContractTerms") or {}
+        classification = detail_node.get("classification") or {}
+        location = (detail_node.get("contractorSelection") or {}).get("location") or {}
+        client = detail_node.get("client") or {}
+        total_spent = client.get("totalSpent")
+        details = {
+            "description": (detail_node.get("content") or {}).get("description"),
+            "durationLabel": (duration_terms.get("engagementDuration") or {}).get("label"),
+            "contractType": contract_terms.get("contractType"),
+            "experienceLevel": contract_terms.get("experienceLevel"),
+            "category": (classification.get("category") or {}).get("preferredLabel"),
+            "subcategory": (classification.get("subCategory") or {}).get("preferredLabel"),
+            "totalApplicants": detail_node.get("totalApplicants"),
+            "preferredFreelancerLocation": location.get("countries") or None,
+            "preferredFreelancerLocationMandatory": location.get("localCheckRequired"),
+            "clientCompanyName": client.get("companyName"),
+            "clientTotalPostedJobs": client.get("totalPostedJobs"),
+            "clientTotalReviews": client.get("totalReviews"),
+            "clientTotalFeedback": client.get("totalFeedback"),
+            "clientTotalSpent": parse_money(total_spent.get("displayValue")) if total_spent else None,
+        }
+        for field, value in details.items():
+            if value is not None:
+                job[field] = value
+        if not job.get("description"):
+            job["description"] = ""
+
+    def _build_job_search_query(self, search_query, page_size, cursor="0", lean=False):
+        """Build the GraphQL query for one page of the job search."""
+        node_fields = LISTING_JOB_NODE_FIELDS if lean else FULL_JOB_NODE_FIELDS
         return {
             'query': """
             query marketplaceJobPostingsSearch(
@@ -215,58 +815,13 @@ class UpworkJobScraper:
                     sortAttributes: $sortAttributes
                 ) {
                     totalCount
+                    pageInfo {
+                        hasNextPage
+                        endCursor
+                    }
                     edges {
                     node {
-                        id
-                        title
-                        publishedDateTime
-                        description
-                        durationLabel
-                        engagement
-                        job {
-                            contractTerms {
-                                contractType
-                            }
-                            activityStat {
-                                jobActivity {
-                                    lastClientActivity
-                                    invitesSent 
-                                    totalInvitedToInterview 
-                                    totalUnansweredInvites 
-                                }
-                            }
-                        }
-                        hourlyBudgetMin {
-                            currency
-                            displayValue
-                        }
-                        hourlyBudgetMax {
-                            currency
-                            displayValue
-                        }
-                        weeklyBudget {
-                            currency
-                            displayValue
-                        }
-                        experienceLevel
-                        category 
-                        subcategory
-                        totalApplicants
-                        preferredFreelancerLocation 
-                        preferredFreelancerLocationMandatory 
-                        skills {
-                            prettyName
-                        }
-                        client {
-                            companyName
-                            totalPostedJobs
-                            totalReviews
-                            totalFeedback
-                            totalSpent {
-                                currency
-                                displayValue
-                            }
-                        }
+                        """ + node_fields + """
                     }
                     }
                 }
@@ -275,7 +830,7 @@ class UpworkJobScraper:
             'variables': {
                 "marketPlaceJobFilter": {
                     "titleExpression_eq": search_query,
-                    "pagination_eq": { 'first': num_jobs, 'after': "0" }
+                    "pagination_eq": { 'first': page_size, 'after': cursor }
                 },
                 "searchType": "JOBS_FEED",
                 "sortAttributes": [
@@ -286,10 +841,14 @@ class UpworkJobScraper:
 
     def _handle_token_refresh(self):
         """Handle token refresh if needed."""
-        if self.config and self.config.token:
-            current_token = self.config.token
+        current_token = self.transport.token
+        if current_token:
             if self.access_token != current_token.get('access_token'):
-                self._print_token_update_instructions(current_token)
+                if self._save_token(current_token):
+                    print(f"INFO: Upwork API access token was refreshed and saved to {self.token_store.path}.")
+                elif isinstance(self.transport, UpworkGraphQLTransport):
+                    # Tokens of an injected transport do not come from .env
+                    self._print_token_update_instructions(current_token)
                 self._update_tokens(current_token)
 
     def _print_token_update_instructions(self, current_token):
@@ -311,65 +870,31 @@ class UpworkJobScraper:
 
     def _check_api_errors(self, api_response):
         """Check for API errors in the response."""
+        if 'message' in api_response and not api_response.get('data'):
+            raise UpworkApiError(f"Upwork API returned an error message: {api_response['message']}")
         if 'errors' in api_response:
             error_messages = [error.get('message', 'Unknown error') for error in api_response['errors']]
             raise UpworkApiError(f"Upwork API returned errors: {', '.join(error_messages)}")
 
     def _extract_jobs_from_response(self, api_response):
-        """Extract jobs from API response."""
-        jobs = api_response.get("data", {}).get("marketplaceJobPostingsSearch", {}).get("edges", [])
+        """Extract the job edges and page info from an API response."""
+        search_results = (api_response.get("data") or {}).get("marketplaceJobPostingsSearch") or {}
+        jobs = search_results.get("edges") or []
+        page_info = search_results.get("pageInfo") or {}
         if not jobs:
             print("INFO: Live API call successful, but no jobs found for the query.")
-            return []
+            return [], page_info
         print(f"INFO: Successfully fetched {len(jobs)} jobs from live API.")
-        return jobs
+        return jobs, page_info
 
     def _process_jobs(self, jobs):
-        """Process the list of jobs into JobInformation objects."""
-        jobs_data_models = []
+        """Normalize a page of job edges into compact JobRecord objects."""
         try:
-            for api_job in jobs:
-                node = api_job.get("node", {})
-                print(node)
-                if not node.get("id"):
-                    print("Skipping job with no ID.")
-                    continue
-
-                job_info = self._create_job_information(node)
-                jobs_data_models.append(job_info.model_dump())
-
+            return normalize_job_edges(jobs)
         except Exception as e:
             import traceback
             print(f"ERROR: Error processing jobs data: {e}\n{traceback.format_exc()}")
-
-        return jobs_data_models
-
-    def _create_job_information(self, node):
-        """Create a JobInformation object from a job node."""
-        return JobInformation(
-            id=node.get("id"),
-            title=node.get("title"),
-            publishedDateTime=node.get("publishedDateTime"),
-            description=node.get("description", ""),
-            durationLabel=node.get("durationLabel"),
-            engagement=node.get("engagement"),
-            contractType=node.get("job", {}).get("contractTerms", {}).get("contractType"),
-            hourlyBudgetMin=node.get("hourlyBudgetMin", {}).get("displayValue") if node.get("hourlyBudgetMin") else None,
-            hourlyBudgetMax=node.get("hourlyBudgetMax", {}).get("displayValue") if node.get("hourlyBudgetMax") else None,
-            weeklyBudget=node.get("weeklyBudget", {}).get("displayValue") if node.get("weeklyBudget") else None,
-            experienceLevel=node.get("experienceLevel"),
-            category=node.get("category"),
-            subcategory=node.get("subcategory"),
-            totalApplicants=node.get("totalApplicants"),
-            preferredFreelancerLocation=node.get("preferredFreelancerLocation"),
-            preferredFreelancerLocationMandatory=node.get("preferredFreelancerLocationMandatory", False),
-            skills=[skill.get("prettyName") for skill in node.get("skills", []) if skill and skill.get("prettyName")],
-            clientCompanyName=node.get("client", {}).get("companyName"),
-            clientTotalPostedJobs=node.get("client", {}).get("totalPostedJobs"),
-            clientTotalReviews=node.get("client", {}).get("totalReviews"),
-            clientTotalFeedback=node.get("client", {}).get("totalFeedback"),
-            clientTotalSpent=node.get("client", {}).get("totalSpent", {}).get("displayValue") if node.get("client", {}).get("totalSpent") else None
-        )
+            return []
 
     def _handle_api_error(self, error):
         """Handle API errors."""
@@ -0,0 +1,82 @@
+import json
+import os
+import tempfile
+import time
+
+DEFAULT_TOKEN_STORE_PATH = ".upwork_tokens.json"
+
+# A token validated more recently than this is trusted without a test API call
+DEFAULT_VALIDATION_TTL_SECONDS = 6 * 60 * 60
+
+# Tokens this close to expiry are always validated (and refreshed if needed)
+EXPIRY_BUFFER_SECONDS = 300
+
+
+class TokenStore:
+    """
+    Persists Upwork OAuth tokens to a JSON file between runs.
+
+    Writes are atomic (temporary file in the same directory, fsync, then
+    rename), so an interrupted run never leaves a truncated token file behind.
+    The store also records when the token was last validated against the API,
+    which lets the scraper skip the startup validation round trip.
+    """
+
+    def __init__(self, path=None, validation_ttl=None):
+        self.path = path or os.getenv("UPWORK_TOKEN_STORE", DEFAULT_TOKEN_STORE_PATH)
+        if validation_ttl is None:
+            validation_ttl = float(os.getenv("UPWORK_TOKEN_VALIDATION_TTL", DEFAULT_VALIDATION_TTL_SECONDS))
+        self.validation_ttl = validation_ttl
+
+    def load(self):
+        """
+        Load the stored tokens.
+
+        Returns:
+            dict: {'access_token', 'refresh_token', 'expires_at', 'validated_at'}, or None
+            if nothing usable is stored.
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"WARNING: Ignoring unreadable token store {self.path}: {e}")
+            return None
+        if not all(data.get(key) for key in ("access_token", "refresh_token", "expires_at")):
+            return None
+        return data
+
+    def save(self, token, validated_at=None):
+        """Atomically write `token` (an OAuth token dict) to the store."""
+        data = {
+            "access_token": token.get("access_token"),
+            "refresh_token": token.get("refresh_token"),
+            "expires_at": token.get("expires_at"),
+            "validated_at": validated_at,
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=".upwork_tokens.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(data, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.chmod(temp_path, 0o600)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def is_recently_validated(self, data, now=None):
+        """Whether `data` was validated within the TTL and is not close to expiry."""
+        now = time.time() if now is None else now
+        validated_at = data.get("validated_at")
+        try:
+            expires_at = float(data.get("expires_at"))
+        except (TypeError, ValueError):
+            return False
+        return bool(validated_at) and now - float(validated_at) < self.validation_ttl and expires_at - now > EXPIRY_BUFFER_SECONDS
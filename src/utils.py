@@ -1,8 +1,10 @@
 import re
 import random
+from functools import lru_cache
 # import html2text # Removed as it's no longer used after switching to API
 from langchain_core.messages import SystemMessage, HumanMessage
 from langchain_core.output_parsers import StrOutputParser
+from src.llm_cache import MISS, get_llm_cache
 
 COVER_LETTERS_FILE = "./data/cover_letter.md"
 
@@ -18,10 +20,14 @@ def extract_provider_and_model(model_string: str):
     """
     return model_string.split("/", 1)
 
+@lru_cache(maxsize=None)
 def get_llm_by_provider(model_string, temperature=0.1):
     """
     Retrieve the appropriate LLM instance based on the provider and model name.
 
+    Instances are cached per (model, temperature), so a long-running process
+    reuses warm clients and their HTTP connection pools.
+
     Args:
         model_string (str): The model string in the format "provider/model".
         temperature (float): The temperature for controlling output randomness.
@@ -56,20 +62,41 @@ async def ainvoke_llm(
     system_prompt,
     user_message,
     model="openai/gpt-4o-mini",  # Default to GPT-4o-mini
-    response_format=None
+    response_format=None,
+    use_cache=True,
+    cache_if=None,
+    cache_status=None
 ):
     """
     Invoke a language model asynchronously with the given prompts.
 
+    Responses are served from the persistent LLM cache (`src/llm_cache.py`)
+    when an identical request was answered before. A fresh response is only
+    cached if it is non-empty and passes `cache_if`, so a malformed answer is
+    not replayed on the next run.
+
     Args:
         system_prompt (str): The system-level instruction for the LLM.
         user_message (str): The user's message or query.
         model (str): The model string specifying the provider and model name.
         response_format: An optional format for structuring the output.
+        use_cache (bool): Whether to read and write the LLM response cache.
+        cache_if (callable): Called with a fresh response; it is cached only if this returns True.
+        cache_status (dict): If given, its 'hit' key is set to whether the response came from the cache.
 
     Returns:
         str: The output generated by the LLM.
     """
+    cache = get_llm_cache() if use_cache else None
+    if cache_status is not None:
+        cache_status['hit'] = False
+    if cache is not None:
+        cached = cache.get(model, system_prompt, user_message, response_format)
+        if cached is not MISS:
+            if cache_status is not None:
+                cache_status['hit'] = True
+            return cached
+
     # Construct message inputs for the LLM
     messages = [
         SystemMessage(content=system_prompt),
@@ -87,6 +114,8 @@ async def ainvoke_llm(
     
     # Execute the LLM invocation asynchronously
     output = await llm.ainvoke(messages)
+    if cache is not None and output and (cache_if is None or cache_if(output)):
+        cache.put(model, system_prompt, user_message, response_format, output)
     return output
 
 # Removed get_playwright_browser_context as Playwright is no longer used.
@@ -124,6 +153,18 @@ def convert_jobs_matched_to_string_list(jobs_matched):
         jobs.append(job_str)
     return jobs
 
+def estimate_tokens(text):
+    """
+    Roughly estimate the number of LLM tokens in a text (about 4 characters per token).
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: The estimated token count.
+    """
+    return len(text or "") // 4 + 1
+
 def read_text_file(filename):
     """
     Read a text file and return its contents as a single string.
@@ -0,0 +1,11 @@
+import pytest
+
+from src import database
+
+
+@pytest.fixture
+def jobs_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "jobs.db"))
+    database.ensure_db_exists()
+    yield
+    database.close_connection()
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+
+import pytest
+
+from src import database
+from src.db_writer import AsyncDBWriter
+
+
+def make_jobs(*job_ids):
+    return [{"id": str(job_id), "title": f"Job {job_id}"} for job_id in job_ids]
+
+
+def stored_job_ids():
+    return sorted(job["id"] for job in database.iter_jobs(as_job=True))
+
+
+def failing_write(conn):
+    conn.execute("INSERT INTO no_such_table VALUES (1)")
+
+
+def test_writes_are_group_committed(jobs_db):
+    async def run():
+        async with AsyncDBWriter(batch_size=10, flush_interval=60) as writer:
+            futures = [await writer.submit(database.insert_jobs, make_jobs(job_id)) for job_id in range(35)]
+            await writer.flush()
+            return writer.stats, [future.result() for future in futures]
+
+    stats, results = asyncio.run(run())
+
+    assert results == [1] * 35
+    assert stats == {"writes": 35, "commits": 4, "failed_writes": 0, "max_batch": 10}
+    assert len(stored_job_ids()) == 35
+
+
+def test_a_write_is_committed_within_the_flush_interval(jobs_db):
+    async def run():
+        async with AsyncDBWriter(flush_interval=0.05) as writer:
+            future = await writer.submit(database.insert_jobs, make_jobs(1))
+            return await asyncio.wait_for(future, timeout=5)
+
+    assert asyncio.run(run()) == 1
+    assert stored_job_ids() == ["1"]
+
+
+def test_a_failed_group_commit_is_retried_write_by_write(jobs_db):
+    async def run():
+        async with AsyncDBWriter(flush_interval=60) as writer:
+            futures = [
+                await writer.submit(database.insert_jobs, make_jobs(1)),
+                await writer.submit(failing_write),
+                await writer.submit(database.insert_jobs, make_jobs(2)),
+            ]
+            await writer.flush()
+            return writer.stats, futures
+
+    stats, (first, failed, third) = asyncio.run(run())
+
+    assert first.result() == 1 and third.result() == 1
+    with pytest.raises(Exception, match="no_such_table"):
+        failed.result()
+    assert stats["failed_writes"] == 1
+    assert stats["writes"] == 3
+    # The rolled-back group is not applied twice
+    assert stored_job_ids() == ["1", "2"]
+
+
+def test_submit_waits_while_max_pending_writes_are_queued(jobs_db):
+    unblock = threading.Event()
+
+    def blocking_write(conn):
+        unblock.wait(timeout=5)
+
+    async def run():
+        async with AsyncDBWriter(batch_size=1, max_pending=2) as writer:
+            await writer.submit(blocking_write)
+            await writer.submit(database.insert_jobs, make_jobs(1))
+            third = asyncio.ensure_future(writer.submit(database.insert_jobs, make_jobs(2)))
+            await asyncio.sleep(0.2)
+            waited = not third.done()
+            unblock.set()
+            await asyncio.wait_for(third, timeout=5)
+            await writer.flush()
+            return waited
+
+    assert asyncio.run(run()) is True
+    assert stored_job_ids() == ["1", "2"]
@@ -0,0 +1,117 @@
+import asyncio
+import csv
+
+import pytest
+
+from src.commands import grade
+
+NUM_JOBS = 10
+
+
+@pytest.fixture
+def scored_ids(jobs_db, monkeypatch):
+    """Stub out the LLM: every job gets a score and a multi-line reasoning; returns the ids scored."""
+    scored = []
+
+    async def fake_score_single_job(job_dict, job_text, scoring_system_prompt, model):
+        scored.append(job_dict["id"])
+        job_dict["score"] = int(job_dict["id"]) % 10
+        job_dict["reasoning"] = f'Job {job_dict["id"]}:\n"quoted", and a second line'
+        return False
+
+    monkeypatch.setattr(grade, "score_single_job", fake_score_single_job)
+    monkeypatch.setattr(grade, "load_scoring_system_prompt", lambda: "Score this job.")
+    return scored
+
+
+@pytest.fixture
+def input_csv(tmp_path):
+    path = tmp_path / "jobs.csv"
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, ["id", "title", "description"])
+        writer.writeheader()
+        for job_id in range(NUM_JOBS):
+            writer.writerow({"id": str(job_id), "title": f"Job {job_id}", "description": f"Description of job {job_id}\nwith two lines"})
+    return str(path)
+
+
+def run_grading(input_csv, output_csv):
+    asyncio.run(grade.grade_and_save_jobs(input_csv, output_csv, window_size=4, concurrency=2, similarity_threshold=None))
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as file:
+        return list(csv.DictReader(file))
+
+
+def tear_row(path, row_number):
+    """Cut the file inside the reasoning of data row `row_number` (1-based), as a crash mid-write would."""
+    with open(path, "rb") as file:
+        data = file.read()
+    row_start = 0
+    for _ in range(row_number):
+        row_start = data.index(b'\r\n', data.index(b'"quoted""', row_start)) + 2
+    torn_at = data.index(b'"quoted""', row_start) + 3
+    with open(path, "wb") as file:
+        file.write(data[:torn_at])
+
+
+def test_truncate_partial_last_row(tmp_path):
+    path = tmp_path / "graded.csv"
+    intact = 'id,reasoning\r\n1,"two\r\nlines"\r\n2,done\r\n'
+    path.write_bytes((intact + '3,"unterminated\r\nquo').encode("utf-8"))
+
+    assert grade.truncate_partial_last_row(str(path)) == len('3,"unterminated\r\nquo')
+    assert path.read_bytes().decode("utf-8") == intact
+    assert grade.truncate_partial_last_row(str(path)) == 0
+    assert grade.truncate_partial_last_row(str(tmp_path / "missing.csv")) == 0
+
+
+def test_truncate_row_with_missing_fields(tmp_path):
+    path = tmp_path / "graded.csv"
+    path.write_bytes(b"id,score,reasoning\r\n1,5,ok\r\n2,7")
+
+    grade.truncate_partial_last_row(str(path))
+
+    assert path.read_bytes() == b"id,score,reasoning\r\n1,5,ok\r\n"
+
+
+def test_grades_every_job_in_input_order(scored_ids, input_csv, tmp_path):
+    output_csv = str(tmp_path / "graded.csv")
+
+    run_grading(input_csv, output_csv)
+
+    rows = read_rows(output_csv)
+    assert [row["id"] for row in rows] == [str(job_id) for job_id in range(NUM_JOBS)]
+    assert rows[3]["reasoning"] == 'Job 3:\n"quoted", and a second line'
+    assert sorted(scored_ids, key=int) == [str(job_id) for job_id in range(NUM_JOBS)]
+
+
+def test_resume_after_a_torn_last_row(scored_ids, input_csv, tmp_path):
+    output_csv = str(tmp_path / "graded.csv")
+    run_grading(input_csv, output_csv)
+    # A crash while writing the 6th row: rows 1-5 are intact, the 6th is half-written
+    tear_row(output_csv, 5)
+    scored_ids.clear()
+
+    run_grading(input_csv, output_csv)
+
+    rows = read_rows(output_csv)
+    assert [row["id"] for row in rows] == [str(job_id) for job_id in range(NUM_JOBS)]
+    assert all(row["reasoning"].endswith("a second line") for row in rows)
+    # Only the torn job and the ones never written are graded again
+    assert sorted(scored_ids, key=int) == ["5", "6", "7", "8", "9"]
+
+
+def test_rerun_of_a_complete_output_grades_nothing(scored_ids, input_csv, tmp_path):
+    output_csv = str(tmp_path / "graded.csv")
+    run_grading(input_csv, output_csv)
+    with open(output_csv, "rb") as file:
+        before = file.read()
+    scored_ids.clear()
+
+    run_grading(input_csv, output_csv)
+
+    assert scored_ids == []
+    with open(output_csv, "rb") as file:
+        assert file.read() == before
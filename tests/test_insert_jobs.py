@@ -0,0 +1,50 @@
+from src import database
+
+
+def make_job(job_id, title="AI agent developer", **fields):
+    return {"id": job_id, "title": title, "description": "Build a LangGraph agent.", "skills": ["Python", "LangChain"], **fields}
+
+
+def test_counts_only_new_rows(jobs_db):
+    assert database.save_jobs([make_job("1"), make_job("2")]) == 2
+    assert database.save_jobs([make_job("2"), make_job("3"), make_job("4")]) == 2
+    assert database.save_jobs([make_job("1"), make_job("3")]) == 0
+
+    assert sum(database.count_jobs_by_stage().values()) == 4
+
+
+def test_repeated_id_in_one_batch_counts_once(jobs_db):
+    assert database.save_jobs([make_job("1"), make_job("1", title="Repeated")]) == 1
+
+    assert [job["title"] for job in database.iter_jobs(as_job=True)] == ["AI agent developer"]
+
+
+def test_existing_rows_are_left_untouched(jobs_db):
+    database.save_jobs([make_job("1", title="Original")])
+
+    assert database.save_jobs([make_job("1", title="Changed")]) == 0
+    assert [job["title"] for job in database.iter_jobs(as_job=True)] == ["Original"]
+
+
+def test_jobs_without_an_id_are_skipped(jobs_db):
+    assert database.save_jobs([make_job(None), make_job(""), make_job("1")]) == 1
+    assert database.save_jobs([]) == 0
+
+
+def test_index_triggers_do_not_inflate_the_count(jobs_db):
+    # Every insert also writes the full-text index and the normalized skills
+    assert database.save_jobs([make_job(str(job_id)) for job_id in range(50)]) == 50
+    assert len(database.search_jobs("LangGraph", limit=100)) == 50
+
+
+def test_insert_jobs_does_not_commit(jobs_db):
+    conn = database.get_connection()
+
+    assert database.insert_jobs(conn, [make_job("1")]) == 1
+    conn.rollback()
+    assert database.save_jobs([make_job("1")]) == 1
+
+
+def test_save_job_reports_whether_the_job_was_new(jobs_db):
+    assert database.save_job(make_job("1")) is True
+    assert database.save_job(make_job("1")) is False
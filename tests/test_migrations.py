@@ -0,0 +1,74 @@
+import pytest
+
+from src import database
+
+LEGACY_COLUMNS = ("job_id", "title", "job_type", "experience_level", "duration", "payment_rate", "score",
+                  "description", "client_total_spent", "created_at")
+LEGACY_ROWS = [
+    ("1", "LangGraph agent", "Hourly", "Expert", "1 to 3 months", "$40/hr", 8.0, "Build an agent.", "$12,345.67", "2024-01-01 10:00:00"),
+    ("2", "Logo design", "fixed", "Entry level", "Less than 1 month", "$100", None, "Design a logo.", "$10K+", "2024-01-02 10:00:00"),
+    ("3", "Scraper", None, None, None, None, None, None, "No spend yet", "2024-01-03 10:00:00"),
+    ("4", "Chatbot", "Hourly", None, None, None, 6.5, "Build a chatbot.", None, "2024-01-04 10:00:00"),
+]
+
+
+@pytest.fixture
+def legacy_db(tmp_path, monkeypatch):
+    """A database created by the scraping-era schema (migration 1 only), holding LEGACY_ROWS."""
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "legacy.db"))
+    conn = database.get_connection()
+    database.get_schema_version(conn)
+    database._migration_1_initial_schema(conn)
+    conn.execute("INSERT INTO schema_version (version) VALUES (1)")
+    conn.executemany(
+        f"INSERT INTO jobs ({', '.join(LEGACY_COLUMNS)}) VALUES ({', '.join('?' for _ in LEGACY_COLUMNS)})", LEGACY_ROWS
+    )
+    conn.commit()
+    yield conn
+    database.close_connection()
+
+
+def jobs_by_id(conn):
+    return {row["job_id"]: dict(row) for row in conn.execute("SELECT * FROM jobs")}
+
+
+def test_pending_migrations_upgrade_a_legacy_database(legacy_db):
+    database.ensure_db_exists()
+
+    assert database.get_schema_version(legacy_db) == database.MIGRATIONS[-1][0]
+    columns = set(database.get_table_columns())
+    assert {"published_at", "contract_type", "hourly_budget_min", "client_total_spent", "skills", "stage"} <= columns
+    assert not {"job_type", "duration", "payment_rate", "link"} & columns
+
+
+def test_migration_2_keeps_what_the_legacy_columns_provide(legacy_db):
+    database.ensure_db_exists()
+    jobs = jobs_by_id(legacy_db)
+
+    assert sorted(jobs) == ["1", "2", "3", "4"]
+    assert jobs["1"]["title"] == "LangGraph agent"
+    assert jobs["1"]["description"] == "Build an agent."
+    assert jobs["1"]["duration_label"] == "1 to 3 months"
+    assert jobs["1"]["experience_level"] == "Expert"
+    assert jobs["1"]["score"] == 8.0
+    assert jobs["1"]["created_at"] == "2024-01-01 10:00:00"
+    assert [jobs[job_id]["contract_type"] for job_id in "1234"] == ["HOURLY", "FIXED", None, "HOURLY"]
+
+
+def test_migration_2_parses_client_spend_into_numbers(legacy_db):
+    database.ensure_db_exists()
+    jobs = jobs_by_id(legacy_db)
+
+    assert jobs["1"]["client_total_spent"] == pytest.approx(12345.67)
+    assert jobs["2"]["client_total_spent"] == 10_000.0
+    assert jobs["3"]["client_total_spent"] is None
+    assert jobs["4"]["client_total_spent"] is None
+
+
+def test_migrated_jobs_are_queryable(legacy_db):
+    database.ensure_db_exists()
+
+    assert database.count_jobs_by_stage() == {database.STAGE_FETCHED: 2, database.STAGE_GRADED: 2}
+    assert [job["id"] for job in database.iter_jobs(as_job=True, contract_type="HOURLY")] == ["4", "1"]
+    assert [row["job_id"] for row in database.search_jobs("chatbot")] == ["4"]
+    assert database.save_jobs([{"id": "1", "title": "Duplicate"}, {"id": "5", "title": "New"}]) == 1
@@ -0,0 +1,19 @@
+import pytest
+
+from src import database
+
+
+@pytest.mark.parametrize("order_by, filters, index", [
+    ("created_at", {}, "idx_jobs_created_at"),
+    ("published_at", {}, "idx_jobs_published_at"),
+    ("created_at", {"created_after": "2024-01-01", "created_before": "2024-02-01"}, "idx_jobs_created_at"),
+    ("created_at", {"stage": database.STAGE_FETCHED}, "idx_jobs_stage"),
+    ("created_at", {"contract_type": "HOURLY"}, "idx_jobs_contract_type"),
+    ("published_at", {"contract_type": "HOURLY"}, "idx_jobs_contract_type_published_at"),
+])
+def test_iter_jobs_pages_use_an_index_without_sorting(jobs_db, order_by, filters, index):
+    plan = database.explain_job_query(order_by=order_by, **filters)
+
+    assert any(f"USING INDEX {index} " in line for line in plan), plan
+    assert not any("SCAN jobs" in line for line in plan), plan
+    assert not any("TEMP B-TREE" in line for line in plan), plan
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from src import database
+from src.fake_upwork import JOB_ID_OFFSET, FakeUpworkTransport
+from src.rate_limit import TokenBucket
+from src.scraper import UpworkJobScraper
+
+QUERY = "python"
+
+
+@pytest.fixture
+def transport():
+    return FakeUpworkTransport(num_jobs=200, match_ratio=1.0)
+
+
+@pytest.fixture
+def scraper(transport):
+    scraper = UpworkJobScraper(transport=transport, rate_limiter=TokenBucket(rate=1e6, capacity=1e6))
+    yield scraper
+    scraper.close()
+
+
+def fetch(scraper, watermark=None, **kwargs):
+    """Run one fetch of QUERY; returns the fake job indexes fetched and the advanced watermark."""
+    async def collect():
+        indexes = []
+        async for page in scraper.fetch_jobs_from_api(QUERY, page_size=3, watermark=watermark, **kwargs):
+            indexes += [int(job["id"]) - JOB_ID_OFFSET for job in page]
+        return indexes
+
+    indexes = asyncio.run(collect())
+    return indexes, scraper.query_watermarks[QUERY]
+
+
+def published(index):
+    return f"2024-01-01T{index // 60:02d}:{index % 60:02d}:00.000Z"
+
+
+def test_first_capped_fetch_leaves_no_gaps(scraper):
+    indexes, watermark = fetch(scraper, num_jobs=5)
+
+    assert indexes == [199, 198, 197, 196, 195]
+    assert watermark["newest_published"] == published(199)
+    assert watermark["gaps"] == []
+
+
+@pytest.mark.parametrize("stop", [{"num_jobs": 5}, {"max_pages": 2}])
+def test_paging_stopped_early_records_the_unreached_span(scraper, transport, stop):
+    _, watermark = fetch(scraper, num_jobs=5)
+    transport.add_jobs(10)
+
+    indexes, watermark = fetch(scraper, watermark, **stop)
+
+    assert indexes == list(range(209, 209 - len(indexes), -1))
+    assert watermark["newest_published"] == published(209)
+    assert watermark["gaps"] == [[published(199), published(indexes[-1])]]
+
+
+def test_later_runs_fill_the_gap_without_duplicates(scraper, transport):
+    _, watermark = fetch(scraper, num_jobs=5)
+    transport.add_jobs(10)
+    fetched = []
+    for _ in range(5):
+        indexes, watermark = fetch(scraper, watermark, num_jobs=4)
+        fetched += indexes
+        if not watermark["gaps"]:
+            break
+
+    assert watermark["gaps"] == []
+    assert sorted(fetched) == list(range(200, 210))
+    assert watermark["newest_published"] == published(209)
+
+
+def test_jobs_published_while_a_gap_is_open_come_first(scraper, transport):
+    _, watermark = fetch(scraper, num_jobs=5)
+    transport.add_jobs(10)
+    _, watermark = fetch(scraper, watermark, num_jobs=5)
+    transport.add_jobs(2)
+
+    indexes, watermark = fetch(scraper, watermark)
+
+    assert indexes == [211, 210, 204, 203, 202, 201, 200]
+    assert watermark["gaps"] == []
+
+
+def test_gaps_survive_the_database_round_trip(jobs_db, scraper, transport):
+    _, watermark = fetch(scraper, num_jobs=5)
+    transport.add_jobs(10)
+    _, watermark = fetch(scraper, watermark, num_jobs=5)
+
+    database.save_query_watermark(QUERY, watermark["newest_published"], watermark["seen_ids"], watermark["gaps"])
+    stored = database.get_query_watermark(QUERY)
+
+    assert stored == watermark
+    indexes, _ = fetch(scraper, stored)
+    assert indexes == [204, 203, 202, 201, 200]